@@ -15,81 +15,166 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import contextlib
 import os
 import shutil
 import sys
 import time
-from contextlib import suppress
-from threading import Event
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from typing import List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from bottles.backend.logger import Logger
 from bottles.backend.models.result import Result
 from bottles.backend.state import Status, TaskStreamUpdateHandler
+from bottles.backend.utils import json
 from bottles.backend.utils.file import FileUtils
+from bottles.backend.utils.hashing import DigestCache, file_key, new_hash
+from bottles.backend.utils.storage import atomic_write
 
 logging = Logger()
 
+CHUNK_SIZE = 1024 * 1024
+# the smallest range fetched by a segment of a parallel download
+SEGMENT_MIN_SIZE = 32 * 1024 * 1024
+# how often the offsets of a partial download are stored, in seconds
+STATE_INTERVAL = 1.0
+# we fake the user-agent to avoid 403 errors on some servers
+USER_AGENT = "curl/7.79.1"
+TIMEOUT = (10, 60)
+
+_session: Optional[requests.Session] = None
+_session_lock = Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    The HTTP session shared by the downloads, so the connections to the
+    same host are reused. Failed connections and 429/5xx responses are
+    retried by urllib3 with an exponential backoff.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=8, pool_maxsize=16, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            # the offsets are counted on the bytes as sent
+            session.headers["Accept-Encoding"] = "identity"
+            _session = session
+        return _session
+
 
 class DownloadCancelled(Exception):
     """Raised when a download operation is cancelled."""
 
 
+class DownloadFailed(Exception):
+    """Raised when the server doesn't serve the resource."""
+
+
+class Segment:
+    """A byte range of the file, end is None while the size is unknown."""
+
+    def __init__(self, start: int, end: Optional[int], offset: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.offset = start if offset is None else offset
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None and self.offset >= self.end
+
+    def to_list(self) -> list:
+        return [self.start, self.end, self.offset]
+
+
 class Downloader:
     """
     Download a resource from a given URL. It shows and update a progress
     bar while downloading but can also be used to update external progress
     bars using the func parameter.
+
+    The data is written to file.part and the progress of each segment
+    to file.part.json, so an interrupted download (cancelled, failed or
+    killed) resumes with HTTP Range requests. With segments > 1, large
+    files are fetched by that many parallel connections.
+
+    With an algorithm, the data is hashed while it arrives: the chunks
+    following the hashed prefix are hashed from memory, the ones written
+    ahead of it by other segments are read back once the prefix reaches
+    them. The digest is stored in the DigestCache and set as digest, so
+    the file is not read again to verify it. hashlib can't save its
+    state, the prefix written by a previous attempt is read on resume.
     """
 
+    retries = 5
+    backoff = 0.5
+
     def __init__(
         self,
         url: str,
         file: str,
         update_func: Optional[TaskStreamUpdateHandler] = None,
         cancel_event: Optional[Event] = None,
+        segments: int = 1,
+        algorithm: Optional[str] = None,
     ):
         self.start_time = None
         self.url = url
         self.file = file
         self.update_func = update_func
         self.cancel_event = cancel_event
+        self.segments = max(segments, 1)
+        self.part_path = f"{file}.part"
+        self.state_path = f"{file}.part.json"
+        self.__lock = Lock()
+        self.__state: dict = {}
+        self.__received = 0
+        self.__saved = 0.0
+        self.__fd: Optional[int] = None
+        self.algorithm = algorithm
+        self.digest: Optional[str] = None
+        self.__hash = new_hash(algorithm) if algorithm else None
+        self.__hashed = 0
+        self.__hash_lock = Lock()
 
     def download(self) -> Result:
         """Start the download."""
+        self.start_time = time.time()
         try:
-            with open(self.file, "wb") as file:
-                self.start_time = time.time()
-                headers = {
-                    "User-Agent": "curl/7.79.1"
-                }  # we fake the user-agent to avoid 403 errors on some servers
-                response = requests.get(self.url, stream=True, headers=headers)
-                total_size = int(response.headers.get("content-length", 0))
-                received_size = 0
-
-                if total_size != 0:
-                    for data in response.iter_content(1024 * 1024):  # 1MB buffer
-                        if self.cancel_event and self.cancel_event.is_set():
-                            raise DownloadCancelled
-                        received_size += len(data)
-                        file.write(data)
-                        if not self.update_func:
-                            continue
-                        self.update_func(received_size, total_size)
-                        self.__progress(received_size, total_size)
-                else:
-                    file.write(response.content)
-                    if self.update_func:
-                        self.update_func(1, 1)
-                        self.__progress(1, 1)
+            self.__download()
+            os.replace(self.part_path, self.file)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.state_path)
+            if self.digest is not None:
+                key = file_key(self.file)
+                if key is not None:
+                    DigestCache.put_many(
+                        [(self.file, key, self.digest)], self.algorithm
+                    )
         except DownloadCancelled:
             if self.update_func:
                 self.update_func(status=Status.CANCELLED)
-            with suppress(FileNotFoundError):
-                os.remove(self.file)
             return Result(False, message="cancelled")
+        except DownloadFailed as e:
+            logging.error(f"Failed to download [{self.url}]: {e}")
+            return Result(False, message=str(e))
         except requests.exceptions.SSLError:
             logging.error(
                 "Download failed due to a SSL error. "
@@ -101,8 +186,237 @@ class Downloader:
             return Result(
                 False, message="Download failed! Check your internet connection."
             )
+        finally:
+            if self.__fd is not None:
+                os.close(self.__fd)
+                self.__fd = None
+
+        return Result(True, data={"checksum": self.digest})
+
+    def __cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def __load_state(self) -> Optional[dict]:
+        """The state of a previous attempt for the same url, if any."""
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state["url"] != self.url or not os.path.isfile(self.part_path):
+                return None
+            state["segments"] = [Segment(*s) for s in state["segments"]]
+            return state
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def __save_state(self, force: bool = False):
+        with self.__lock:
+            now = time.monotonic()
+            if not force and now - self.__saved < STATE_INTERVAL:
+                return
+            self.__saved = now
+            state = dict(self.__state)
+            state["segments"] = [s.to_list() for s in state["segments"]]
+        # the offsets must not get ahead of the data on the disk
+        with contextlib.suppress(OSError):
+            os.fdatasync(self.__fd)
+        with contextlib.suppress(OSError):
+            atomic_write(self.state_path, json.dumps(state))
+
+    def __get(self, headers: Optional[dict] = None) -> requests.Response:
+        response = get_session().get(
+            self.url, headers=headers, stream=True, timeout=TIMEOUT
+        )
+        if response.status_code not in (200, 206):
+            response.close()
+            raise DownloadFailed(f"HTTP status {response.status_code}")
+        return response
+
+    @staticmethod
+    def __get_validator(response: requests.Response) -> Optional[str]:
+        """What to send as If-Range, weak etags are not allowed there."""
+        etag = response.headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("last-modified")
+
+    def __start(self) -> Optional[requests.Response]:
+        """
+        Resume the previous attempt or start a new one, returning the
+        response to use for the first segment, if any.
+        """
+        state = self.__load_state()
+        if state is not None:
+            self.__state = state
+            self.__fd = os.open(self.part_path, os.O_RDWR)
+            self.__received = sum(s.offset - s.start for s in state["segments"])
+            logging.info(f"Resuming [{self.url}] from {self.__received} bytes.")
+            return None
+
+        response = self.__get()
+        length = response.headers.get("content-length")
+        total = int(length) if length and length.isdigit() else None
+        count = 1
+        if total and response.headers.get("accept-ranges") == "bytes":
+            count = max(min(self.segments, total // SEGMENT_MIN_SIZE), 1)
+        size = -(-total // count) if total else None
+        segments = [
+            Segment(i * size, min((i + 1) * size, total)) if size else Segment(0, None)
+            for i in range(count)
+        ]
+        self.__state = {
+            "url": self.url,
+            "total": total,
+            "validator": self.__get_validator(response),
+            "segments": segments,
+        }
+        self.__fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        if total:
+            os.ftruncate(self.__fd, total)
+        self.__received = 0
+        return response
+
+    def __download(self):
+        try:
+            self.__run()
+        except BaseException:
+            if self.__fd is not None:
+                self.__save_state(force=True)
+            raise
+
+    def __run(self):
+        response = self.__start()
+        segments: List[Segment] = self.__state["segments"]
+        pending = [s for s in segments if not s.done]
+        if len(pending) <= 1:
+            for segment in pending:
+                self.__fetch(segment, response)
+        else:
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                # the first response starts at 0, it serves the first segment
+                futures = [pool.submit(self.__fetch, pending[0], response)]
+                futures += [pool.submit(self.__fetch, s) for s in pending[1:]]
+                for future in futures:
+                    future.result()
+
+        if self.__state["total"] is None:
+            self.__state["total"] = self.__received
+        if self.__hash is not None:
+            with self.__hash_lock:
+                self.__hash_written()
+                if self.__hashed != self.__state["total"]:
+                    raise DownloadFailed("The downloaded file is incomplete")
+                self.digest = self.__hash.hexdigest().lower()
+        self.__progress_update(force=True)
+
+    def __hash_chunk(self, offset: int, data: bytes):
+        if self.__hash is None:
+            return
+        with self.__hash_lock:
+            if offset == self.__hashed:
+                self.__hash.update(data)
+                self.__hashed += len(data)
+            self.__hash_written()
+
+    def __hash_written(self):
+        """Hash the data already written right after the hashed prefix."""
+        # the segments are sorted, each one starts where the previous ends
+        for segment in self.__state["segments"]:
+            with self.__lock:
+                start, offset = segment.start, segment.offset
+            if not start <= self.__hashed < offset:
+                continue
+            while self.__hashed < offset:
+                size = min(CHUNK_SIZE, offset - self.__hashed)
+                data = os.pread(self.__fd, size, self.__hashed)
+                if not data:
+                    raise OSError(f"Unexpected end of {self.part_path}")
+                self.__hash.update(data)
+                self.__hashed += len(data)
+
+    def __fetch(self, segment: Segment, response: Optional[requests.Response] = None):
+        attempts = 0
+        while not segment.done:
+            try:
+                if response is None:
+                    response = self.__request(segment)
+                for data in response.iter_content(CHUNK_SIZE):
+                    if self.__cancelled():
+                        raise DownloadCancelled
+                    if segment.end is not None:
+                        data = data[: segment.end - segment.offset]
+                    offset = segment.offset
+                    os.pwrite(self.__fd, data, offset)
+                    with self.__lock:
+                        segment.offset += len(data)
+                        self.__received += len(data)
+                    self.__hash_chunk(offset, data)
+                    self.__progress_update()
+                    if segment.done:
+                        break
+                if segment.end is None:
+                    # the size was unknown, the stream ended: it is complete
+                    segment.end = segment.offset
+                elif not segment.done:
+                    raise requests.exceptions.ConnectionError("Connection closed early")
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout,
+            ) as e:
+                attempts += 1
+                if attempts > self.retries:
+                    raise
+                logging.warning(f"Download interrupted, retrying: {e}")
+                if self.cancel_event is not None:
+                    if self.cancel_event.wait(self.backoff * 2**attempts):
+                        raise DownloadCancelled
+                else:
+                    time.sleep(self.backoff * 2**attempts)
+            finally:
+                if response is not None:
+                    response.close()
+                    response = None
+        self.__save_state()
+
+    def __request(self, segment: Segment) -> requests.Response:
+        """Request the rest of the segment, from its offset."""
+        if segment.offset == 0 and segment.end == self.__state["total"]:
+            return self.__get()
+
+        end = "" if segment.end is None else segment.end - 1
+        headers = {"Range": f"bytes={segment.offset}-{end}"}
+        if self.__state["validator"]:
+            headers["If-Range"] = self.__state["validator"]
+        response = self.__get(headers)
+        if response.status_code == 206:
+            return response
+
+        # the server sent the whole file: it can't resume or it changed
+        if len(self.__state["segments"]) > 1:
+            response.close()
+            raise DownloadFailed("The server doesn't support resuming downloads")
+        with self.__lock:
+            self.__received -= segment.offset - segment.start
+            segment.offset = segment.start
+        if self.__hash is not None:
+            with self.__hash_lock:
+                self.__hash = new_hash(self.algorithm)
+                self.__hashed = 0
+        return response
 
-        return Result(True)
+    def __progress_update(self, force: bool = False):
+        self.__save_state(force)
+        if not self.update_func:
+            return
+        with self.__lock:
+            received = self.__received
+        total = self.__state["total"] or 0
+        if total:
+            self.update_func(received, total)
+            self.__progress(received, total)
+        elif force:
+            self.update_func(1, 1)
+            self.__progress(1, 1)
 
     def __progress(self, received_size, total_size):
         """Update the progress bar."""
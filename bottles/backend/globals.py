@@ -49,7 +49,12 @@ class Paths:
     latencyflex = f"{base}/latencyflex"
     templates = f"{base}/templates"
     library = f"{base}/library.yml"
+    inventory = f"{base}/inventory.yml"
+    bottle_index = f"{base}/bottle_index.yml"
     process_metrics = f"{base}/process_metrics.sqlite"
+    hardware_profile = f"{base}/hardware_profile.json"
+    hash_cache = f"{base}/hash_cache.sqlite"
+    artifacts = f"{base}/artifacts"
 
     @staticmethod
     def is_vkbasalt_available():
@@ -14,9 +14,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
+import atexit
+import collections
 import logging
+import logging.handlers
 import os
+import queue
 import re
+import sys
+import threading
+from typing import Deque, List, Optional
 
 from bottles.backend.globals import Paths
 from bottles.backend.managers.journal import JournalManager, JournalSeverity
@@ -24,73 +31,195 @@ from bottles.backend.managers.journal import JournalManager, JournalSeverity
 # Set default logging level
 logging.basicConfig(level=logging.DEBUG)
 
+RECENT_LOG_HEADER = "Recent log:"
+
+
+class ColorFormatter(logging.Formatter):
+    """Colors the message by level, only for the records actually emitted."""
+
+    __color_map = {"debug": 37, "info": 36, "warning": 33, "error": 31, "critical": 41}
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = record.message
+        if message and "\n" in message:
+            message = message.replace("\n", "\n\t") + "\n"
+        color_id = self.__color_map.get(record.levelname.lower(), 37)
+        # format() sets record.message again for every handler
+        record.message = "\033[%dm%s\033[0m" % (color_id, message)
+        return super().formatMessage(record)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last records in memory, e.g. for crash reports."""
+
+    def __init__(self, capacity: int = 500):
+        super().__init__()
+        self.records: Deque[logging.LogRecord] = collections.deque(maxlen=capacity)
+        self.setFormatter(
+            logging.Formatter("%(asctime)s (%(levelname)s) %(message)s", "%H:%M:%S")
+        )
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+    def lines(self, limit: Optional[int] = None) -> List[str]:
+        records = list(self.records)
+        if limit is not None:
+            records = records[-limit:] if limit > 0 else []
+        return [self.format(r) for r in records]
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merge the arguments now as they could change before the listener
+        # runs, but leave the formatting (time, colors) to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def handle(self, record):
+        # flush() markers
+        if isinstance(record, threading.Event):
+            record.set()
+            return
+        super().handle(record)
+
 
 class Logger(logging.getLoggerClass()):
     """
     This class is a wrapper for the logging module. It provides
     custom formats for the log messages.
+
+    Each module gets a logger named after it, so the level can be set per
+    subsystem (e.g. "bottles.backend.wine") with set_level() or with the
+    BOTTLES_LOG_LEVELS environment variable, as in
+    "bottles.backend.wine=debug,bottles.frontend=warning". Messages accept
+    %-style arguments, merged only if the record is emitted. With
+    set_async() the records are formatted and written by a listener
+    thread instead of the caller.
     """
 
-    __color_map = {"debug": 37, "info": 36, "warning": 33, "error": 31, "critical": 41}
     __format_log = {
         "fmt": "\033[80m%(asctime)s \033[1m(%(levelname)s)\033[0m %(message)s \033[0m",
         "datefmt": "%H:%M:%S",
     }
+    __configured: bool = False
+    __lock = threading.RLock()
+    __handlers: List[logging.Handler] = []
+    __listener: Optional[_QueueListener] = None
+    recent = RingBufferHandler()
+
+    def __init__(self, formatter=None, name: Optional[str] = None):
+        if name is None:
+            name = sys._getframe(1).f_globals.get("__name__", "bottles")
+        self._logger = logging.getLogger(name)
+
+        with Logger.__lock:
+            if Logger.__configured and formatter is None:
+                return
+            Logger.__configured = True
+
+            handler = logging.StreamHandler()
+            handler.setFormatter(ColorFormatter(**(formatter or self.__format_log)))
+            Logger.__handlers = [handler]
+
+            self.root.setLevel(os.environ.get("LOG_LEVEL") or logging.INFO)
+            for item in os.environ.get("BOTTLES_LOG_LEVELS", "").split(","):
+                subsystem, _sep, level = item.partition("=")
+                if subsystem.strip() and level.strip():
+                    Logger.set_level(level.strip(), subsystem.strip())
+
+            Logger.set_async(
+                Logger.__listener is not None or "BOTTLES_LOG_ASYNC" in os.environ
+            )
 
-    def __color(self, level, message: str):
-        if message and "\n" in message:
-            message = message.replace("\n", "\n\t") + "\n"
-        color_id = self.__color_map[level]
-        return "\033[%dm%s\033[0m" % (color_id, message)
-
-    def __init__(self, formatter=None):
-        if formatter is None:
-            formatter = self.__format_log
-        formatter = logging.Formatter(**formatter)
-
-        self.root.setLevel(os.environ.get("LOG_LEVEL") or logging.INFO)
-        self.root.handlers = []
-
-        handler = logging.StreamHandler()
-        handler.setFormatter(formatter)
-        self.root.addHandler(handler)
+    @staticmethod
+    def set_level(level: int | str, subsystem: Optional[str] = None):
+        """Set the level of a subsystem (module prefix), or the global one."""
+        if isinstance(level, str):
+            level = level.upper()
+        logging.getLogger(subsystem).setLevel(level)
 
-    def debug(self, message, **kwargs):
-        self.root.debug(self.__color("debug", message), **kwargs)
+    @staticmethod
+    def set_async(enabled: bool = True):
+        """Write the records from a listener thread instead of the caller."""
+        with Logger.__lock:
+            if Logger.__listener is not None:
+                Logger.__listener.stop()
+                Logger.__listener = None
+
+            if not enabled:
+                logging.root.handlers = [*Logger.__handlers, Logger.recent]
+                return
+
+            records = queue.SimpleQueue()
+            Logger.__listener = _QueueListener(records, *Logger.__handlers)
+            Logger.__listener.start()
+            logging.root.handlers = [_QueueHandler(records), Logger.recent]
 
-    def info(self, message, jn=False, **kwargs):
-        self.root.info(self.__color("info", message), **kwargs)
+    @staticmethod
+    def flush(timeout: float = 5):
+        """Wait for the queued records to be written."""
+        listener = Logger.__listener
+        if listener is None:
+            return
+        done = threading.Event()
+        listener.queue.put(done)
+        done.wait(timeout)
+
+    def __journal(self, severity: str, message, args: tuple):
+        message = str(message)
+        if args:
+            message = message % args
+        JournalManager.write(severity, message)
+
+    def debug(self, message, *args, **kwargs):
+        self._logger.debug(message, *args, **kwargs)
+
+    def info(self, message, *args, jn=False, **kwargs):
+        self._logger.info(message, *args, **kwargs)
         if jn:
-            JournalManager.write(JournalSeverity.INFO, message)
+            self.__journal(JournalSeverity.INFO, message, args)
 
-    def warning(self, message, jn=True, **kwargs):
-        self.root.warning(self.__color("warning", message), **kwargs)
+    def warning(self, message, *args, jn=True, **kwargs):
+        self._logger.warning(message, *args, **kwargs)
         if jn:
-            JournalManager.write(JournalSeverity.WARNING, message)
+            self.__journal(JournalSeverity.WARNING, message, args)
 
-    def error(self, message, jn=True, **kwargs):
-        self.root.error(self.__color("error", message), **kwargs)
+    def error(self, message, *args, jn=True, **kwargs):
+        self._logger.error(message, *args, **kwargs)
         if jn:
-            JournalManager.write(JournalSeverity.ERROR, message)
+            self.__journal(JournalSeverity.ERROR, message, args)
 
-    def critical(self, message, jn=True, **kwargs):
-        self.root.critical(self.__color("critical", message), **kwargs)
+    def critical(self, message, *args, jn=True, **kwargs):
+        self._logger.critical(message, *args, **kwargs)
         if jn:
-            JournalManager.write(JournalSeverity.CRITICAL, message)
+            self.__journal(JournalSeverity.CRITICAL, message, args)
 
-    def exception(self, message, jn=True, **kwargs):
-        self.root.exception(self.__color("error", message), **kwargs)
+    def exception(self, message, *args, jn=True, **kwargs):
+        self._logger.exception(message, *args, **kwargs)
         if jn:
-            JournalManager.write(JournalSeverity.ERROR, message)
+            self.__journal(JournalSeverity.ERROR, message, args)
 
     @staticmethod
     def write_log(data: list):
         """
         Writes a crash.log file. It finds and replace the user's home directory
-        with "USER" as a proposed standard for crash reports.
+        with "USER" as a proposed standard for crash reports. The latest log
+        records are appended after the RECENT_LOG_HEADER line.
         """
         log_path = f"{Paths.xdg_data_home}/bottles/crash.log"
 
+        Logger.flush()
+        recent = Logger.recent.lines(100)
+        if recent:
+            data = [*data, f"\n{RECENT_LOG_HEADER}\n", *(f"{r}\n" for r in recent)]
+
         with open(log_path, "w") as crash_log:
             for d in data:
                 # replace username with "USER" as standard
@@ -106,7 +235,12 @@ class Logger(logging.getLoggerClass()):
 
     @property
     def debug_mode(self) -> bool:
-        return self.root.level <= logging.DEBUG
+        return self._logger.isEnabledFor(logging.DEBUG)
 
     def set_silent(self):
-        self.root.handlers = []
+        with Logger.__lock:
+            Logger.__handlers = []
+            Logger.set_async(Logger.__listener is not None)
+
+
+atexit.register(Logger.set_async, False)
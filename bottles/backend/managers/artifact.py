@@ -0,0 +1,320 @@
+# artifact.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from bottles.backend.globals import Paths
+from bottles.backend.logger import Logger
+
+logging = Logger()
+
+
+class Artifact(NamedTuple):
+    digest: str
+    path: str
+    size: int
+
+
+class ArtifactStore:
+    """
+    The downloaded files (component archives, dependency and installer
+    files) verified against the checksum of their manifest are stored
+    once by their digest in Paths.artifacts, with an index of the urls
+    they were downloaded from. A file with the same checksum is never
+    downloaded nor verified again: it is linked into Paths.temp, where
+    the managers expect it, so clearing the temp folder doesn't lose it.
+
+    Above max_size the least recently used files are removed, except the
+    pinned ones (e.g. the files of the templates). The hits and misses
+    are counted for the cache details.
+    """
+
+    algorithm = "md5"
+    max_size = 10 * 1024 * 1024 * 1024
+    __conn: Optional[sqlite3.Connection] = None
+    __conn_path: Optional[str] = None
+    __lock = threading.RLock()
+
+    @classmethod
+    def __connect(cls) -> Optional[sqlite3.Connection]:
+        path = os.path.join(Paths.artifacts, "index.sqlite")
+        if cls.__conn is not None and cls.__conn_path == path:
+            return cls.__conn
+        try:
+            os.makedirs(Paths.artifacts, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=3, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS names (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS pins (
+                    owner TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    PRIMARY KEY (owner, digest)
+                );
+                CREATE TABLE IF NOT EXISTS stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                """
+            )
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"The artifacts store is not available: {e}")
+            return None
+        if cls.__conn is not None:
+            cls.__conn.close()
+        cls.__conn, cls.__conn_path = conn, path
+        return conn
+
+    @staticmethod
+    def get_blob_path(digest: str) -> str:
+        return os.path.join(Paths.artifacts, digest[:2], digest)
+
+    @staticmethod
+    def __count(conn: sqlite3.Connection, key: str):
+        conn.execute(
+            "INSERT INTO stats VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (key,),
+        )
+
+    @classmethod
+    def get(cls, url: str, digest: str) -> Optional[Artifact]:
+        """
+        The stored file with the digest, url is recorded as one of its
+        names. There is no lookup by url alone: the file behind a url
+        without a known digest (e.g. a "latest" link) can change.
+        """
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return None
+            try:
+                with conn:
+                    artifact = cls.__find(conn, digest.lower())
+                    if artifact is None:
+                        cls.__count(conn, "misses")
+                        return None
+                    conn.execute(
+                        "UPDATE blobs SET last_used = ? WHERE digest = ?",
+                        (time.time(), artifact.digest),
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO names VALUES (?, ?)",
+                        (url, artifact.digest),
+                    )
+                    cls.__count(conn, "hits")
+                    return artifact
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot read the artifacts store: {e}")
+                return None
+
+    @classmethod
+    def __find(cls, conn: sqlite3.Connection, digest: str) -> Optional[Artifact]:
+        row = conn.execute(
+            "SELECT size FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        path = cls.get_blob_path(digest)
+        try:
+            if os.path.getsize(path) == row[0]:
+                return Artifact(digest, path, row[0])
+        except OSError:
+            pass
+        # removed or damaged behind our back
+        conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        return None
+
+    @classmethod
+    def put(cls, path: str, digest: str, url: str) -> Optional[Artifact]:
+        """
+        Store the verified file at path, hard linked when possible so
+        it is not copied.
+        """
+        digest = digest.lower()
+        blob = cls.get_blob_path(digest)
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return None
+            try:
+                if not os.path.isfile(blob):
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    temp = f"{blob}.{uuid.uuid4().hex[:8]}"
+                    try:
+                        os.link(path, temp)
+                    except OSError:
+                        shutil.copyfile(path, temp)
+                    os.replace(temp, blob)
+                size = os.path.getsize(blob)
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)",
+                        (digest, size, time.time()),
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO names VALUES (?, ?)", (url, digest)
+                    )
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"Cannot store [{path}] in the artifacts store: {e}")
+                return None
+            cls.evict(keep=digest)
+        return Artifact(digest, blob, size)
+
+    @staticmethod
+    def link(artifact: Artifact, dest: str):
+        """Make the stored file available at dest, e.g. in Paths.temp."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(dest)
+        try:
+            os.link(artifact.path, dest)
+        except OSError:
+            shutil.copyfile(artifact.path, dest)
+
+    @classmethod
+    def pin(cls, pins: Dict[str, Iterable[str]]):
+        """Replace the pins, the urls of the files each owner needs."""
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute("DELETE FROM pins")
+                    for owner, urls in pins.items():
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO pins "
+                            "SELECT ?, digest FROM names WHERE url = ?",
+                            [(owner, url) for url in urls],
+                        )
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot pin the artifacts: {e}")
+
+    @classmethod
+    def evict(cls, keep: Optional[str] = None):
+        """Remove the least recently used files above max_size."""
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    total = conn.execute(
+                        "SELECT COALESCE(SUM(size), 0) FROM blobs"
+                    ).fetchone()[0]
+                    if total <= cls.max_size:
+                        return
+                    rows = conn.execute(
+                        "SELECT digest, size FROM blobs WHERE digest != ? "
+                        "AND digest NOT IN (SELECT digest FROM pins) "
+                        "ORDER BY last_used",
+                        (keep or "",),
+                    ).fetchall()
+                    for digest, size in rows:
+                        if total <= cls.max_size:
+                            break
+                        cls.__remove(conn, digest)
+                        total -= size
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot evict the artifacts: {e}")
+
+    @classmethod
+    def __remove(cls, conn: sqlite3.Connection, digest: str):
+        with contextlib.suppress(OSError):
+            os.remove(cls.get_blob_path(digest))
+        conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        conn.execute("DELETE FROM names WHERE digest = ?", (digest,))
+
+    @classmethod
+    def clear(cls, keep_pinned: bool = True):
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    query = "SELECT digest FROM blobs"
+                    if keep_pinned:
+                        query += " WHERE digest NOT IN (SELECT digest FROM pins)"
+                    for (digest,) in conn.execute(query).fetchall():
+                        cls.__remove(conn, digest)
+                    conn.execute("DELETE FROM stats")
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot clear the artifacts store: {e}")
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        stats = {"files": 0, "size": 0, "pinned": 0, "hits": 0, "misses": 0}
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return stats
+            try:
+                stats["files"], stats["size"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+                ).fetchone()
+                stats["pinned"] = conn.execute(
+                    "SELECT COUNT(DISTINCT digest) FROM pins "
+                    "WHERE digest IN (SELECT digest FROM blobs)"
+                ).fetchone()[0]
+                for key, value in conn.execute("SELECT key, value FROM stats"):
+                    stats[key] = value
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot read the artifacts store: {e}")
+        return stats
+
+    @classmethod
+    def get_linked_size(cls, path: str) -> int:
+        """The size of the stored files linked under path."""
+        inodes = set()
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return 0
+            with contextlib.suppress(sqlite3.Error):
+                for (digest,) in conn.execute("SELECT digest FROM blobs"):
+                    with contextlib.suppress(OSError):
+                        stat = os.stat(cls.get_blob_path(digest))
+                        inodes.add((stat.st_dev, stat.st_ino))
+
+        size = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                with contextlib.suppress(OSError):
+                    stat = os.lstat(os.path.join(root, name))
+                    if (stat.st_dev, stat.st_ino) in inodes:
+                        size += stat.st_size
+        return size
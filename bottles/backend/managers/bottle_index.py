@@ -0,0 +1,207 @@
+# bottle_index.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import hashlib
+import io
+import os
+from dataclasses import dataclass, field
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bottles.backend.globals import Paths
+from bottles.backend.logger import Logger
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.utils import storage, yaml
+
+logging = Logger()
+
+
+@dataclass
+class BottlesDiff:
+    """Names of the bottles added, removed or changed by a check_bottles."""
+
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+class BottleIndexManager:
+    """
+    The BottleIndexManager keeps a persistent index of the bottles
+    configurations in the bottle_index.yml file. For each bottle.yml it
+    stores size, mtime, content digest and whether the startup maintenance
+    already ran on that content. Parsed configurations are kept in memory,
+    so a bottle is parsed again only if its file actually changed.
+    """
+
+    index_path: str = Paths.bottle_index
+    __index: dict = {}
+    __configs: Dict[str, BottleConfig] = {}
+    __loaded: bool = False
+    __dirty: bool = False
+    __lock = RLock()
+
+    def __init__(self):
+        with self.__lock:
+            if not BottleIndexManager.__loaded:
+                self.load_index()
+
+    def load_index(self):
+        """Loads the index from disk, starting empty if unreadable."""
+        index = None
+        with contextlib.suppress(FileNotFoundError, yaml.YAMLError):
+            with open(self.index_path, "r") as f:
+                index = yaml.load(f)
+
+        BottleIndexManager.__index = index if isinstance(index, dict) else {}
+        BottleIndexManager.__configs = {}
+        BottleIndexManager.__loaded = True
+        BottleIndexManager.__dirty = False
+
+    def save_index(self):
+        """Writes the index to disk if something changed since last save."""
+        with self.__lock:
+            if not self.__dirty:
+                return
+            with contextlib.suppress(IOError, OSError):
+                storage.write_yaml(self.index_path, self.__index)
+            BottleIndexManager.__dirty = False
+
+    @staticmethod
+    def __stat(path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def __read(path: str) -> Optional[Tuple[bytes, str]]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data, hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def load(self, config_path: str) -> Tuple[Optional[BottleConfig], bool, bool]:
+        """
+        Return (config, maintained, parsed) for the given bottle.yml.
+        The cached config is returned while the file is unchanged, parsed
+        is True only when the file had to be parsed again. config is None
+        if the file is missing or invalid.
+        """
+        stat = self.__stat(config_path)
+        if stat is None:
+            self.forget([config_path])
+            return None, False, False
+
+        with self.__lock:
+            entry = self.__index.get(config_path) or {}
+            cached = self.__configs.get(config_path)
+            if cached is not None and entry.get("stat") == stat:
+                return cached, bool(entry.get("maintained")), False
+
+        content = self.__read(config_path)
+        if content is None:
+            return None, False, False
+        data, digest = content
+
+        with self.__lock:
+            same_content = entry.get("digest") == digest
+            if cached is not None and same_content:
+                entry["stat"] = stat
+                self.__index[config_path] = entry
+                BottleIndexManager.__dirty = True
+                return cached, bool(entry.get("maintained")), False
+
+        config_load = BottleConfig.load(io.TextIOWrapper(io.BytesIO(data)))
+        if not config_load.status:
+            return None, False, False
+
+        config = config_load.data
+        maintained = same_content and bool(entry.get("maintained"))
+        with self.__lock:
+            self.__configs[config_path] = config
+            self.__index[config_path] = {
+                "stat": stat,
+                "digest": digest,
+                "maintained": maintained,
+            }
+            BottleIndexManager.__dirty = True
+
+        return config, maintained, True
+
+    def update(
+        self,
+        config_path: str,
+        config: BottleConfig,
+        maintained: Optional[bool] = None,
+    ):
+        """
+        Record the current state of a bottle.yml after Bottles wrote it,
+        so the next lookup doesn't consider it changed. The maintained
+        flag is kept unless given.
+        """
+        stat = self.__stat(config_path)
+        content = self.__read(config_path)
+        if stat is None or content is None:
+            return
+
+        with self.__lock:
+            entry = self.__index.get(config_path) or {}
+            if maintained is None:
+                maintained = bool(entry.get("maintained"))
+            self.__configs[config_path] = config
+            self.__index[config_path] = {
+                "stat": stat,
+                "digest": content[1],
+                "maintained": maintained,
+            }
+            BottleIndexManager.__dirty = True
+
+    def forget(self, config_paths: Iterable[str]):
+        with self.__lock:
+            for config_path in config_paths:
+                self.__configs.pop(config_path, None)
+                if self.__index.pop(config_path, None) is not None:
+                    BottleIndexManager.__dirty = True
+
+    def prune(self, keep: Iterable[str]):
+        """Forget every indexed bottle.yml which is not in keep."""
+        keep = set(keep)
+        with self.__lock:
+            self.forget([p for p in self.__index if p not in keep])
+
+    @staticmethod
+    def diff(
+        previous: Dict[str, BottleConfig], current: Dict[str, BottleConfig]
+    ) -> BottlesDiff:
+        return BottlesDiff(
+            added=[n for n in current if n not in previous],
+            removed=[n for n in previous if n not in current],
+            changed=[
+                n
+                for n, config in current.items()
+                if n in previous and config is not previous[n] and config != previous[n]
+            ],
+        )
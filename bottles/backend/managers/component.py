@@ -23,11 +23,10 @@ from functools import lru_cache
 from threading import Event
 from typing import Optional
 
-import pycurl
-
 from bottles.backend.downloader import Downloader
 from bottles.backend.globals import Paths
 from bottles.backend.logger import Logger
+from bottles.backend.managers.artifact import ArtifactStore
 from bottles.backend.models.result import Result
 from bottles.backend.state import (
     LockManager,
@@ -37,15 +36,21 @@ from bottles.backend.state import (
     TaskManager,
     TaskStreamUpdateHandler,
 )
+from bottles.backend.utils.archive import TarExtractor, UnsafeMemberError
 from bottles.backend.utils.file import FileUtils
 from bottles.backend.utils.generic import is_glibc_min_available
+from bottles.backend.utils.hardware import HardwareProfile
 from bottles.backend.utils.manager import ManagerUtils
+from bottles.backend.wine.winecommand import WineCommand
 
 logging = Logger()
 
 
 # noinspection PyTypeChecker
 class ComponentManager:
+    # parallel connections for the downloads large enough to be split
+    download_segments = 4
+
     def __init__(self, manager, offline: bool = False):
         self.__manager = manager
         self.__repo = manager.repository_manager.get_repo("components", offline)
@@ -162,118 +167,107 @@ class ComponentManager:
             return Result(True)
 
         existing_file = rename if rename else file
-        temp_dest = os.path.join(Paths.temp, file)
-        just_downloaded = False
-
         file_path = os.path.join(Paths.temp, existing_file)
+        if os.environ.get("BOTTLES_SKIP_CHECKSUM"):
+            checksum = ""
+        checksum = (checksum or "").lower()
+
+        # without a checksum, the file behind the url may have changed
+        artifact = ArtifactStore.get(download_url, checksum) if checksum else None
+        if artifact is not None:
+            """
+            The file was downloaded before, by this or another bottle:
+            it is linked from the artifacts store. The store is content
+            addressed, the file is not verified again.
+            """
+            ArtifactStore.link(artifact, file_path)
+            logging.info(f"Using [{existing_file}] from the artifacts store.")
+            if not external_task:
+                TaskManager.remove(task_id)
+            return Result(
+                True, data={"file_path": file_path, "checksum": artifact.digest}
+            )
+
         if os.path.isfile(file_path):
             """
             Check if the file already exists in the /temp directory.
-            If it's a 0-byte empty file, remove it to allow a fresh download.
-            Otherwise, skip the download.
+            If it's a 0-byte empty file or it doesn't match the checksum,
+            remove it to allow a fresh download. Otherwise, skip the
+            download. The digest of the files we downloaded is stored,
+            so they are not read again.
             """
-            if os.path.getsize(file_path) == 0:
+            size = os.path.getsize(file_path)
+            local_checksum = None
+            if checksum and size > 0:
+                local_checksum = FileUtils.get_checksum(file_path)
+
+            if size == 0:
                 logging.warning(
                     f"File [{existing_file}] is a 0-byte empty file. Removing to force re-download."
                 )
                 os.remove(file_path)
-            else:
+            elif local_checksum and local_checksum != checksum:
                 logging.warning(
-                    f"File [{existing_file}] already exists in temp, skipping."
+                    f"File [{existing_file}] in temp doesn't match the checksum. "
+                    "Removing to force re-download."
                 )
-                return Result(True)
-
-        if not os.path.isfile(file_path):
-            """
-            As some urls can be redirect, we need to take care of this
-            and make sure to use the final url. This check should be
-            skipped for large files (e.g. runners).
-            """
-            c = pycurl.Curl()
-            _proxy = os.environ.get("http_proxy") or os.environ.get("https_proxy")
-            if _proxy:
-                c.setopt(pycurl.PROXY, _proxy)
-            try:
-                c.setopt(c.URL, download_url)  # type: ignore
-                c.setopt(c.FOLLOWLOCATION, True)  # type: ignore
-                c.setopt(c.HTTPHEADER, ["User-Agent: curl/7.79.1"])  # type: ignore
-                c.setopt(c.NOBODY, True)  # type: ignore
-                c.perform()
-
-                req_code = c.getinfo(c.RESPONSE_CODE)  # type: ignore
-                download_url = c.getinfo(c.EFFECTIVE_URL)  # type: ignore
-            except pycurl.error:
-                logging.exception(f"Failed to download [{download_url}]")
-                if not external_task:
-                    TaskManager.remove(task_id)
-                return Result(False)
-            finally:
-                c.close()
-
-            if req_code == 200:
-                """
-                If the status code is 200, the resource should be available
-                and the download should be started. Any exceptions return
-                False and the download is removed from the download manager.
-                """
-                res = Downloader(
-                    url=download_url,
-                    file=temp_dest,
-                    update_func=update_func,
-                    cancel_event=cancel_event,
-                ).download()
-
-                if not res.ok:
-                    if not external_task:
-                        TaskManager.remove(task_id)
-                    return res
-
-                if not os.path.isfile(temp_dest):
-                    """Fail if the file is not available in the /temp directory."""
-                    if not external_task:
-                        TaskManager.remove(task_id)
-                    return Result(False)
-
-                just_downloaded = True
+                os.remove(file_path)
             else:
                 logging.warning(
-                    f"Failed to download [{download_url}] with code: {req_code} != 200"
+                    f"File [{existing_file}] already exists in temp, skipping."
                 )
+                if local_checksum:
+                    ArtifactStore.put(file_path, local_checksum, download_url)
                 if not external_task:
                     TaskManager.remove(task_id)
-                return Result(False)
-
-        file_path = os.path.join(Paths.temp, existing_file)
-        if rename and just_downloaded:
-            """Renaming the downloaded file if requested."""
-            logging.info(f"Renaming [{file}] to [{rename}].")
-            file_path = os.path.join(Paths.temp, rename)
-            os.rename(temp_dest, file_path)
+                return Result(
+                    True, data={"file_path": file_path, "checksum": local_checksum}
+                )
 
-        if checksum and not os.environ.get("BOTTLES_SKIP_CHECKSUM"):
+        """
+        The downloader follows the redirects and resumes a previous
+        partial download of the same url. Large files (e.g. runners)
+        are fetched by parallel connections and hashed while they are
+        written, straight to the renamed path if requested. Any failure
+        returns False and the download is removed from the download
+        manager.
+        """
+        res = Downloader(
+            url=download_url,
+            file=file_path,
+            update_func=update_func,
+            cancel_event=cancel_event,
+            segments=self.download_segments,
+            algorithm=ArtifactStore.algorithm,
+        ).download()
+
+        if not res.ok or not os.path.isfile(file_path):
+            """Fail if the file is not available in the /temp directory."""
+            if not external_task:
+                TaskManager.remove(task_id)
+            return res if not res.ok else Result(False)
+
+        local_checksum = res.data["checksum"]
+        if checksum and local_checksum != checksum:
             """
             Compare the checksum of the downloaded file with the one
             provided by the caller. If they don't match, remove the
             file from the /temp directory, remove the entry from the
             task manager and return False.
             """
-            checksum = checksum.lower()
-            local_checksum = FileUtils().get_checksum(file_path)
-
-            if local_checksum and local_checksum != checksum:
-                logging.error(f"Downloaded file [{file}] looks corrupted.")
-                logging.error(
-                    f"Source cksum: [{checksum}] downloaded: [{local_checksum}]"
-                )
-                logging.error(f"Removing corrupted file [{file}].")
-                os.remove(file_path)
-                if not external_task:
-                    TaskManager.remove(task_id)
-                return Result(False)
+            logging.error(f"Downloaded file [{file}] looks corrupted.")
+            logging.error(f"Source cksum: [{checksum}] downloaded: [{local_checksum}]")
+            logging.error(f"Removing corrupted file [{file}].")
+            os.remove(file_path)
+            if not external_task:
+                TaskManager.remove(task_id)
+            return Result(False)
 
+        if checksum:
+            ArtifactStore.put(file_path, local_checksum, download_url)
         if not external_task:
             TaskManager.remove(task_id)
-        return Result(True)
+        return Result(True, data={"file_path": file_path, "checksum": local_checksum})
 
     @staticmethod
     def extract(name: str, component: str, archive: str) -> bool:
@@ -297,24 +291,27 @@ class ComponentManager:
             logging.error(f"Unknown component [{component}].")
             return False
 
+        extractor = TarExtractor(path)
         try:
             """
-            Try to extract the archive in the /temp directory.
+            Try to extract the archive in the /temp directory, in a
+            single pass: the root folder is the one of the first member.
             If the extraction fails, remove the archive from the /temp
             directory and return False. The common cause of a failed
             extraction is that the archive is corrupted.
             """
-            tar = tarfile.open(f"{Paths.temp}/{archive}")
-            root_dir = tar.getnames()[0]
-            tar.extractall(path)
-            tar.close()
-        except (tarfile.TarError, IOError, EOFError):
+            root_dir = extractor.extract(os.path.join(Paths.temp, archive))
+        except (tarfile.TarError, IOError, EOFError) as e:
             with contextlib.suppress(FileNotFoundError):
                 os.remove(os.path.join(Paths.temp, archive))
-            with contextlib.suppress(FileNotFoundError):
-                shutil.rmtree(os.path.join(path, archive[:-7]))
+            if extractor.root:
+                with contextlib.suppress(FileNotFoundError):
+                    shutil.rmtree(os.path.join(path, extractor.root))
 
-            logging.error("Extraction failed! Archive ends earlier than expected.")
+            if isinstance(e, UnsafeMemberError):
+                logging.error(f"Extraction failed! {e}")
+            else:
+                logging.error("Extraction failed! Archive ends earlier than expected.")
             return False
 
         if root_dir.endswith("x86_64"):
@@ -381,7 +378,10 @@ class ComponentManager:
             """
             archive = manifest["File"][0]["rename"]
 
-        self.extract(component_name, component_type, archive)
+        if not self.extract(component_name, component_type, archive):
+            if func:
+                func(status=Status.FAILED)
+            return Result(False, message="Extraction failed")
 
         """
         Execute Post Install if the component has it defined
@@ -422,6 +422,10 @@ class ComponentManager:
             self.__manager.check_winebridge()
 
         self.__manager.organize_components()
+        # the environments may point to the previous components, and
+        # the GPU profile to the previous ICD loaders or nvngx
+        WineCommand.env_cache.invalidate()
+        HardwareProfile.invalidate()
         logging.info(f"Component installed: {component_type} {component_name}", jn=True)
 
         return Result(True)
@@ -21,7 +21,7 @@ import os
 from bottles.backend.globals import Paths
 from bottles.backend.logger import Logger
 from bottles.backend.models.samples import Samples
-from bottles.backend.utils import yaml
+from bottles.backend.utils import storage
 
 logging = Logger()
 
@@ -47,10 +47,9 @@ class DataManager:
 
     def __get_data(self):
         try:
-            with open(self.__p_data, "r") as s:
-                self.__data = yaml.load(s)
-                if self.__data is None:
-                    raise AttributeError
+            self.__data = storage.load_yaml(self.__p_data)
+            if self.__data is None:
+                raise AttributeError
         except FileNotFoundError:
             logging.error(
                 "Data file not found. Creating new one.",
@@ -65,8 +64,7 @@ class DataManager:
     def __create_data_file(self):
         if not os.path.exists(Paths.base):
             os.makedirs(Paths.base)
-        with open(self.__p_data, "w") as s:
-            yaml.dump(Samples.data, s)
+        storage.write_yaml(self.__p_data, Samples.data)
         self.__get_data()
 
     def list(self):
@@ -87,16 +85,14 @@ class DataManager:
                 self.__data[key] = value
 
         with contextlib.suppress(FileNotFoundError):
-            with open(self.__p_data, "w") as s:
-                yaml.dump(self.__data, s)
+            storage.write_yaml(self.__p_data, self.__data)
 
     def remove(self, key):
         """Removes a key from the data dictionary."""
         if self.__data.get(key):
             del self.__data[key]
             with contextlib.suppress(FileNotFoundError):
-                with open(self.__p_data, "w") as s:
-                    yaml.dump(self.__data, s)
+                storage.write_yaml(self.__p_data, self.__data)
 
     def get(self, key, default=None):
         """Returns the value of a key in the data dictionary."""
@@ -18,9 +18,11 @@
 import os
 import shutil
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from glob import glob
-from typing import Callable, Optional
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
 
 from gettext import gettext as _
 
@@ -41,12 +43,26 @@ from bottles.backend.wine.reg import Reg, RegItem
 from bottles.backend.wine.regkeys import RegKeys
 from bottles.backend.wine.regsvr32 import Regsvr32
 from bottles.backend.wine.uninstaller import Uninstaller
+from bottles.backend.wine.winecommand import WineCommand
 from bottles.backend.wine.winedbg import WineDbg
 
 logging = Logger()
 
 
+# the steps downloading their url before they run
+DOWNLOAD_ACTIONS = [
+    "download_archive",
+    "install_exe",
+    "install_msi",
+    "cab_extract",
+    "archive_extract",
+]
+
+
 class DependencyManager:
+    # parallel downloads when prefetching the files of the steps
+    prefetch_workers = 4
+
     def __init__(self, manager, offline: bool = False):
         self.__manager = manager
         self.__repo = manager.repository_manager.get_repo("dependencies", offline)
@@ -155,16 +171,142 @@ class DependencyManager:
             action, _("Running {0}…").format(action.replace("_", " "))
         )
 
+    def __get_closure(self, config: BottleConfig, name: str) -> List[Tuple[str, dict]]:
+        """
+        The manifests of the dependency and of its prerequisites missing
+        in the bottle (the Dependencies of each manifest, recursively),
+        each one after its prerequisites, as install() walks them.
+        """
+        closure = []
+        seen = set()
+
+        def visit(_name: str, prerequisite: bool):
+            if _name in seen:
+                return
+            seen.add(_name)
+            if prerequisite and (
+                _name in config.Installed_Dependencies
+                or _name not in self.__manager.supported_dependencies
+            ):
+                return
+            manifest = self.get_dependency(_name)
+            if not isinstance(manifest, dict):
+                return
+            for _ext_dep in manifest.get("Dependencies") or []:
+                visit(_ext_dep, True)
+            closure.append((_name, manifest))
+
+        visit(name, False)
+        return closure
+
+    def prefetch(
+        self,
+        config: BottleConfig,
+        dependencies: List[str],
+        task: Optional[Task] = None,
+        progress_progress_cb: Optional[Callable[[Optional[float]], None]] = None,
+    ) -> Result:
+        """
+        Download the files of the steps of the given dependencies and of
+        their missing prerequisites at once, prefetch_workers at a time,
+        so the steps find them in the artifacts store and the whole takes
+        as long as the slowest download. Failed downloads are listed in
+        the data, the steps will try them again. The steps without a
+        file name are left to the steps, which report them. It never
+        raises, it is only an optimization.
+        """
+        try:
+            return self.__prefetch(config, dependencies, task, progress_progress_cb)
+        except Exception as e:
+            logging.warning(f"Cannot prefetch the files: {e}")
+            return Result(False, data={"failed": []})
+
+    def __prefetch(
+        self,
+        config: BottleConfig,
+        dependencies: List[str],
+        task: Optional[Task],
+        progress_progress_cb: Optional[Callable[[Optional[float]], None]],
+    ) -> Result:
+        steps: Dict[str, dict] = {}
+        for name in dependencies:
+            for _dep, manifest in self.__get_closure(config, name):
+                for step in manifest.get("Steps") or []:
+                    if step.get("action") not in DOWNLOAD_ACTIONS:
+                        continue
+                    if config.Arch not in step.get("for", "win64_win32"):
+                        continue
+                    if not validate_url(step.get("url") or ""):
+                        continue
+                    # one download per file name, they share the temp folder
+                    file = step.get("rename") or step.get("file_name")
+                    if file:
+                        steps.setdefault(file, step)
+
+        if not steps:
+            return Result(True, data={"failed": []})
+
+        lock = Lock()
+        progress: Dict[str, Tuple[int, int]] = {}
+
+        def download(file: str, step: dict) -> Result:
+            def update(
+                received_size: int = 0,
+                total_size: int = 0,
+                status: Optional[Status] = None,
+            ):
+                if status is not None:
+                    return
+                with lock:
+                    progress[file] = (received_size, total_size)
+                    received = sum(p[0] for p in progress.values())
+                    total = sum(p[1] for p in progress.values())
+                if task is not None:
+                    task.stream_update(received, total)
+                if total:
+                    self.__notify_progress_fraction(
+                        progress_progress_cb, received / total
+                    )
+
+            try:
+                return self.__manager.component_manager.download(
+                    download_url=step["url"],
+                    file=step.get("file_name") or file,
+                    rename=step.get("rename") or "",
+                    checksum=step.get("file_checksum") or "",
+                    func=update,
+                    task=task,
+                )
+            except Exception as e:
+                logging.warning(f"Cannot prefetch {file}: {e}")
+                return Result(False)
+
+        workers = min(self.prefetch_workers, len(steps))
+        logging.info(f"Prefetching {len(steps)} file(s), {workers} at a time.")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda item: download(*item), steps.items()))
+
+        failed = [file for file, res in zip(steps, results) if not res.ok]
+        if failed:
+            logging.warning(f"Cannot prefetch {', '.join(failed)}.")
+        return Result(not failed, data={"failed": failed})
+
     def install(
         self,
         config: BottleConfig,
         dependency: list,
         progress_cb: Optional[Callable[[str], None]] = None,
         progress_progress_cb: Optional[Callable[[Optional[float]], None]] = None,
+        prefetch: bool = True,
     ) -> Result:
         """
         Install a given dependency in a bottle. It will
         return True if the installation was successful.
+
+        The files of all the steps, prerequisites included, are first
+        downloaded in parallel (see prefetch), then the steps run in
+        order. The prerequisites are installed with prefetch=False, as
+        are the dependencies of a bundle prefetched at once.
         """
         uninstaller = True
         installed_new = False
@@ -181,6 +323,7 @@ class DependencyManager:
 
         task_id = TaskManager.add(Task(title=dependency[0]))
         task = TaskManager.get(task_id)
+        env_stats = WineCommand.env_cache.stats()
 
         self.__notify_progress(progress_cb, _("Preparing installation…"), task=task)
 
@@ -198,6 +341,16 @@ class DependencyManager:
                 status=False, message=f"Cannot find manifest for {dependency[0]}."
             )
 
+        if prefetch:
+            self.__notify_progress(progress_cb, _("Downloading files…"), task=task)
+            self.prefetch(
+                config,
+                [dependency[0]],
+                task=task,
+                progress_progress_cb=progress_progress_cb,
+            )
+            self.__notify_progress_fraction(progress_progress_cb, None)
+
         if manifest.get("Dependencies"):
             """
             If the manifest has dependencies, we need to install them
@@ -218,6 +371,7 @@ class DependencyManager:
                         [_ext_dep, _dep],
                         progress_cb=progress_cb,
                         progress_progress_cb=progress_progress_cb,
+                        prefetch=False,
                     )
                     if not _res.status:
                         return _res
@@ -251,40 +405,39 @@ class DependencyManager:
             if not res.data.get("uninstaller"):
                 uninstaller = False
 
-        if dependency[0] not in config.Installed_Dependencies:
-            """
-            If the dependency is not already listed in the installed
-            dependencies list of the bottle, add it.
-            """
-            dependencies = [dependency[0]]
-
-            if config.Installed_Dependencies:
-                dependencies = config.Installed_Dependencies + [dependency[0]]
-
-            self.__manager.update_config(
-                config=config, key="Installed_Dependencies", value=dependencies
-            )
-            installed_new = True
-
-        if manifest.get("Uninstaller"):
-            """
-            If the manifest has an uninstaller, add it to the
-            uninstaller list in the bottle config.
-            Set it to NO_UNINSTALLER if the dependency cannot be uninstalled.
-            """
-            uninstaller = manifest.get("Uninstaller")
-
-        if dependency[0] not in config.Installed_Dependencies:
-            self.__manager.update_config(
-                config, dependency[0], uninstaller, "Uninstallers"
-            )
-            installed_new = True
+        # both entries are written to the bottle config at once
+        with self.__manager.config_transaction(config) as transaction:
+            if dependency[0] not in config.Installed_Dependencies:
+                """
+                If the dependency is not already listed in the installed
+                dependencies list of the bottle, add it.
+                """
+                dependencies = [dependency[0]]
+
+                if config.Installed_Dependencies:
+                    dependencies = config.Installed_Dependencies + [dependency[0]]
+
+                transaction.set("Installed_Dependencies", dependencies)
+                installed_new = True
+
+            if manifest.get("Uninstaller"):
+                """
+                If the manifest has an uninstaller, add it to the
+                uninstaller list in the bottle config.
+                Set it to NO_UNINSTALLER if the dependency cannot be uninstalled.
+                """
+                uninstaller = manifest.get("Uninstaller")
+
+            if dependency[0] not in config.Installed_Dependencies:
+                transaction.set(dependency[0], uninstaller, "Uninstallers")
+                installed_new = True
 
         # Remove entry from task manager
         TaskManager.remove(task_id)
 
         # Hide installation button and show remove button
         logging.info(f"Dependency installed: {dependency[0]} in {config.Name}", jn=True)
+        self.__log_env_cache(dependency[0], env_stats)
 
         if installed_new:
             RegistryRuleManager.apply_rules(config, trigger="dependencies")
@@ -294,6 +447,17 @@ class DependencyManager:
             return Result(status=True, data={"uninstaller": False})
         return Result(status=True, data={"uninstaller": True})
 
+    @staticmethod
+    def __log_env_cache(dependency: str, before: dict):
+        after = WineCommand.env_cache.stats()
+        hits = after["hits"] - before["hits"]
+        misses = after["misses"] - before["misses"]
+        if hits + misses:
+            logging.info(
+                f"Environment cache for {dependency}: {hits} hit(s), "
+                f"{misses} miss(es) over {hits + misses} wine command(s)"
+            )
+
     def __perform_steps(
         self,
         config: BottleConfig,
@@ -433,7 +597,7 @@ class DependencyManager:
             task=task,
         )
 
-        return download
+        return download.ok
 
     def __step_install_exe_msi(
         self,
@@ -461,7 +625,7 @@ class DependencyManager:
         if step.get("rename"):
             file = step.get("rename")
 
-        if download:
+        if download.ok:
             if step.get("url").startswith("temp/"):
                 _file = step.get("url").replace("temp/", f"{Paths.temp}/")
                 file = f"{_file}/{file}"
@@ -522,7 +686,7 @@ class DependencyManager:
                 task=task,
             )
 
-            if download:
+            if download.ok:
                 if step.get("rename"):
                     file = step.get("rename")
                 else:
@@ -618,7 +782,7 @@ class DependencyManager:
             task=task,
         )
 
-        if not download:
+        if not download.ok:
             return False
 
         if step.get("rename"):
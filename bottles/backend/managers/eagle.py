@@ -220,7 +220,7 @@ class EagleManager:
     def _send_step(self, msg: str, delay: bool = True) -> None:
         """Send a step update to the UI with optional delay."""
         SignalManager.send(Signals.EagleStep, Result(status=True, data=msg))
-        logging.info(f"[Eagle] {msg}")
+        logging.info("[Eagle] %s", msg)
         if delay:
             time.sleep(STEP_DELAY)
 
@@ -132,6 +132,12 @@ class InstallerManager:
     ):
         """Install a list of dependencies"""
         _config = config
+        dependency_manager = self.__manager.dependency_manager
+
+        # the files of the whole list are downloaded at once
+        dependency_manager.prefetch(
+            _config, [d for d in dependencies if d not in config.Installed_Dependencies]
+        )
 
         for dep in dependencies:
             if is_final:
@@ -141,7 +147,7 @@ class InstallerManager:
                 continue
 
             _dep = [dep, self.__manager.supported_dependencies.get(dep)]
-            res = self.__manager.dependency_manager.install(_config, _dep)
+            res = dependency_manager.install(_config, _dep, prefetch=False)
 
             if not res.ok:
                 return False
@@ -193,9 +199,9 @@ class InstallerManager:
                         checksum=st.get("file_checksum"),
                     )
                 else:
-                    download = True
+                    download = Result(True)
 
-                if download:
+                if download.ok:
                     if st["url"] != "local":
                         if st.get("rename"):
                             file = st.get("rename")
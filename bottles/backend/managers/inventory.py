@@ -0,0 +1,114 @@
+# inventory.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import copy
+import os
+from threading import RLock
+from typing import Any, Callable, Optional
+
+from bottles.backend.globals import Paths
+from bottles.backend.logger import Logger
+from bottles.backend.utils import storage, yaml
+
+logging = Logger()
+
+
+class InventoryManager:
+    """
+    The InventoryManager keeps a persistent snapshot of the installed
+    components in the inventory.yml file. Each entry is keyed by the
+    stat signature (real path, device, inode, mtime) of the path it was
+    computed from, so a scan is repeated only when that path changed.
+    """
+
+    inventory_path: str = Paths.inventory
+    __inventory: dict = {}
+    __loaded: bool = False
+    __lock = RLock()
+
+    def __init__(self):
+        with self.__lock:
+            if not InventoryManager.__loaded:
+                self.load_inventory()
+
+    def load_inventory(self):
+        """Loads the inventory from disk, starting empty if unreadable."""
+        inventory = None
+        with contextlib.suppress(FileNotFoundError, yaml.YAMLError):
+            with open(self.inventory_path, "r") as f:
+                inventory = yaml.load(f)
+
+        InventoryManager.__inventory = inventory if isinstance(inventory, dict) else {}
+        InventoryManager.__loaded = True
+
+    def save_inventory(self):
+        with contextlib.suppress(IOError, OSError):
+            storage.write_yaml(self.inventory_path, self.__inventory)
+
+    @staticmethod
+    def signature(path: Optional[str]) -> Optional[list]:
+        """Return the stat signature of path, None if it doesn't exist."""
+        if not path:
+            return None
+        try:
+            real_path = os.path.realpath(path)
+            stat = os.stat(real_path)
+        except OSError:
+            return None
+        return [real_path, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+    def get(self, key: str, path: Optional[str], scan: Callable[[], Any]) -> Any:
+        """
+        Return the value cached for key if path is unchanged since it was
+        stored, otherwise call scan, store its result and return it.
+        """
+        signature = self.signature(path)
+
+        with self.__lock:
+            entry = self.__inventory.get(key)
+            if (
+                signature is not None
+                and isinstance(entry, dict)
+                and entry.get("signature") == signature
+            ):
+                return copy.deepcopy(entry.get("value"))
+
+        value = scan()
+
+        with self.__lock:
+            if signature is None:
+                if self.__inventory.pop(key, None) is None:
+                    return value
+            else:
+                logging.debug(f"Inventory entry {key} updated.")
+                self.__inventory[key] = {
+                    "signature": signature,
+                    "value": copy.deepcopy(value),
+                }
+            self.save_inventory()
+
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or the whole inventory if key is None."""
+        with self.__lock:
+            if key is None:
+                self.__inventory.clear()
+            else:
+                self.__inventory.pop(key, None)
+            self.save_inventory()
@@ -15,15 +15,21 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import atexit
 import contextlib
 import os
-import shutil
+import queue
+import sqlite3
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from bottles.backend.globals import Paths
-from bottles.backend.utils import yaml
+from bottles.backend.utils import storage, yaml
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
 class JournalSeverity:
@@ -39,75 +45,168 @@ class JournalSeverity:
 
 class JournalManager:
     """
-    Store and retrieve data from the journal file (YAML). This should
-    contain only important Bottles events.
+    Store and retrieve data from the journal. This should contain only
+    important Bottles events.
+
+    Events are appended to an SQLite database (WAL mode) indexed by
+    timestamp. write() only queues the event, a writer thread inserts the
+    queued events in batches and prunes the old ones from time to time,
+    so logging never waits for the disk.
     """
 
-    path = f"{Paths.base}/journal.yml"
+    path = f"{Paths.base}/journal.sqlite"
+    legacy_path = f"{Paths.base}/journal.yml"
+    retention = timedelta(days=30)
+    prune_interval = 3600  # seconds
+
+    __queue: "queue.Queue[Tuple[str, str, str, str]]" = queue.Queue()
+    __writer: Optional[threading.Thread] = None
+    __lock = threading.Lock()
+    __ready_path: Optional[str] = None
+    __last_prune: float = 0.0
 
     @staticmethod
-    def __get_journal() -> dict:
-        """Return the journal as a dictionary."""
-        if not os.path.exists(JournalManager.path):
-            with open(JournalManager.path, "w") as f:
-                yaml.dump({}, f)
+    def __connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(JournalManager.path, timeout=3)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        return conn
 
-        with open(JournalManager.path, "r") as f:
-            try:
-                journal = yaml.load(f)
-            except yaml.YAMLError:
-                journal_backup = f"{JournalManager.path}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.bak"
-                shutil.copy2(JournalManager.path, journal_backup)
-                journal = {}
+    @staticmethod
+    def __ensure_db():
+        """Create the database and import the old YAML journal, once."""
+        with JournalManager.__lock:
+            if JournalManager.__ready_path == JournalManager.path:
+                return
+
+            os.makedirs(os.path.dirname(JournalManager.path), exist_ok=True)
+            with contextlib.closing(JournalManager.__connect()) as conn, conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS events (
+                        id TEXT PRIMARY KEY,
+                        severity TEXT NOT NULL,
+                        message TEXT NOT NULL,
+                        timestamp TEXT NOT NULL
+                    );
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_events_timestamp
+                    ON events (timestamp);
+                    """
+                )
+                JournalManager.__migrate_legacy(conn)
 
-        if journal is None:
-            return {}
+            JournalManager.__ready_path = JournalManager.path
 
-        try:
-            journal = {
-                k: v
-                for k, v in sorted(
-                    journal.items(), key=lambda item: item[1]["timestamp"], reverse=True
-                )
-            }
-        except (KeyError, TypeError):
-            journal = {}
+    @staticmethod
+    def __migrate_legacy(conn: sqlite3.Connection):
+        if not os.path.exists(JournalManager.legacy_path):
+            return
+
+        journal = None
+        with contextlib.suppress(OSError, yaml.YAMLError):
+            journal = storage.load_yaml(JournalManager.legacy_path)
+
+        if isinstance(journal, dict):
+            conn.executemany(
+                "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        str(event_id),
+                        str(event.get("severity", JournalSeverity.INFO)),
+                        str(event.get("message", "")),
+                        str(event["timestamp"]),
+                    )
+                    for event_id, event in journal.items()
+                    if isinstance(event, dict) and event.get("timestamp")
+                ],
+            )
+
+        with contextlib.suppress(OSError):
+            os.replace(JournalManager.legacy_path, f"{JournalManager.legacy_path}.old")
 
-        return journal
+    @staticmethod
+    def __start_writer():
+        with JournalManager.__lock:
+            writer = JournalManager.__writer
+            if writer is not None and writer.is_alive():
+                return
+            JournalManager.__writer = threading.Thread(
+                target=JournalManager.__writer_loop, name="JournalWriter", daemon=True
+            )
+            JournalManager.__writer.start()
 
     @staticmethod
-    def __clean_old():
-        """Clean old journal entries (1 month)."""
-        journal = JournalManager.__get_journal()
-        old_events = []
-        latest = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        for event_id, event in journal.items():
-            if event.get("timestamp", None) is None:
-                latest_datetime = datetime.strptime(latest, "%Y-%m-%d %H:%M:%S")
-            else:
-                latest_datetime = datetime.strptime(
-                    event["timestamp"], "%Y-%m-%d %H:%M:%S"
-                )
-                latest = event["timestamp"]
+    def __writer_loop():
+        conn, conn_path = None, None
+        while True:
+            batch = [JournalManager.__queue.get()]
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    batch.append(JournalManager.__queue.get_nowait())
 
-            if latest_datetime < datetime.now() - timedelta(days=30):
-                old_events.append(event_id)
+            try:
+                JournalManager.__ensure_db()
+                if conn_path != JournalManager.path:
+                    if conn is not None:
+                        conn.close()
+                    conn, conn_path = JournalManager.__connect(), JournalManager.path
+
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?)", batch
+                    )
+
+                if (
+                    time.monotonic() - JournalManager.__last_prune
+                    >= JournalManager.prune_interval
+                    or not JournalManager.__last_prune
+                ):
+                    JournalManager.__clean_old(conn)
+            except (OSError, sqlite3.Error):
+                # the journal must never break the caller, drop the batch
+                conn, conn_path = None, None
+            finally:
+                for _ in batch:
+                    JournalManager.__queue.task_done()
 
-        for event_id in old_events:
-            del journal[event_id]
+    @staticmethod
+    def __clean_old(conn: sqlite3.Connection):
+        """Clean old journal entries (1 month)."""
+        cutoff = datetime.now() - JournalManager.retention
+        with conn:
+            conn.execute(
+                "DELETE FROM events WHERE timestamp < ?",
+                (cutoff.strftime(TIMESTAMP_FORMAT),),
+            )
+        JournalManager.__last_prune = time.monotonic()
 
-        JournalManager.__save_journal(journal)
+    @staticmethod
+    def flush():
+        """Wait until every queued event has been written."""
+        writer = JournalManager.__writer
+        if writer is not None and writer.is_alive():
+            JournalManager.__queue.join()
 
     @staticmethod
-    def __save_journal(journal: Optional[dict] = None):
-        """Save the journal to the journal file."""
-        if journal is None:
-            journal = JournalManager.__get_journal()
+    def __query(sql: str, args: tuple = ()) -> List[tuple]:
+        JournalManager.flush()
+        try:
+            JournalManager.__ensure_db()
+            with contextlib.closing(JournalManager.__connect()) as conn:
+                return conn.execute(sql, args).fetchall()
+        except (OSError, sqlite3.Error):
+            return []
 
-        with contextlib.suppress(IOError, OSError):
-            with open(JournalManager.path, "w") as f:
-                yaml.dump(journal, f)
+    @staticmethod
+    def __to_journal(rows: List[tuple]) -> dict:
+        return {
+            event_id: {"severity": severity, "message": message, "timestamp": ts}
+            for event_id, severity, message, ts in rows
+        }
 
     @staticmethod
     def get(period: str = "today", plain: bool = False):
@@ -116,7 +215,6 @@ class JournalManager:
         Supported periods: all, today, yesterday, week, month
         Set plain to True to get the response as plain text.
         """
-        journal = JournalManager.__get_journal()
         periods = [
             "all",
             "today",
@@ -127,7 +225,7 @@ class JournalManager:
         if period not in periods:
             period = "today"
 
-        _journal = JournalManager.__filter_by_date(journal, period)
+        _journal = JournalManager.__filter_by_date(period)
 
         if plain:
             _journal = yaml.dump(_journal, sort_keys=False, indent=4)
@@ -135,74 +233,69 @@ class JournalManager:
         return _journal
 
     @staticmethod
-    def __filter_by_date(journal: dict, period: str):
-        """Filter the journal by date."""
-        _journal = {}
-        if period == "today":
-            start = datetime.now().date()
-            end = start + timedelta(days=1)
-        elif period == "yesterday":
-            start = datetime.now().date() - timedelta(days=1)
+    def __filter_by_date(period: str) -> dict:
+        """Return the events of the period, newest first."""
+        if period == "all":
+            return JournalManager.__to_journal(
+                JournalManager.__query(
+                    "SELECT * FROM events ORDER BY timestamp DESC, rowid DESC"
+                )
+            )
+
+        today = datetime.now().date()
+        if period == "yesterday":
+            start = today - timedelta(days=1)
             end = start + timedelta(days=1)
         elif period == "week":
-            start = datetime.now().date() - timedelta(days=7)
-            end = datetime.now().date() + timedelta(days=1)
+            start = today - timedelta(days=7)
+            end = today + timedelta(days=1)
         elif period == "month":
-            start = datetime.now().date() - timedelta(days=30)
-            end = datetime.now().date() + timedelta(days=1)
-        elif period == "all":
-            return journal
+            start = today - timedelta(days=30)
+            end = today + timedelta(days=1)
         else:
-            start = datetime.now().date()
+            start = today
             end = start + timedelta(days=1)
 
-        for event_id, event in journal.items():
-            timestamp = datetime.strptime(
-                event["timestamp"], "%Y-%m-%d %H:%M:%S"
-            ).date()
-
-            if start <= timestamp <= end:
-                _journal[event_id] = event
-
-        return _journal
+        # both days are included
+        rows = JournalManager.__query(
+            "SELECT * FROM events WHERE timestamp >= ? AND timestamp < ? "
+            "ORDER BY timestamp DESC, rowid DESC",
+            (f"{start} 00:00:00", f"{end + timedelta(days=1)} 00:00:00"),
+        )
+        return JournalManager.__to_journal(rows)
 
     @staticmethod
     def get_event(event_id: str):
         """Return the event with the given id."""
-        journal = JournalManager.__get_journal()
-        return journal.get(event_id, None)
+        rows = JournalManager.__query("SELECT * FROM events WHERE id = ?", (event_id,))
+        return JournalManager.__to_journal(rows).get(event_id, None)
 
     @staticmethod
     def first_event_date():
         """Return the timestamp of the oldest event as datetime."""
-        journal = JournalManager.__get_journal()
-        first = None
-        for event in journal.values():
-            timestamp = event.get("timestamp")
-            if not timestamp:
-                continue
-            try:
-                ts = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-            except (ValueError, TypeError):
-                continue
-            if first is None or ts < first:
-                first = ts
-        return first
+        rows = JournalManager.__query("SELECT MIN(timestamp) FROM events")
+        if not rows or not rows[0][0]:
+            return None
+        try:
+            return datetime.strptime(rows[0][0], TIMESTAMP_FORMAT)
+        except (ValueError, TypeError):
+            return None
 
     @staticmethod
     def write(severity: JournalSeverity, message: str):
-        """Write an event to the journal."""
-        journal = JournalManager.__get_journal()
-        event_id = str(uuid.uuid4())
-        now = datetime.now()
-
+        """Queue an event for the journal, it doesn't wait for the disk."""
         if severity not in JournalSeverity.__dict__.values():
             severity = JournalSeverity.INFO
 
-        journal[event_id] = {
-            "severity": severity,
-            "message": message,
-            "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        JournalManager.__save_journal(journal)
-        JournalManager.__clean_old()
+        JournalManager.__queue.put(
+            (
+                str(uuid.uuid4()),
+                severity,
+                message,
+                datetime.now().strftime(TIMESTAMP_FORMAT),
+            )
+        )
+        JournalManager.__start_writer()
+
+
+atexit.register(JournalManager.flush)
@@ -22,7 +22,7 @@ from bottles.backend.globals import Paths
 from bottles.backend.logger import Logger
 from bottles.backend.managers.steamgriddb import SteamGridDBManager
 from bottles.backend.models.config import BottleConfig
-from bottles.backend.utils import yaml
+from bottles.backend.utils import storage
 
 logging = Logger()
 
@@ -48,8 +48,7 @@ class LibraryManager:
             self.__library = {}
             self.save_library()
         else:
-            with open(self.library_path, "r") as library_file:
-                self.__library = yaml.load(library_file)
+            self.__library = storage.load_yaml(self.library_path)
 
         if self.__library is None:
             self.__library = {}
@@ -120,8 +119,7 @@ class LibraryManager:
         """
         Saves the library.yml file.
         """
-        with open(self.library_path, "w") as library_file:
-            yaml.dump(self.__library, library_file)
+        storage.write_yaml(self.library_path, self.__library)
 
         if not silent:
             logging.info("Library saved")
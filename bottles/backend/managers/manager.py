@@ -23,11 +23,12 @@ import shutil
 import subprocess
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from gettext import gettext as _
 from glob import glob
 from threading import Event
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import pathvalidate
 
@@ -37,16 +38,21 @@ from bottles.backend.dlls.nvapi import NVAPIComponent
 from bottles.backend.dlls.vkd3d import VKD3DComponent
 from bottles.backend.globals import Paths
 from bottles.backend.logger import Logger
+from bottles.backend.managers.artifact import ArtifactStore
+from bottles.backend.managers.bottle_index import BottleIndexManager, BottlesDiff
 from bottles.backend.managers.component import ComponentManager
 from bottles.backend.managers.data import DataManager, UserDataKeys
 from bottles.backend.managers.dependency import DependencyManager
 from bottles.backend.managers.epicgamesstore import EpicGamesStoreManager
 from bottles.backend.managers.importer import ImportManager
 from bottles.backend.managers.installer import InstallerManager
+from bottles.backend.managers.inventory import InventoryManager
 from bottles.backend.managers.library import LibraryManager
 from bottles.backend.managers.playtime import ProcessSessionTracker
+from bottles.backend.managers.program_index import ProgramIndexManager
 from bottles.backend.managers.registry_rule import RegistryRuleManager
 from bottles.backend.managers.repository import RepositoryManager
+from bottles.backend.managers.runtime import RuntimeManager
 from bottles.backend.managers.steam import SteamManager
 from bottles.backend.managers.template import TemplateManager
 from bottles.backend.managers.ubisoftconnect import UbisoftConnectManager
@@ -61,25 +67,56 @@ from bottles.backend.models.samples import Samples
 from bottles.backend.state import EventManager, Events, SignalManager, Signals
 from bottles.backend.utils import yaml
 from bottles.backend.utils.connection import ConnectionUtils
+from bottles.backend.utils.debounce import Debouncer
 from bottles.backend.utils.file import FileUtils
 from bottles.backend.utils.generic import sort_by_version
 from bottles.backend.utils.gpu import GPUUtils, GPUVendors
 from bottles.backend.utils.gsettings_stub import GSettingsStub
-from bottles.backend.utils.lnk import LnkUtils
 from bottles.backend.utils.manager import ManagerUtils
 from bottles.backend.utils.singleton import Singleton
 from bottles.backend.utils.steam import SteamUtils
+from bottles.backend.utils.taskgraph import TaskGraph
 from bottles.backend.utils.threading import RunAsync
-from bottles.backend.wine.reg import Reg
 from bottles.backend.wine.regkeys import RegKeys
 from bottles.backend.wine.uninstaller import Uninstaller
 from bottles.backend.wine.wineboot import WineBoot
+from bottles.backend.wine.winecommand import WineCommand
 from bottles.backend.wine.winepath import WinePath
 from bottles.backend.wine.wineserver import WineServer
 
 logging = Logger()
 
 
+class ConfigChange(NamedTuple):
+    """A single change for Manager.update_config_many()."""
+
+    key: str
+    value: Any = None
+    scope: str = ""
+    remove: bool = False
+    fallback: bool = False
+
+
+class ConfigTransaction:
+    """Changes collected by Manager.config_transaction()."""
+
+    def __init__(self):
+        self.changes: List[ConfigChange] = []
+        self.result: Optional[Result[dict]] = None
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        scope: str = "",
+        fallback: bool = False,
+    ):
+        self.changes.append(ConfigChange(key, value, scope, fallback=fallback))
+
+    def remove(self, key: str, scope: str = ""):
+        self.changes.append(ConfigChange(key, scope=scope, remove=True))
+
+
 class Manager(metaclass=Singleton):
     """
     This is the core of Bottles, everything starts from here. There should
@@ -98,6 +135,10 @@ class Manager(metaclass=Singleton):
     nvapi_available = []
     latencyflex_available = []
     local_bottles: Dict[str, BottleConfig] = {}
+    bottles_diff: BottlesDiff = BottlesDiff()
+    bottles_workers: int = min(8, (os.cpu_count() or 1) + 4)
+    config_writer: Debouncer = Debouncer()
+    config_writes_coalesced: int = 0
     supported_runtimes = {}
     supported_winebridge = {}
     supported_wine_runners = {}
@@ -128,6 +169,8 @@ class Manager(metaclass=Singleton):
             force_offline=self.is_cli or self.settings.get_boolean("force-offline")
         )
         self.data_mgr = DataManager()
+        self.inventory_manager = InventoryManager()
+        self.bottle_index = BottleIndexManager()
         _offline = True
 
         if check_connection:
@@ -179,22 +222,21 @@ class Manager(metaclass=Singleton):
             SignalManager.connect(Signals.ProgramFinished, self._on_program_finished)
             Manager._playtime_signals_connected = True
 
+        durations = {}
         if not self.is_cli:
-            times.update(self.checks(install_latest=False, first_run=True).data)
+            durations = self.checks(install_latest=False, first_run=True).data
         else:
             logging.set_silent()
 
         if "BOOT_TIME" in os.environ:
-            _temp_times = times.copy()
-            last = 0
             times_str = "Boot times:"
-            for f, t in _temp_times.items():
-                if last == 0:
-                    last = int(round(t))
-                    continue
-                t = int(round(t))
-                times_str += f"\n\t - {f} took: {t - last}s"
-                last = t
+            # the managers are set up one after the other
+            names = list(times)
+            for last, name in zip(names, names[1:]):
+                times_str += f"\n\t - {name} took: {times[name] - times[last]:.2f}s"
+            # the checks overlap, each one reports its own duration
+            for name, duration in durations.items():
+                times_str += f"\n\t - {name} took: {duration:.2f}s"
             logging.info(times_str)
 
     def checks(
@@ -203,46 +245,84 @@ class Manager(metaclass=Singleton):
         first_run=False,
         progress_callback: Optional[Callable[..., None]] = None,
     ) -> Result:
+        """
+        Run the startup checks. Independent steps run concurrently, each one
+        waits only for the steps it depends on (e.g. bottles are loaded
+        once runners are known). The data maps the steps to their duration.
+        """
         logging.info("Performing Bottles checks…")
 
         rv = Result(status=True, data={})
 
-        steps: List[Tuple[Optional[str], str, Callable[[], bool | None]]] = [
-            ("check_app_dirs", _("Preparing folders…"), self.check_app_dirs),
+        component_checks = [
+            "check_dxvk",
+            "check_vkd3d",
+            "check_nvapi",
+            "check_latencyflex",
+            "check_runtimes",
+            "check_winebridge",
+            "check_runners",
+        ]
+
+        # name, data_key, description, func, depends
+        steps: List[
+            Tuple[str, Optional[str], str, Callable[[], bool | None], List[str]]
+        ] = [
             (
+                "check_app_dirs",
+                "check_app_dirs",
+                _("Preparing folders…"),
+                self.check_app_dirs,
+                [],
+            ),
+            (
+                "check_dxvk",
                 "check_dxvk",
                 _("Setting up DXVK…"),
                 lambda: self.check_dxvk(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_vkd3d",
                 "check_vkd3d",
                 _("Setting up VKD3D…"),
                 lambda: self.check_vkd3d(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_nvapi",
                 "check_nvapi",
                 _("Setting up NVAPI…"),
                 lambda: self.check_nvapi(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_latencyflex",
                 "check_latencyflex",
                 _("Setting up LatencyFleX…"),
                 lambda: self.check_latencyflex(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_runtimes",
                 "check_runtimes",
                 _("Preparing runtimes…"),
                 lambda: self.check_runtimes(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_winebridge",
                 "check_winebridge",
                 _("Preparing WineBridge…"),
                 lambda: self.check_winebridge(install_latest),
+                ["check_app_dirs"],
             ),
             (
+                "check_runners",
                 "check_runners",
                 _("Preparing runners…"),
                 lambda: self.check_runners(install_latest),
+                ["check_app_dirs"],
             ),
         ]
 
@@ -250,14 +330,19 @@ class Manager(metaclass=Singleton):
             steps.extend(
                 [
                     (
+                        "organize_components",
                         None,
                         _("Organizing components…"),
                         self.organize_components,
+                        component_checks,
                     ),
                     (
+                        # component checks may be downloading into temp
+                        "clear_temp",
                         None,
                         _("Cleaning temporary files…"),
                         self.__clear_temp,
+                        component_checks,
                     ),
                 ]
             )
@@ -265,51 +350,81 @@ class Manager(metaclass=Singleton):
         steps.extend(
             [
                 (
+                    "organize_dependencies",
                     None,
                     _("Organizing dependencies…"),
                     self.organize_dependencies,
+                    ["check_app_dirs"],
                 ),
                 (
+                    "organize_installers",
                     None,
                     _("Organizing installers…"),
                     self.organize_installers,
+                    ["check_app_dirs"],
+                ),
+                (
+                    "check_bottles",
+                    "check_bottles",
+                    _("Loading bottles…"),
+                    self.check_bottles,
+                    ["check_runners"],
                 ),
-                ("check_bottles", _("Loading bottles…"), self.check_bottles),
             ]
         )
 
         total_steps = len(steps)
+        descriptions: Dict[str, str] = {}
+        data_keys: Dict[str, Optional[str]] = {}
+        durations: Dict[str, float] = {}
+        completed = 0
 
-        for index, (data_key, description, func) in enumerate(steps, start=1):
-            if progress_callback:
-                try:
-                    progress_callback(
-                        description=description,
-                        current_step=index,
-                        total_steps=total_steps,
-                        completed=False,
-                    )
-                except Exception as error:  # pragma: no cover - defensive
-                    logging.debug(f"Progress callback start failed: {error}")
+        def notify(description: str, current_step: int, done: bool):
+            if not progress_callback:
+                return
+            try:
+                progress_callback(
+                    description=description,
+                    current_step=current_step,
+                    total_steps=total_steps,
+                    completed=done,
+                )
+            except Exception as error:  # pragma: no cover - defensive
+                logging.debug(f"Progress callback failed: {error}")
+
+        def on_start(name: str):
+            # steps can finish out of order, keep the counter monotonic
+            notify(descriptions[name], min(completed + 1, total_steps), False)
 
-            result = func()
+        def on_done(name: str, result: bool | None):
+            nonlocal completed
+            completed += 1
 
             if result is False:
                 rv.set_status(False)
 
-            if progress_callback:
+            notify(descriptions[name], completed, True)
+
+            if data_keys[name]:
+                rv.data[data_keys[name]] = durations[name]
+
+        def timed(name: str, func: Callable[[], bool | None]):
+            # timed in the worker, a step may wait for a free one after on_start
+            def run():
+                start = time.monotonic()
                 try:
-                    progress_callback(
-                        description=description,
-                        current_step=index,
-                        total_steps=total_steps,
-                        completed=True,
-                    )
-                except Exception as error:  # pragma: no cover - defensive
-                    logging.debug(f"Progress callback end failed: {error}")
+                    return func()
+                finally:
+                    durations[name] = time.monotonic() - start
+
+            return run
 
-            if data_key:
-                rv.data[data_key] = time.time()
+        graph = TaskGraph()
+        for name, data_key, description, func, depends in steps:
+            descriptions[name] = description
+            data_keys[name] = data_key
+            graph.add(name, timed(name, func), depends)
+        graph.run(on_start=on_start, on_done=on_done)
 
         return rv
 
@@ -456,6 +571,10 @@ class Manager(metaclass=Singleton):
     def __clear_temp(self, force: bool = False):
         """Clears the temp directory if user setting allows it. Use the force
         parameter to force clearing the directory.
+
+        The downloaded files are kept in the artifacts store and linked
+        again into temp when needed, only forcing removes them, except
+        the ones pinned by the templates.
         """
         if self.settings.get_boolean("temp") or force:
             try:
@@ -464,12 +583,52 @@ class Manager(metaclass=Singleton):
                 logging.info("Temp directory cleaned successfully!")
             except FileNotFoundError:
                 self.check_app_dirs()
+        if force:
+            ArtifactStore.clear()
+        else:
+            ArtifactStore.evict()
+
+    def __pin_template_artifacts(self):
+        """
+        Pin in the artifacts store the files the templates were made of:
+        their dependencies and components, so a bottle created from a
+        template can install them again without downloading.
+        """
+        pins = {}
+        try:
+            for template in TemplateManager.get_templates():
+                config = template.get("config") or {}
+                urls = set()
+                for name in config.get("Installed_Dependencies") or []:
+                    manifest = self.dependency_manager.get_dependency(name)
+                    if isinstance(manifest, dict):
+                        for step in manifest.get("Steps", []):
+                            if step.get("url"):
+                                urls.add(step["url"])
+                for key in ["Runner", "DXVK", "VKD3D", "NVAPI", "LatencyFleX"]:
+                    if not config.get(key):
+                        continue
+                    manifest = self.component_manager.get_component(config[key])
+                    if isinstance(manifest, dict):
+                        urls.update(f["url"] for f in manifest.get("File", []))
+                pins[f"template:{template['uuid']}"] = urls
+        except Exception as e:
+            logging.warning(f"Cannot pin the template artifacts: {e}")
+            return
+        ArtifactStore.pin(pins)
 
     def get_cache_details(self) -> dict:
         self.check_app_dirs()
         file_utils = FileUtils()
 
-        temp_size_bytes = file_utils.get_path_size(Paths.temp, human=False)
+        # the files linked from the artifacts store are counted there,
+        # clearing the temp cache clears both
+        artifacts = ArtifactStore.get_stats()
+        temp_size_bytes = (
+            file_utils.get_path_size(Paths.temp, human=False)
+            - ArtifactStore.get_linked_size(Paths.temp)
+            + artifacts["size"]
+        )
         templates = []
         templates_size_bytes = 0
 
@@ -498,6 +657,15 @@ class Manager(metaclass=Singleton):
                 "size": file_utils.get_human_size(temp_size_bytes),
                 "size_bytes": temp_size_bytes,
             },
+            "artifacts": {
+                "path": Paths.artifacts,
+                "size": file_utils.get_human_size(artifacts["size"]),
+                "size_bytes": artifacts["size"],
+                "files": artifacts["files"],
+                "pinned": artifacts["pinned"],
+                "hits": artifacts["hits"],
+                "misses": artifacts["misses"],
+            },
             "templates": templates,
             "templates_size": file_utils.get_human_size(templates_size_bytes),
             "templates_size_bytes": templates_size_bytes,
@@ -522,6 +690,7 @@ class Manager(metaclass=Singleton):
             logging.error(f"Failed to clear template cache: {ex}")
             return Result(False, message=str(ex))
 
+        self.__pin_template_artifacts()
         return Result(True)
 
     def clear_templates_cache(self) -> Result[None]:
@@ -533,6 +702,7 @@ class Manager(metaclass=Singleton):
             logging.error(f"Failed to clear templates cache: {ex}")
             return Result(False, message=str(ex))
 
+        ArtifactStore.pin({})
         return Result(True)
 
     def clear_all_caches(self) -> Result[None]:
@@ -548,8 +718,8 @@ class Manager(metaclass=Singleton):
 
     def update_bottles(self, silent: bool = False):
         """Checks for new bottles and update the list view."""
-        self.check_bottles(silent)
-        SignalManager.send(Signals.ManagerLocalBottlesLoaded)
+        diff = self.check_bottles(silent)
+        SignalManager.send(Signals.ManagerLocalBottlesLoaded, Result(True, diff))
 
     def check_app_dirs(self):
         """
@@ -676,21 +846,35 @@ class Manager(metaclass=Singleton):
         the latest version if install_latest is True. It also masks the
         winemenubuilder tool.
         """
-        runners = glob(f"{Paths.runners}/*/")
         self.runners_available, runners_available = [], []
 
-        # lock winemenubuilder.exe
-        for runner in runners:
-            if not SteamUtils.is_proton(runner):
-                winemenubuilder_paths = [
-                    f"{runner}lib64/wine/x86_64-windows/winemenubuilder.exe",
-                    f"{runner}lib/wine/x86_64-windows/winemenubuilder.exe",
-                    f"{runner}lib32/wine/i386-windows/winemenubuilder.exe",
-                    f"{runner}lib/wine/i386-windows/winemenubuilder.exe",
-                ]
-                for winemenubuilder in winemenubuilder_paths:
-                    if os.path.isfile(winemenubuilder):
-                        os.rename(winemenubuilder, f"{winemenubuilder}.lock")
+        def scan_runners() -> List[str]:
+            runners = glob(f"{Paths.runners}/*/")
+
+            # lock winemenubuilder.exe
+            for runner in runners:
+                if not SteamUtils.is_proton(runner):
+                    winemenubuilder_paths = [
+                        f"{runner}lib64/wine/x86_64-windows/winemenubuilder.exe",
+                        f"{runner}lib/wine/x86_64-windows/winemenubuilder.exe",
+                        f"{runner}lib32/wine/i386-windows/winemenubuilder.exe",
+                        f"{runner}lib/wine/i386-windows/winemenubuilder.exe",
+                    ]
+                    for winemenubuilder in winemenubuilder_paths:
+                        if os.path.isfile(winemenubuilder):
+                            os.rename(winemenubuilder, f"{winemenubuilder}.lock")
+
+            return [os.path.basename(os.path.normpath(r)) for r in runners]
+
+        def scan_system_wine(wine_path: str) -> Optional[str]:
+            try:
+                return (
+                    subprocess.check_output([wine_path, "--version"], text=True)
+                    .strip()
+                    .split(" ")[0]
+                )
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                return None
 
         # check system wine flavors
         wine_flavors = [
@@ -704,29 +888,30 @@ class Manager(metaclass=Singleton):
             if (wine_path := shutil.which(flavor)) is not None:
                 """
                 If the Wine command is available, get the runner version
-                and add it to the runners_available list.
+                and add it to the runners_available list. The version is
+                cached until the resolved binary changes.
                 """
-                try:
-                    version = (
-                        subprocess.check_output([wine_path, "--version"], text=True)
-                        .strip()
-                        .split(" ")[0]
-                    )
-                    # For display clarity, use flavor name if different from version
-                    # e.g. "sys-wine-staging-9.0"
-                    if flavor != "wine":
-                        version = f"{flavor}-{version}"
-
-                    version = "sys-" + version
-                    if version not in runners_available:
-                        runners_available.append(version)
-                except (subprocess.CalledProcessError, FileNotFoundError):
+                version = self.inventory_manager.get(
+                    f"system-{flavor}",
+                    wine_path,
+                    lambda: scan_system_wine(wine_path),
+                )
+                if not version:
                     continue
 
+                # For display clarity, use flavor name if different from version
+                # e.g. "sys-wine-staging-9.0"
+                if flavor != "wine":
+                    version = f"{flavor}-{version}"
+
+                version = "sys-" + version
+                if version not in runners_available:
+                    runners_available.append(version)
+
         # check bottles runners
-        for runner in runners:
-            _runner = os.path.basename(os.path.normpath(runner))
-            runners_available.append(_runner)
+        runners_available += self.inventory_manager.get(
+            "runners", Paths.runners, scan_runners
+        )
 
         runners_available = self.__sort_runners(runners_available, "")
 
@@ -783,9 +968,29 @@ class Manager(metaclass=Singleton):
 
     def check_runtimes(self, install_latest: bool = True) -> bool:
         self.runtimes_available = []
-        runtimes = os.listdir(Paths.runtimes)
+        # the launch environments look the runtimes up again
+        RuntimeManager.get_runtimes.cache_clear()
+
+        def scan_runtimes() -> dict:
+            runtimes = os.listdir(Paths.runtimes)
+            if len(runtimes) == 0:
+                return {"runtimes": [], "version": None}
+
+            runtime = runtimes[0]  # runtimes cannot be more than one
+            manifest = os.path.join(Paths.runtimes, runtime, "manifest.yml")
+            version = None
+
+            if os.path.exists(manifest):
+                with open(manifest, "r") as f:
+                    data = yaml.load(f)
+                    version = data.get("version")
+            return {"runtimes": runtimes, "version": version}
+
+        inventory = self.inventory_manager.get(
+            "runtimes", Paths.runtimes, scan_runtimes
+        )
 
-        if len(runtimes) == 0:
+        if len(inventory["runtimes"]) == 0:
             if install_latest and self.utils_conn.check_connection():
                 logging.warning("No runtime found.")
                 try:
@@ -795,17 +1000,11 @@ class Manager(metaclass=Singleton):
                     return False
             return False
 
-        runtime = runtimes[0]  # runtimes cannot be more than one
-        manifest = os.path.join(Paths.runtimes, runtime, "manifest.yml")
-
-        if os.path.exists(manifest):
-            with open(manifest, "r") as f:
-                data = yaml.load(f)
-                version = data.get("version")
-                if version:
-                    version = f"runtime-{version}"
-                    self.runtimes_available = [version]
-                    return True
+        version = inventory["version"]
+        if version:
+            version = f"runtime-{version}"
+            self.runtimes_available = [version]
+            return True
         return False
 
     def __winebridge_status(self) -> tuple[Optional[str], Optional[str], bool]:
@@ -1008,8 +1207,17 @@ class Manager(metaclass=Singleton):
             logging.warning(f"Unknown component type found: {component_type}")
             raise ValueError("Component type not supported.")
 
+        def scan_component() -> list:
+            available = os.listdir(component["path"])
+            try:
+                return sort_by_version(available)
+            except ValueError:
+                return sorted(available, reverse=True)
+
         component = components[component_type]
-        component["available"] = os.listdir(component["path"])
+        component["available"] = self.inventory_manager.get(
+            component_type, component["path"], scan_component
+        )
 
         if len(component["available"]) > 0:
             logging.info(
@@ -1041,10 +1249,7 @@ class Manager(metaclass=Singleton):
             else:
                 return False
 
-        try:
-            return sort_by_version(component["available"])
-        except ValueError:
-            return sorted(component["available"], reverse=True)
+        return component["available"]
 
     def get_programs(self, config: BottleConfig) -> List[dict]:
         """
@@ -1056,18 +1261,7 @@ class Manager(metaclass=Singleton):
 
         bottle = ManagerUtils.get_bottle_path(config)
         winepath = WinePath(config)
-        results = glob(f"{bottle}/drive_c/users/*/Desktop/*.lnk", recursive=True)
-        results += glob(
-            f"{bottle}/drive_c/users/*/Start Menu/Programs/**/*.lnk", recursive=True
-        )
-        results += glob(
-            f"{bottle}/drive_c/ProgramData/Microsoft/Windows/Start Menu/Programs/**/*.lnk",
-            recursive=True,
-        )
-        results += glob(
-            f"{bottle}/drive_c/users/*/AppData/Roaming/Microsoft/Windows/Start Menu/Programs/**/*.lnk",
-            recursive=True,
-        )
+        shortcuts = ProgramIndexManager(bottle).scan()
         installed_programs = []
         ignored_patterns = [
             "*installer*",
@@ -1124,13 +1318,13 @@ class Manager(metaclass=Singleton):
                 }
             )
 
-        for program in results:
+        for shortcut in shortcuts:
             """
             for each .lnk file, try to get the executable path and
             append it to the installed_programs list with its icon,
             skip if the path contains the "Uninstall" word.
             """
-            executable_path = LnkUtils.get_data(program)
+            executable_path = shortcut.target
             if executable_path in [None, ""]:
                 continue
             executable_name = executable_path.split("\\")[-1]
@@ -1147,65 +1341,70 @@ class Manager(metaclass=Singleton):
             if stop:
                 continue
 
-            path_check = os.path.join(
-                bottle, executable_path.replace("C:\\", "drive_c\\").replace("\\", "/")
-            )
-            if os.path.exists(path_check):
+            if shortcut.exists:
                 if executable_name not in found:
                     installed_programs.append(
                         {
                             "executable": executable_name,
-                            "arguments": "",
+                            "arguments": shortcut.arguments,
                             "name": executable_name.rsplit(".", 1)[0],
                             "path": executable_path,
                             "folder": program_folder,
                             "icon": "com.usebottles.bottles-program",
+                            "icon_location": shortcut.icon_location,
+                            "icon_index": shortcut.icon_index,
                             "id": str(uuid.uuid4()),
                             "auto_discovered": True,
                         }
                     )
                     found.append(executable_name)
 
-            win_steam_manager = SteamManager(config, is_windows=True)
+        """
+        Merge the programs of the store integrations, once per scan.
+        """
+        programs_names = {p.get("name", "") for p in installed_programs}
+        store_apps = []
 
-            if (
-                self.settings.get_boolean("steam-programs")
-                and win_steam_manager.is_steam_supported
-            ):
-                programs_names = [p.get("name", "") for p in installed_programs]
-                for app in win_steam_manager.get_installed_apps_as_programs():
-                    if app["name"] not in programs_names:
-                        installed_programs.append(app)
-
-            if self.settings.get_boolean(
-                "epic-games"
-            ) and EpicGamesStoreManager.is_epic_supported(config):
-                programs_names = [p.get("name", "") for p in installed_programs]
-                for app in EpicGamesStoreManager.get_installed_games(config):
-                    if app["name"] not in programs_names:
-                        installed_programs.append(app)
-
-            if self.settings.get_boolean(
-                "ubisoft-connect"
-            ) and UbisoftConnectManager.is_uconnect_supported(config):
-                programs_names = [p.get("name", "") for p in installed_programs]
-                for app in UbisoftConnectManager.get_installed_games(config):
-                    if app["name"] not in programs_names:
-                        installed_programs.append(app)
+        win_steam_manager = SteamManager(config, is_windows=True)
+        if (
+            self.settings.get_boolean("steam-programs")
+            and win_steam_manager.is_steam_supported
+        ):
+            store_apps += win_steam_manager.get_installed_apps_as_programs()
+
+        if self.settings.get_boolean(
+            "epic-games"
+        ) and EpicGamesStoreManager.is_epic_supported(config):
+            store_apps += EpicGamesStoreManager.get_installed_games(config)
+
+        if self.settings.get_boolean(
+            "ubisoft-connect"
+        ) and UbisoftConnectManager.is_uconnect_supported(config):
+            store_apps += UbisoftConnectManager.get_installed_games(config)
+
+        for app in store_apps:
+            if app["name"] not in programs_names:
+                installed_programs.append(app)
+                programs_names.add(app["name"])
 
         return installed_programs
 
-    def check_bottles(self, silent: bool = False):
+    def check_bottles(
+        self, silent: bool = False, workers: Optional[int] = None
+    ) -> BottlesDiff:
         """
         Check for local bottles and update the local_bottles list.
-        Will also mark the broken ones if the configuration file is missing
+        Will also mark the broken ones if the configuration file is missing.
+        Bottles whose configuration didn't change since the last check are
+        reused as they are, maintenance only runs on new or changed ones.
+        Bottles are processed concurrently by up to `workers` threads
+        (bottles_workers by default), results keep the directory order.
+        Returns the bottles added, removed and changed since the last check.
         """
         bottles = os.listdir(Paths.bottles)
+        local_bottles: Dict[str, BottleConfig] = {}
 
-        # Empty local bottles
-        self.local_bottles = {}
-
-        def process_bottle(bottle):
+        def process_bottle(bottle) -> Optional[Tuple[str, BottleConfig, str]]:
             _name = bottle
             _bottle = str(os.path.join(Paths.bottles, bottle))
             _placeholder = os.path.join(_bottle, "placeholder.yml")
@@ -1222,21 +1421,20 @@ class Manager(metaclass=Singleton):
                         else:
                             raise ValueError("Missing Path in placeholder.yml")
                     except (yaml.YAMLError, ValueError):
-                        return
+                        return None
 
-            config_load = BottleConfig.load(_config)
+            config, maintained, parsed = self.bottle_index.load(_config)
 
-            if not config_load.status:
-                return
-
-            config = config_load.data
+            if config is None:
+                return None
 
-            # Clear Run Executable parameters on new session start
-            if config.session_arguments:
-                config.session_arguments = ""
+            if parsed:
+                # Clear Run Executable parameters on new session start
+                if config.session_arguments:
+                    config.session_arguments = ""
 
-            if config.run_in_terminal:
-                config.run_in_terminal = False
+                if config.run_in_terminal:
+                    config.run_in_terminal = False
 
             # Check if the path in the bottle config corresponds to the folder name
             # if not, change the config to reflect the folder name
@@ -1252,21 +1450,51 @@ class Manager(metaclass=Singleton):
                     if sane_name != _name:
                         # This hopefully doesn't happen, but it's managed
                         logging.warning(f"Broken path in bottle {_name}, fixing...")
-                        shutil.move(
-                            _bottle, str(os.path.join(Paths.bottles, sane_name))
-                        )
-                        # Restart the process bottle function. Normally, can't be recursive!
-                        process_bottle(sane_name)
-                        return
+                        _sane_bottle = os.path.join(Paths.bottles, sane_name)
+                        try:
+                            # claim the name first: another bottle (or another
+                            # broken name sanitized the same) may already use it
+                            os.mkdir(_sane_bottle)
+                            try:
+                                os.replace(_bottle, _sane_bottle)
+                            except OSError:
+                                with contextlib.suppress(OSError):
+                                    os.rmdir(_sane_bottle)
+                                raise
+                        except OSError as e:
+                            logging.error(
+                                f"Cannot rename bottle {_name} to {sane_name}: {e}"
+                            )
+                            # keep it loaded under its current name
+                            sane_name = _name
+                        else:
+                            ProgramIndexManager(_bottle).forget()
+                            # Restart the process bottle function. Normally, can't be recursive!
+                            # The name was free until the mkdir above, so no other
+                            # worker can be processing it.
+                            return process_bottle(sane_name)
+
+                    if config.Path != sane_name:
+                        config.Path = sane_name
+                        self.update_config(config=config, key="Path", value=sane_name)
+
+            result = (config.Name, config, _config)
+            real_path = ManagerUtils.get_bottle_path(config)
+
+            # Nvidia driver updates can change the nvngx DLLs, so check
+            # them on every new session even for maintained bottles
+            if parsed and config.Parameters.dxvk_nvapi:
+                NVAPIComponent.check_bottle_nvngx(real_path, config)
 
-                    config.Path = sane_name
-                    self.update_config(config=config, key="Path", value=sane_name)
+            if maintained:
+                return result
 
             sample = BottleConfig()
+            changes = []
             miss_keys = sample.keys() - config.keys()
             for key in miss_keys:
                 logging.warning(f"Key {key} is missing for bottle {_name}, updating…")
-                self.update_config(config=config, key=key, value=sample[key])
+                changes.append(ConfigChange(key, sample[key]))
 
             miss_params_keys = sample.Parameters.keys() - config.Parameters.keys()
 
@@ -1278,16 +1506,13 @@ class Manager(metaclass=Singleton):
                 logging.warning(
                     f"Parameters key {key} is missing for bottle {_name}, updating…"
                 )
-                self.update_config(
-                    config=config,
-                    key=key,
-                    value=sample.Parameters[key],
-                    scope="Parameters",
+                changes.append(
+                    ConfigChange(key, sample.Parameters[key], scope="Parameters")
                 )
-            self.local_bottles[config.Name] = config
+
+            self.update_config_many(config, changes)
 
             try:
-                real_path = ManagerUtils.get_bottle_path(config)
                 for p in [
                     os.path.join(real_path, "cache", "dxvk_state"),
                     os.path.join(real_path, "cache", "gl_shader"),
@@ -1326,25 +1551,37 @@ class Manager(metaclass=Singleton):
                             )
                         except (shutil.Error, OSError):
                             pass
+                self.bottle_index.update(_config, config, maintained=True)
             except (OSError, PermissionError) as e:
                 logging.warning(
                     f"Could not perform maintenance for bottle {_name}: {e}"
                 )
 
-            if config.Parameters.dxvk_nvapi:
-                NVAPIComponent.check_bottle_nvngx(real_path, config)
+            return result
+
+        workers = max(1, min(workers or self.bottles_workers, len(bottles) or 1))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="check_bottles"
+        ) as executor:
+            results = list(executor.map(process_bottle, bottles))
 
-        for b in bottles:
+        seen_configs = []
+        for result in results:
             """
             For each bottle add the path name to the `local_bottles` variable
             and append the config.
             """
-            process_bottle(b)
+            if result is None:
+                continue
+            name, config, config_path = result
+            local_bottles[name] = config
+            seen_configs.append(config_path)
 
-        if len(self.local_bottles) > 0 and not silent:
-            logging.info(
-                "Bottles found:\n - {0}".format("\n - ".join(self.local_bottles))
-            )
+        self.bottle_index.prune(seen_configs)
+        self.bottle_index.save_index()
+
+        if len(local_bottles) > 0 and not silent:
+            logging.info("Bottles found:\n - {0}".format("\n - ".join(local_bottles)))
 
         if (
             self.settings.get_boolean("steam-proton-support")
@@ -1352,7 +1589,12 @@ class Manager(metaclass=Singleton):
             and not self.is_cli
         ):
             self.steam_manager.update_bottles()
-            self.local_bottles.update(self.steam_manager.list_prefixes())
+            local_bottles.update(self.steam_manager.list_prefixes())
+
+        diff = BottleIndexManager.diff(self.local_bottles, local_bottles)
+        self.local_bottles = local_bottles
+        self.bottles_diff = diff
+        return diff
 
     # Update parameters in bottle config
     def update_config(
@@ -1363,47 +1605,76 @@ class Manager(metaclass=Singleton):
         scope: str = "",
         remove: bool = False,
         fallback: bool = False,
+        debounce: bool = False,
     ) -> Result[dict]:
         """
         Update parameters in bottle config. Use the scope argument to
         update the parameters in the specified scope (e.g. Parameters).
         A new key will be created if another already exists and fallback
-        is set to True.
+        is set to True. Use debounce to delay the write to disk, so a burst
+        of updates (e.g. UI toggles) results in a single write.
         TODO: move to bottle.py (Bottle manager)
         """
+        return self.update_config_many(
+            config, [ConfigChange(key, value, scope, remove, fallback)], debounce
+        )
+
+    def update_config_many(
+        self,
+        config: BottleConfig,
+        changes: Iterable[ConfigChange | tuple],
+        debounce: bool = False,
+    ) -> Result[dict]:
+        """
+        Apply several changes to the bottle config and write it to disk
+        only once. Each change is a ConfigChange or a tuple with the same
+        fields. The result data reports how many writes were coalesced.
+        """
         _name = config.Name
-        logging.info(f"Setting Key {key}={value} for bottle {_name}…")
+        changes = [ConfigChange(*c) for c in changes]
+        if not changes:
+            return Result(status=True, data={"config": config, "coalesced": 0})
 
-        _config = config.copy()
-        wineboot = WineBoot(_config)
-        wineserver = WineServer(_config)
-        bottle_path = ManagerUtils.get_bottle_path(config)
+        for change in changes:
+            logging.info(f"Setting Key {change.key}={change.value} for bottle {_name}…")
 
-        if key == "sync" and config.Parameters.sync != value:
+        if any(c.key == "sync" and config.Parameters.sync != c.value for c in changes):
             """
             Workaround <https://github.com/bottlesdevs/Bottles/issues/916>
             Sync type change requires wineserver restart or wine will fail
             to execute any command.
             """
-            wineboot.kill()
-            wineserver.wait()
+            _config = config.copy()
+            WineBoot(_config).kill()
+            WineServer(_config).wait()
 
-        if scope:
+        for key, value, scope, remove, fallback in changes:
+            target = config[scope] if scope else config
             if remove:
-                del config[scope][key]
-            elif config[scope].get(key) and fallback:
-                config[scope][f"{key}-{uuid.uuid4()}"] = value
+                del target[key]
+            elif target.get(key) and fallback:
+                target[f"{key}-{uuid.uuid4()}"] = value
             else:
-                config[scope][key] = value
+                target[key] = value
+
+        bottle_path = ManagerUtils.get_bottle_path(config)
+        WineCommand.env_cache.invalidate(bottle_path)
+
+        config_path = os.path.join(bottle_path, "bottle.yml")
+        coalesced = len(changes) - 1
+        if debounce:
+            if self.config_writer.schedule(
+                config_path, lambda: self.__write_config(config, config_path)
+            ):
+                coalesced += 1
         else:
-            if remove:
-                del config[key]
-            elif config.get(key) and fallback:
-                config[f"{key}-{uuid.uuid4()}"] = value
-            else:
-                config[key] = value
+            # a pending debounced write would only be a stale duplicate
+            self.config_writer.cancel(config_path)
+            self.__write_config(config, config_path)
 
-        config.dump(os.path.join(bottle_path, "bottle.yml"))
+        Manager.config_writes_coalesced += coalesced
+        if coalesced:
+            logging.debug(f"Coalesced {coalesced} config writes for bottle {_name}")
 
         config.Update_Date = str(datetime.now())
 
@@ -1419,10 +1690,38 @@ class Manager(metaclass=Singleton):
             "LatencyFleX_Activated",
         }
 
-        if key in component_keys or scope in component_keys:
+        if any(c.key in component_keys or c.scope in component_keys for c in changes):
             RegistryRuleManager.apply_rules(config, trigger="components")
 
-        return Result(status=True, data={"config": config})
+        return Result(status=True, data={"config": config, "coalesced": coalesced})
+
+    @contextlib.contextmanager
+    def config_transaction(self, config: BottleConfig, debounce: bool = False):
+        """
+        Collect the changes made through the yielded ConfigTransaction
+        and apply them with a single update_config_many on exit. Nothing
+        is applied if the block raises.
+        """
+        transaction = ConfigTransaction()
+        yield transaction
+        transaction.result = self.update_config_many(
+            config, transaction.changes, debounce
+        )
+
+    def flush_config_writes(self):
+        """Write to disk every config update still held by the debouncer."""
+        self.config_writer.flush()
+
+    def __write_config(self, config: BottleConfig, config_path: str) -> Result:
+        res = config.dump(config_path)
+        if not res.status:
+            logging.error(
+                f"Cannot write config for bottle {config.Name}: {res.message}"
+            )
+            return res
+
+        self.bottle_index.update(config_path, config)
+        return Result(True)
 
     def apply_audio_driver(self, driver: str) -> Result[None]:
         """Apply the configured audio driver override to every bottle."""
@@ -1444,13 +1743,18 @@ class Manager(metaclass=Singleton):
         logging.info(f"Creating new {config.Name} bottle from config…")
 
         sample = BottleConfig()
-        for key in sample.keys():
-            """
-            If the key is not in the configuration sample, set it to the
-            default value.
-            """
-            if key not in config.keys():
-                self.update_config(config=config, key=key, value=sample[key])
+        """
+        If the key is not in the configuration sample, set it to the
+        default value.
+        """
+        self.update_config_many(
+            config,
+            [
+                ConfigChange(key, sample[key])
+                for key in sample.keys()
+                if key not in config.keys()
+            ],
+        )
 
         if config.Runner not in self.runners_available:
             """
@@ -1526,13 +1830,22 @@ class Manager(metaclass=Singleton):
             """
             self.install_dll_component(config, "vkd3d")
 
+        # the files of all the dependencies are downloaded at once
+        self.dependency_manager.prefetch(
+            config,
+            [
+                d
+                for d in config.Installed_Dependencies
+                if d in self.supported_dependencies
+            ],
+        )
         for dependency in config.Installed_Dependencies:
             """
             Install each declared dependency in the new bottle.
             """
             if dependency in self.supported_dependencies.keys():
                 dep = [dependency, self.supported_dependencies[dependency]]
-                res = self.dependency_manager.install(config, dep)
+                res = self.dependency_manager.install(config, dep, prefetch=False)
                 if not res.ok:
                     logging.error(
                         _("Failed to install dependency: %s") % dependency,
@@ -1802,7 +2115,6 @@ class Manager(metaclass=Singleton):
             return cancel_result
 
         # initialize wineprefix
-        reg = Reg(config)
         rk = RegKeys(config)
         wineboot = WineBoot(config)
         wineserver = WineServer(config)
@@ -1878,42 +2190,40 @@ class Manager(metaclass=Singleton):
 
             FileUtils.wait_for_files(reg_files)
 
-            # apply CMD settings
-            logging.info("Setting CMD default settings…")
-            log_update(_("Apply CMD default settings…"))
-            rk.apply_cmd_settings()
-            wineboot.update()
-
-            FileUtils.wait_for_files(reg_files)
-
-            logging.info("Enabling font smoothing…")
-            log_update(_("Enabling font smoothing…"))
-            rk.apply_font_smoothing()
-
-            audio_driver = self.settings.get_string("audio-driver")
-            if audio_driver not in ("", "default"):
-                logging.info("Configuring audio driver…")
-                log_update(_("Configuring audio driver…"))
-                try:
-                    rk.set_audio_driver(audio_driver)
-                except ValueError as exc:
-                    logging.warning(str(exc))
-
-            wineboot.update()
+            # the registry defaults are applied at once
+            with rk.transaction() as transaction:
+                # apply CMD settings
+                logging.info("Setting CMD default settings…")
+                log_update(_("Apply CMD default settings…"))
+                rk.apply_cmd_settings()
+
+                logging.info("Enabling font smoothing…")
+                log_update(_("Enabling font smoothing…"))
+                rk.apply_font_smoothing()
+
+                audio_driver = self.settings.get_string("audio-driver")
+                if audio_driver not in ("", "default"):
+                    logging.info("Configuring audio driver…")
+                    log_update(_("Configuring audio driver…"))
+                    try:
+                        rk.set_audio_driver(audio_driver)
+                    except ValueError as exc:
+                        logging.warning(str(exc))
+
+                # blacklisting processes
+                logging.info("Optimizing environment…")
+                log_update(_("Optimizing environment…"))
+                _blacklist_dll = ["winemenubuilder.exe"]
+                for _dll in _blacklist_dll:
+                    transaction.add(
+                        key="HKEY_CURRENT_USER\\Software\\Wine\\DllOverrides",
+                        value=_dll,
+                        data="",
+                    )
+                transaction.after_live(wineboot.update)
 
             FileUtils.wait_for_files(reg_files)
 
-            # blacklisting processes
-            logging.info("Optimizing environment…")
-            log_update(_("Optimizing environment…"))
-            _blacklist_dll = ["winemenubuilder.exe"]
-            for _dll in _blacklist_dll:
-                reg.add(
-                    key="HKEY_CURRENT_USER\\Software\\Wine\\DllOverrides",
-                    value=_dll,
-                    data="",
-                )
-
         # apply environment configuration
         logging.info(f"Applying environment: [{environment}]…")
         log_update(_("Applying environment: {0}…").format(environment))
@@ -1939,11 +2249,10 @@ class Manager(metaclass=Singleton):
             wineboot.kill()
 
         if env:
-            while wineserver.is_alive():
+            while not wineserver.wait(timeout=1):
                 cancel_result = check_cancel()
                 if cancel_result is not None:
                     return cancel_result
-                time.sleep(1)
 
             for prm in config.Parameters:
                 if prm in env.get("Parameters", {}):
@@ -1997,6 +2306,19 @@ class Manager(metaclass=Singleton):
                     self.install_dll_component(config, "nvapi", version=nvapi_name)
                     template_updated = True
 
+            dependencies = [
+                dep
+                for dep in env.get("Installed_Dependencies", [])
+                if dep in self.supported_dependencies
+                and not (
+                    template and dep in template["config"]["Installed_Dependencies"]
+                )
+            ]
+            if dependencies:
+                # the files of all the dependencies are downloaded at once
+                log_update(_("Downloading dependencies…"))
+                self.dependency_manager.prefetch(config, dependencies)
+
             for dep in env.get("Installed_Dependencies", []):
                 if template and dep in template["config"]["Installed_Dependencies"]:
                     continue
@@ -2010,7 +2332,9 @@ class Manager(metaclass=Singleton):
                         _("Installing dependency: %s …")
                         % _dep.get("Description", "n/a")
                     )
-                    res = self.dependency_manager.install(config, [dep, _dep])
+                    res = self.dependency_manager.install(
+                        config, [dep, _dep], prefetch=False
+                    )
                     if not res.ok:
                         logging.error(
                             _("Failed to install dependency: %s")
@@ -2064,6 +2388,7 @@ class Manager(metaclass=Singleton):
             logging.info("Caching template…")
             log_update(_("Caching template…"))
             TemplateManager.new(environment, config)
+            self.__pin_template_artifacts()
 
         return Result(status=True, data={"config": config})
 
@@ -2127,6 +2452,8 @@ class Manager(metaclass=Singleton):
         logging.info("Removing the bottle…")
         path = ManagerUtils.get_bottle_path(config)
         subprocess.run(["rm", "-rf", path], stdout=subprocess.DEVNULL)
+        # a bottle created again there starts with a new index
+        ProgramIndexManager(path).forget()
 
         self.update_bottles(silent=True)
 
@@ -2248,6 +2575,8 @@ class Manager(metaclass=Singleton):
         """Cleanup only truly orphaned or stuck bottles."""
         logging.info("Starting shutdown cleanup …")
 
+        self.flush_config_writes()
+
         active_bottle_ids = []
         if hasattr(self, "playtime_tracker"):
             with self.playtime_tracker._lock:
@@ -2260,23 +2589,12 @@ class Manager(metaclass=Singleton):
         for b_id in active_bottle_ids:
             if b_id in self.local_bottles:
                 protected_prefixes.add(
-                    ManagerUtils.get_bottle_path(self.local_bottles[b_id])
+                    ManagerUtils.get_bottle_path(self.local_bottles[b_id]).rstrip("/")
                 )
 
         from bottles.backend.utils.proc import ProcUtils
 
-        procs = ProcUtils.get_procs()
-        prefix_to_procs = {}
-
-        for proc in procs:
-            env = proc.get_env()
-            if "WINEPREFIX=" in env:
-                for var in env.split("\x00"):
-                    if var.startswith("WINEPREFIX="):
-                        prefix = var.split("=", 1)[1]
-                        if prefix not in prefix_to_procs:
-                            prefix_to_procs[prefix] = []
-                        prefix_to_procs[prefix].append(proc)
+        prefix_to_procs = ProcUtils.snapshot().by_prefix()
 
         for prefix, p_list in prefix_to_procs.items():
             if prefix in protected_prefixes:
@@ -0,0 +1,230 @@
+# program_index.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import os
+from threading import RLock
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from bottles.backend.logger import Logger
+from bottles.backend.utils import storage, yaml
+from bottles.backend.utils.lnk import LnkData, LnkUtils
+
+logging = Logger()
+
+# the shortcut folders, relative to the bottle, and whether their
+# subfolders are included; "*" is any user
+SHORTCUT_ROOTS = [
+    ("drive_c/users/*/Desktop", False),
+    ("drive_c/users/*/Start Menu/Programs", True),
+    ("drive_c/ProgramData/Microsoft/Windows/Start Menu/Programs", True),
+    ("drive_c/users/*/AppData/Roaming/Microsoft/Windows/Start Menu/Programs", True),
+]
+
+
+class ProgramLink(NamedTuple):
+    path: str
+    # the Windows path of the executable, None if it can't be read
+    target: Optional[str]
+    exists: bool
+    arguments: str = ""
+    working_dir: str = ""
+    icon_location: str = ""
+    icon_index: int = 0
+
+
+class ProgramIndexManager:
+    """
+    The ProgramIndexManager keeps the .lnk shortcuts of a bottle in the
+    program_index.yml file of the bottle: for each folder its mtime and
+    content, for each shortcut its mtime, size, target, arguments,
+    working dir, icon and whether the target exists. A scan lists again
+    only the folders whose mtime changed and parses only the new or
+    changed shortcuts.
+    """
+
+    file_name = "program_index.yml"
+    version = 3
+    __indexes: Dict[str, dict] = {}
+    __lock = RLock()
+
+    def __init__(self, bottle: str):
+        self.bottle = bottle
+        self.index_path = os.path.join(bottle, self.file_name)
+        # parsed shortcuts in the last scan, for diagnostics
+        self.parsed = 0
+
+    def __load(self) -> dict:
+        index = self.__indexes.get(self.bottle)
+        if index is not None:
+            return index
+
+        index = None
+        with contextlib.suppress(OSError, yaml.YAMLError):
+            index = storage.load_yaml(self.index_path)
+        if not isinstance(index, dict) or index.get("version") != self.version:
+            index = {"version": self.version, "dirs": {}, "links": {}}
+        self.__indexes[self.bottle] = index
+        return index
+
+    def __save(self, index: dict):
+        try:
+            storage.write_yaml(self.index_path, index)
+        except OSError as e:
+            logging.warning(f"Cannot write the program index of {self.bottle}: {e}")
+
+    def __roots(self) -> List[Tuple[str, bool]]:
+        try:
+            users = sorted(os.listdir(os.path.join(self.bottle, "drive_c/users")))
+        except OSError:
+            users = []
+
+        roots = []
+        for root, recursive in SHORTCUT_ROOTS:
+            if "*" not in root:
+                roots.append((os.path.join(self.bottle, root), recursive))
+                continue
+            for user in users:
+                if not user.startswith("."):
+                    path = os.path.join(self.bottle, root.replace("*", user))
+                    roots.append((path, recursive))
+        return roots
+
+    @staticmethod
+    def __list(path: str) -> dict:
+        links = []
+        dirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # as glob, skip the hidden entries
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.name.endswith(".lnk"):
+                        links.append(entry.name)
+                except OSError:
+                    continue
+        return {"links": sorted(links), "dirs": sorted(dirs)}
+
+    def __walk(
+        self,
+        path: str,
+        recursive: bool,
+        old_dirs: dict,
+        new_dirs: dict,
+        visited: Set[Tuple[int, int]],
+        found: List[str],
+    ):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        # the user folders can be links, don't enter a folder twice
+        if (stat.st_dev, stat.st_ino) in visited:
+            return
+        visited.add((stat.st_dev, stat.st_ino))
+
+        entry = old_dirs.get(path)
+        if entry is None or entry.get("mtime") != stat.st_mtime_ns:
+            try:
+                entry = {"mtime": stat.st_mtime_ns, **self.__list(path)}
+            except OSError:
+                return
+        new_dirs[path] = entry
+
+        found.extend(os.path.join(path, name) for name in entry["links"])
+        if recursive:
+            for name in entry["dirs"]:
+                self.__walk(
+                    os.path.join(path, name), True, old_dirs, new_dirs, visited, found
+                )
+
+    def __target_exists(self, target: Optional[str]) -> bool:
+        if not target:
+            return False
+        path = os.path.join(
+            self.bottle, target.replace("C:\\", "drive_c\\").replace("\\", "/")
+        )
+        return os.path.exists(path)
+
+    @staticmethod
+    def __parse(path: str) -> dict:
+        try:
+            data = LnkUtils.parse(path) or LnkData(None)
+        except OSError as e:
+            logging.warning(f"Cannot read the shortcut {path}: {e}")
+            data = LnkData(None)
+        return {
+            "target": data.target,
+            "arguments": data.arguments,
+            "working_dir": data.working_dir,
+            "icon_location": data.icon_location,
+            "icon_index": data.icon_index,
+        }
+
+    def scan(self) -> List[ProgramLink]:
+        """The shortcuts of the bottle, updating the index."""
+        with self.__lock:
+            index = self.__load()
+            old_dirs, old_links = index["dirs"], index["links"]
+            new_dirs: dict = {}
+            new_links: dict = {}
+            found: List[str] = []
+            visited: Set[Tuple[int, int]] = set()
+
+            for root, recursive in self.__roots():
+                self.__walk(root, recursive, old_dirs, new_dirs, visited, found)
+
+            self.parsed = 0
+            links = []
+            for path in found:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                key = [stat.st_mtime_ns, stat.st_size]
+                entry = old_links.get(path)
+                if entry is None or entry.get("stat") != key:
+                    entry = {"stat": key, **self.__parse(path)}
+                    self.parsed += 1
+                else:
+                    entry = dict(entry)
+                entry["exists"] = self.__target_exists(entry["target"])
+                new_links[path] = entry
+                links.append(
+                    ProgramLink(
+                        path,
+                        entry["target"],
+                        entry["exists"],
+                        entry["arguments"],
+                        entry["working_dir"],
+                        entry["icon_location"],
+                        entry["icon_index"],
+                    )
+                )
+
+            if new_dirs != old_dirs or new_links != old_links:
+                index["dirs"], index["links"] = new_dirs, new_links
+                self.__save(index)
+            return links
+
+    def forget(self):
+        """Drop the index of the bottle from memory, e.g. once deleted."""
+        with self.__lock:
+            self.__indexes.pop(self.bottle, None)
@@ -1,12 +1,9 @@
-import os
-import uuid
 from typing import TYPE_CHECKING, Iterable, List, Optional
 
 from bottles.backend.logger import Logger
 from bottles.backend.models.config import BottleConfig
 from bottles.backend.models.registry_rule import RegistryRule
 from bottles.backend.wine.reg import Reg
-from bottles.backend.utils.manager import ManagerUtils
 
 if TYPE_CHECKING:  # pragma: no cover
     from bottles.backend.managers.manager import Manager
@@ -70,21 +67,10 @@ class RegistryRuleManager:
                 or "all" in rule.triggers
             }
 
-        reg = Reg(config)
-        for name, rule in selected.items():
-            if not rule.keys.strip():
-                continue
-            logging.info(f"Applying registry rule '{name}' for {config.Name}")
-            reg_file = ManagerUtils.get_temp_path(f"{uuid.uuid4()}.reg")
-            keys = rule.keys.lstrip()
-            has_header = keys.upper().startswith("REGEDIT4") or keys.lower().startswith(
-                "windows registry editor version"
-            )
-
-            with open(reg_file, "w") as bundle_file:
-                if not has_header:
-                    bundle_file.write("REGEDIT4\n\n")
-                bundle_file.write(keys.rstrip())
-                bundle_file.write("\n")
-            reg.launch(f"import {reg_file}", communicate=True, minimal=True)
-            os.remove(reg_file)
+        # all the rules are imported at once
+        with Reg(config).transaction() as transaction:
+            for name, rule in selected.items():
+                if not rule.keys.strip():
+                    continue
+                logging.info(f"Applying registry rule '{name}' for {config.Name}")
+                transaction.import_reg(rule.keys.strip())
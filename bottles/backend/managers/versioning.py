@@ -20,9 +20,11 @@ import shutil
 from datetime import datetime
 from gettext import gettext as _
 from glob import glob
-from typing import Any
+from threading import Event
+from typing import Any, Dict, Optional, Tuple
 
 from bottles.fvs.exceptions import (
+    FVSCancelled,
     FVSNothingToCommit,
     FVSNothingToRestore,
     FVSStateNotFound,
@@ -43,6 +45,9 @@ logging = Logger()
 
 # noinspection PyTypeChecker
 class VersioningManager:
+    # the folder sizes of each bottle, see FileUtils.get_path_usage
+    __usage: Dict[str, dict] = {}
+
     def __init__(self, manager):
         self.manager = manager
 
@@ -53,6 +58,22 @@ class VersioningManager:
             patterns += config.Versioning_Exclusion_Patterns
         return patterns
 
+    @staticmethod
+    def __get_repo(config: BottleConfig) -> FVSRepo:
+        return FVSRepo.get(
+            ManagerUtils.get_bottle_path(config),
+            use_compression=config.Parameters.versioning_compression,
+        )
+
+    @classmethod
+    def __get_usage(cls, config: BottleConfig) -> Tuple[int, int]:
+        """The files and bytes fvs2 will go through, from the last walk."""
+        bottle_path = ManagerUtils.get_bottle_path(config)
+        cache = cls.__usage.setdefault(bottle_path, {})
+        return FileUtils.get_path_usage(
+            bottle_path, cache=cache, exclude=(".fvs2", ".fvs", "states")
+        )
+
     @staticmethod
     def is_initialized(config: BottleConfig):
         bottle_path = ManagerUtils.get_bottle_path(config)
@@ -92,6 +113,7 @@ class VersioningManager:
     @staticmethod
     def re_initialize(config: BottleConfig):
         bottle_path = ManagerUtils.get_bottle_path(config)
+        FVSRepo.forget(bottle_path)
 
         # Clean up FVS v1
         fvs_path = os.path.join(bottle_path, ".fvs")
@@ -112,18 +134,17 @@ class VersioningManager:
         self.re_initialize(config)
         return self.manager.update_config(config, "Versioning", False)
 
-    def create_state(self, config: BottleConfig, message: str = "No message"):
+    def create_state(
+        self,
+        config: BottleConfig,
+        message: str = "No message",
+        cancel_event: Optional[Event] = None,
+    ):
         bottle_path = ManagerUtils.get_bottle_path(config)
         patterns = self.__get_patterns(config)
 
-        drive_c_path = os.path.join(bottle_path, "drive_c")
-        drive_c_size = (
-            FileUtils().get_path_size(drive_c_path, human=False)
-            if os.path.exists(drive_c_path)
-            else 0
-        )
-
-        required_space = drive_c_size + (50 * 1024 * 1024)
+        usage = self.__get_usage(config)
+        required_space = usage[1] + (50 * 1024 * 1024)
         disk_usage = FileUtils().get_disk_size(path=bottle_path, human=False)
 
         if disk_usage["free"] < required_space:
@@ -136,16 +157,24 @@ class VersioningManager:
                 ).format(human_req),
             )
 
-        repo = FVSRepo(
-            repo_path=bottle_path,
-            use_compression=config.Parameters.versioning_compression,
+        repo = self.__get_repo(config)
+        task_id = TaskManager.add(
+            Task(title=_("Committing state …"), cancel_event=cancel_event or Event())
         )
-        task_id = TaskManager.add(Task(title=_("Committing state …")))
         try:
-            repo.commit(message, ignore=patterns, task_id=task_id)
+            repo.commit(
+                message,
+                ignore=patterns,
+                task_id=task_id,
+                total=usage,
+                cancel_event=TaskManager.get(task_id).cancel_event,
+            )
         except FVSNothingToCommit:
             TaskManager.remove(task_id)
             return Result(status=False, message=_("Nothing to commit"))
+        except FVSCancelled:
+            TaskManager.remove(task_id)
+            return Result(status=False, message=_("Snapshot cancelled"))
         except (RuntimeError, Exception) as e:
             TaskManager.remove(task_id)
             error_msg = str(e)
@@ -162,7 +191,7 @@ class VersioningManager:
                 ),
             )
 
-        repo._refresh()
+        repo.refresh()
         TaskManager.remove(task_id)
         return Result(
             status=True,
@@ -186,10 +215,7 @@ class VersioningManager:
         """
         if not self.needs_migration(config):
             try:
-                repo = FVSRepo(
-                    repo_path=ManagerUtils.get_bottle_path(config),
-                    use_compression=config.Parameters.versioning_compression,
-                )
+                repo = self.__get_repo(config)
                 if check_dirty:
                     repo.check_dirty()
             except FVSStateNotFound:
@@ -197,10 +223,7 @@ class VersioningManager:
                     "The FVS repository may be corrupted, trying to re-initialize it"
                 )
                 self.re_initialize(config)
-                repo = FVSRepo(
-                    repo_path=ManagerUtils.get_bottle_path(config),
-                    use_compression=config.Parameters.versioning_compression,
-                )
+                repo = self.__get_repo(config)
                 if check_dirty:
                     repo.check_dirty()
             return Result(
@@ -240,10 +263,7 @@ class VersioningManager:
     ) -> Result:
         if not self.needs_migration(config):
             patterns = self.__get_patterns(config)
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
             res = Result(
                 status=True,
                 message=_("State {0} restored successfully!").format(state_id),
@@ -252,7 +272,12 @@ class VersioningManager:
                 Task(title=_("Restoring state {} …".format(state_id)))
             )
             try:
-                repo.restore_state(state_id, ignore=patterns, task_id=task_id)
+                repo.restore_state(
+                    state_id,
+                    ignore=patterns,
+                    task_id=task_id,
+                    total=self.__get_usage(config),
+                )
             except FVSStateNotFound:
                 logging.error(f"State {state_id} not found.")
                 res = Result(status=False, message=_("State not found"))
@@ -317,13 +342,23 @@ class VersioningManager:
                 os.makedirs(os.path.dirname(target), exist_ok=True)
                 shutil.copy2(source, target)
 
+        # hash every candidate source at once, in parallel
+        sources = {
+            file["file"]: [
+                "%s/states/%s/drive_c/%s" % (bottle_path, str(i), file["file"])
+                for i in search_sources
+            ]
+            for file in edit_files
+        }
+        checksums = FileUtils.get_checksums(
+            [source for paths in sources.values() for source in paths]
+        )
+
         for file in edit_files:
             target = "%s/drive_c/%s" % (bottle_path, file["file"])
-            for i in search_sources:
-                source = "%s/states/%s/drive_c/%s" % (bottle_path, str(i), file["file"])
+            for source in sources[file["file"]]:
                 if os.path.isfile(source):
-                    checksum = FileUtils().get_checksum(source)
-                    if file["checksum"] == checksum:
+                    if file["checksum"] == checksums[source]:
                         os.makedirs(os.path.dirname(target), exist_ok=True)
                         shutil.copy2(source, target)
                         break
@@ -362,6 +397,7 @@ class VersioningManager:
         """List all files in a bottle and return as dict."""
         bottle_path = ManagerUtils.get_bottle_path(config)
         cur_index = {"Update_Date": str(datetime.now()), "Files": []}
+        files = []
         for file in glob("%s/drive_c/**" % bottle_path, recursive=True):
             if not os.path.isfile(file):
                 continue
@@ -372,20 +408,21 @@ class VersioningManager:
             if file[len(bottle_path) + 9 :].split("/")[0] in ["users"]:
                 continue
 
+            files.append(file)
+
+        checksums = FileUtils.get_checksums(files)
+        for file in files:
             cur_index["Files"].append(
                 {
                     "file": file[len(bottle_path) + 9 :],
-                    "checksum": FileUtils().get_checksum(file),
+                    "checksum": checksums[file],
                 }
             )
         return cur_index
 
     def get_branches(self, config: BottleConfig) -> list:
         try:
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
             return repo.branches
         except Exception as e:
             logging.error(f"Failed to get FVS branches: {e}")
@@ -393,10 +430,7 @@ class VersioningManager:
 
     def get_active_branch(self, config: BottleConfig) -> str:
         try:
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
             return repo.active_branch or ""
         except Exception as e:
             logging.error(f"Failed to get active FVS branch: {e}")
@@ -404,10 +438,7 @@ class VersioningManager:
 
     def create_branch(self, config: BottleConfig, branch_name: str) -> Result:
         try:
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
             repo.create_branch(branch_name)
             return Result(status=True, message=_("Branch created successfully"))
         except Exception as e:
@@ -416,10 +447,7 @@ class VersioningManager:
 
     def delete_branch(self, config: BottleConfig, branch_name: str) -> Result:
         try:
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
             repo.delete_branch(branch_name)
             return Result(status=True, message=_("Branch deleted successfully"))
         except Exception as e:
@@ -429,10 +457,7 @@ class VersioningManager:
     def checkout_branch(self, config: BottleConfig, branch_name: str) -> Result:
         try:
             patterns = self.__get_patterns(config)
-            repo = FVSRepo(
-                repo_path=ManagerUtils.get_bottle_path(config),
-                use_compression=config.Parameters.versioning_compression,
-            )
+            repo = self.__get_repo(config)
 
             try:
                 repo.commit(
@@ -443,7 +468,7 @@ class VersioningManager:
                 pass
 
             repo.checkout(branch_name)
-            repo._refresh()
+            repo.refresh()
 
             if repo.active_state_id:
                 repo.restore_state(repo.active_state_id, ignore=patterns)
@@ -2,16 +2,23 @@ import inspect
 import logging
 import os
 from dataclasses import asdict, dataclass, field, is_dataclass, replace
+from functools import lru_cache
 from io import IOBase
-from typing import IO, Container, Dict, ItemsView, List, Optional
+from typing import IO, Container, Dict, ItemsView, List, Mapping, Optional
 
 from bottles.backend.models.result import Result
-from bottles.backend.utils import yaml
+from bottles.backend.utils import storage, yaml
 
 # class name prefix "Bottle" is a workaround for:
 # https://github.com/python/cpython/issues/90104
 
 
+@lru_cache(maxsize=None)
+def _expected_fields(clazz) -> Mapping[str, inspect.Parameter]:
+    """signature lookup is slow and config classes never change at runtime"""
+    return inspect.signature(clazz).parameters
+
+
 # noinspection PyDataclass
 class DictCompatMixIn:
     @staticmethod
@@ -165,13 +172,17 @@ class BottleConfig(DictCompatMixIn):
 
         :param file: filepath str or IO-like object.
         :param mode: when param 'file' is filepath, use this mode to open file, otherwise ignored.
-               default is 'w'
+               default is 'w', which replaces the file atomically
         :param encoding: file content encoding, default is None(Decide by Python IO)
         :param indent: file indent width, default is 4
         """
         try:
             if isinstance(file, IOBase):
                 yaml.dump(self.to_dict(), file, indent=indent, encoding=encoding)
+            elif mode == "w":
+                storage.write_yaml(
+                    file, self.to_dict(), encoding=encoding or "utf-8", indent=indent
+                )
             else:
                 with open(file, mode=mode) as f:
                     yaml.dump(self.to_dict(), f, indent=indent, encoding=encoding)
@@ -191,28 +202,38 @@ class BottleConfig(DictCompatMixIn):
         """
         try:
             if isinstance(file, IOBase):
-                data = yaml.load(file)
-            else:
-                if not os.path.exists(file):
-                    logging.info("Config file %s not found, skipping load", file)
-                    return Result(False, message="Config file not exists")
+                return Result(True, data=cls._from_data(yaml.load(file)))
 
-                with open(file, mode=mode) as f:
-                    data = yaml.load(f)
-            if not isinstance(data, dict):
-                raise TypeError(
-                    "Config data should be dict type, but it was %s" % type(data)
-                )
+            if not os.path.exists(file):
+                logging.info("Config file %s not found, skipping load", file)
+                return Result(False, message="Config file not exists")
 
-            filled = cls._fill_with(data)
-            if not filled.status:
-                raise ValueError("Invalid Config data (%s)" % filled.message)
+            if mode != "r":
+                with open(file, mode=mode) as f:
+                    return Result(True, data=cls._from_data(yaml.load(f)))
 
-            return Result(True, data=filled.data)
+            # unchanged files are not parsed and validated again
+            config = storage.load_cached(
+                file, lambda text: cls._from_data(yaml.load(text)), kind=cls.__name__
+            )
+            return Result(True, data=config)
         except Exception as e:
             logging.exception(e)
             return Result(False, message=str(e))
 
+    @classmethod
+    def _from_data(cls, data) -> "BottleConfig":
+        if not isinstance(data, dict):
+            raise TypeError(
+                "Config data should be dict type, but it was %s" % type(data)
+            )
+
+        filled = cls._fill_with(data)
+        if not filled.status:
+            raise ValueError("Invalid Config data (%s)" % filled.message)
+
+        return filled.data
+
     @classmethod
     def _fill_with(cls, data: dict) -> Result[Optional["BottleConfig"]]:
         """fill with dict"""
@@ -270,7 +291,7 @@ class BottleConfig(DictCompatMixIn):
             clazz = cls
 
         new_data = {}
-        expected_fields = inspect.signature(clazz).parameters
+        expected_fields = _expected_fields(clazz)
 
         for k, v in data.items():
             if k in expected_fields:
@@ -27,7 +27,7 @@ class Events(Enum):
 class Signals(Enum):
     """Signals backend support"""
 
-    ManagerLocalBottlesLoaded = "Manager.local_bottles_loaded"  # no extra data
+    ManagerLocalBottlesLoaded = "Manager.local_bottles_loaded"  # data(BottlesDiff): added/removed/changed bottles
 
     ForceStopNetworking = (
         "LoadingView.stop_networking"  # status(bool): Force Stop network operations
@@ -95,6 +95,7 @@ class Task:
     _subtitle: str = ""
     hidden: bool = False  # hide from UI
     cancellable: bool = False
+    cancel_event: Optional[PyEvent] = None  # set by TaskManager.cancel
 
     def __init__(
         self,
@@ -102,11 +103,13 @@ class Task:
         subtitle: str = "",
         hidden: bool = False,
         cancellable: bool = False,
+        cancel_event: Optional[PyEvent] = None,
     ):
         self.title = title
         self.subtitle = subtitle
         self.hidden = hidden
-        self.cancellable = cancellable
+        self.cancellable = cancellable or cancel_event is not None
+        self.cancel_event = cancel_event
 
     @property
     def task_id(self) -> Optional[UUID]:
@@ -223,6 +226,13 @@ class TaskManager:
         SignalManager.send(Signals.TaskAdded, Result(True, task.task_id))
         return uniq
 
+    @classmethod
+    def cancel(cls, task_id: UUID):
+        """ask a cancellable task to stop, its owner removes it once stopped"""
+        task = cls._TASKS.get(task_id)
+        if task is not None and task.cancel_event is not None:
+            task.cancel_event.set()
+
     @classmethod
     def remove(cls, task: UUID | Task):
         if isinstance(task, Task):
@@ -0,0 +1,165 @@
+# archive.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tar extraction in a single pass: the archive is read as a stream
+(tarfile "r|" modes), so it is decompressed once and never seeked. The
+members are checked while they are extracted.
+"""
+
+import contextlib
+import os
+import shutil
+import subprocess
+import tarfile
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+XZ_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# tarfile checks the paths again where it can, the "data" filter would
+# refuse the absolute symlinks of the runners (e.g. dosdevices/z: -> /)
+_EXTRACT_ARGS = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+
+
+class UnsafeMemberError(tarfile.TarError):
+    """Raised when a member would be written outside the destination."""
+
+
+def get_decompressor(path: str) -> Optional[List[str]]:
+    """
+    The command decompressing the file to stdout, if it is xz or zstd
+    and the tool is installed. It runs alongside the extraction, xz
+    decompresses the multi-block archives on all the cores.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    if magic.startswith(XZ_MAGIC) and shutil.which("xz"):
+        return ["xz", "--decompress", "--stdout", "--threads=0", path]
+    if magic.startswith(ZSTD_MAGIC) and shutil.which("zstd"):
+        return ["zstd", "--decompress", "--stdout", "--quiet", path]
+    return None
+
+
+class TarExtractor:
+    """
+    Extract a tar archive to dest, from a path or a readable binary
+    stream (e.g. an HTTP response), in one pass. root is the top folder
+    of the archive, known from the first member, so a caller can clean
+    it up if the extraction fails.
+
+    The symlinks are extracted as they are, absolute ones included, but
+    nothing is written through them: before each member, its real path
+    (the links followed) must be in dest, as must the target of hard
+    links, or UnsafeMemberError is raised.
+    """
+
+    def __init__(self, dest: str):
+        self.dest = os.path.abspath(dest)
+        self.root: Optional[str] = None
+        self.__real_dest = os.path.realpath(self.dest)
+
+    def extract(self, source: Union[str, BinaryIO]) -> str:
+        """Extract the archive and return its root folder."""
+        with self.__open(source) as tar:
+            # like extractall, the attributes of the folders are set at
+            # the end, a read-only folder would refuse its files
+            folders = []
+            for member in tar:
+                if not self.__check(member):
+                    continue
+                if self.root is None:
+                    self.root = member.name.split("/")[0]
+                if member.isdir():
+                    folders.append(member)
+                tar.extract(
+                    member, self.dest, set_attrs=not member.isdir(), **_EXTRACT_ARGS
+                )
+
+            folders.sort(key=lambda m: m.name, reverse=True)
+            for member in folders:
+                path = os.path.join(self.dest, member.name)
+                tar.chown(member, path, False)
+                tar.utime(member, path)
+                tar.chmod(member, path)
+
+        if self.root is None:
+            raise tarfile.ReadError("The archive is empty")
+        return self.root
+
+    @contextlib.contextmanager
+    def __open(self, source: Union[str, BinaryIO]) -> Iterator[tarfile.TarFile]:
+        if not isinstance(source, str):
+            with tarfile.open(fileobj=source, mode="r|*") as tar:
+                yield tar
+            return
+
+        command = get_decompressor(source)
+        if command is None:
+            with tarfile.open(source, mode="r|*") as tar:
+                yield tar
+            return
+
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                yield tar
+            # the end of archive blocks may be read before the end
+            process.stdout.read()
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.terminate()
+            _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise tarfile.ReadError(
+                f"{command[0]} failed: {stderr.decode(errors='replace').strip()}"
+            )
+
+    def __check(self, member: tarfile.TarInfo) -> bool:
+        """Whether to extract the member, raises if it is unsafe."""
+        name = member.name
+        while name.startswith("./"):
+            name = name[2:]
+        member.name = name
+        if not name or name == ".":
+            return False
+        if os.path.isabs(name):
+            raise UnsafeMemberError(f"Unsafe member path: {name}")
+
+        if member.issym():
+            # an existing link there is replaced, not followed
+            parent, base = os.path.split(name)
+            if base == ".." or not self.__inside(parent):
+                raise UnsafeMemberError(f"Unsafe member path: {name}")
+            return True
+
+        if not self.__inside(name):
+            raise UnsafeMemberError(f"Unsafe member path: {name}")
+        if member.islnk():
+            if os.path.isabs(member.linkname) or not self.__inside(member.linkname):
+                raise UnsafeMemberError(f"Unsafe hard link: {name}")
+        elif not (member.isfile() or member.isdir()):
+            raise UnsafeMemberError(f"Unsupported member type: {name}")
+        return True
+
+    def __inside(self, name: str) -> bool:
+        """Whether name stays in dest, following the links extracted so far."""
+        path = os.path.realpath(os.path.join(self.__real_dest, name))
+        return os.path.commonpath([self.__real_dest, path]) == self.__real_dest
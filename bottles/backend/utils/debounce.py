@@ -0,0 +1,90 @@
+# debounce.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from threading import Lock, Timer
+from typing import Callable, Dict, Hashable, Optional
+
+from bottles.backend.logger import Logger
+
+logging = Logger()
+
+
+class Debouncer:
+    """
+    Run a callable only once the calls for the same key stop arriving
+    for the given delay. Each new schedule() replaces the pending callable
+    of its key and restarts the timer, so a burst of calls ends up in a
+    single run. The replaced calls are counted in coalesced.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self.coalesced = 0
+        self.__pending: Dict[Hashable, Callable[[], None]] = {}
+        self.__timers: Dict[Hashable, Timer] = {}
+        self.__lock = Lock()
+
+    def schedule(self, key: Hashable, func: Callable[[], None]) -> bool:
+        """Schedule func for key, returns whether a pending call was replaced."""
+        with self.__lock:
+            previous = self.__timers.pop(key, None)
+            if previous is not None:
+                previous.cancel()
+                self.coalesced += 1
+
+            timer = Timer(self.delay, self.__fire, args=(key,))
+            timer.daemon = True
+            self.__pending[key] = func
+            self.__timers[key] = timer
+            timer.start()
+        return previous is not None
+
+    def cancel(self, key: Hashable) -> bool:
+        """Drop the pending call for key, returns whether there was one."""
+        with self.__lock:
+            timer = self.__timers.pop(key, None)
+            self.__pending.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancel()
+        return True
+
+    def pending(self, key: Optional[Hashable] = None) -> bool:
+        with self.__lock:
+            if key is None:
+                return bool(self.__pending)
+            return key in self.__pending
+
+    def flush(self, key: Optional[Hashable] = None):
+        """Run now the pending calls (all of them if key is None)."""
+        with self.__lock:
+            keys = list(self.__pending) if key is None else [key]
+        for k in keys:
+            self.__fire(k)
+
+    def __fire(self, key: Hashable):
+        with self.__lock:
+            func = self.__pending.pop(key, None)
+            timer = self.__timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if func is None:
+            return
+        try:
+            func()
+        except Exception as e:
+            logging.exception(e)
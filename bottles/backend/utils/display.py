@@ -2,6 +2,8 @@ import os
 import subprocess
 from functools import lru_cache
 
+from bottles.backend.utils.hardware import HardwareProfile
+
 
 class DisplayUtils:
     @staticmethod
@@ -30,17 +32,7 @@ class DisplayUtils:
     @staticmethod
     def check_nvidia_device():
         """Check if there is an nvidia device connected"""
-        _query = "NVIDIA Corporation".lower()
-        try:
-            # Check lspci output for VGA controllers with NVIDIA vendor
-            output = subprocess.check_output(["lspci"], text=True).lower()
-            for line in output.splitlines():
-                if "vga" in line and _query in line:
-                    return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-
-        return False
+        return HardwareProfile.get().has_nvidia_vga
 
     @staticmethod
     def display_server_type():
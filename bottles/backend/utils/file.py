@@ -16,12 +16,14 @@
 #
 
 import fcntl
-import hashlib
 import os
 import shutil
 import time
 from array import array
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from bottles.backend.utils.hashing import hash_files
 
 
 class FileUtils:
@@ -31,19 +33,25 @@ class FileUtils:
     """
 
     @staticmethod
-    def get_checksum(file):
+    def get_checksum(file, algorithm: str = "md5", cache: bool = True):
         """
-        This function returns the MD5 checksum of the given file.
+        This function returns the checksum of the given file, MD5 by
+        default, None if it doesn't exist. See the hashing module.
         """
-        checksum = hashlib.md5()
+        return hash_files([file], algorithm, cache=cache)[file]
 
-        try:
-            with open(file, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    checksum.update(chunk)
-            return checksum.hexdigest().lower()
-        except FileNotFoundError:
-            return None
+    @staticmethod
+    def get_checksums(
+        files: Iterable[str],
+        algorithm: str = "md5",
+        workers: Optional[int] = None,
+        cache: bool = True,
+    ) -> Dict[str, Optional[str]]:
+        """
+        This function returns the checksums of many files at once, hashed
+        in parallel, None for the missing ones.
+        """
+        return hash_files(files, algorithm, workers=workers, cache=cache)
 
     @staticmethod
     def use_insensitive_ext(string):
@@ -84,6 +92,55 @@ class FileUtils:
 
         return size
 
+    @staticmethod
+    def get_path_usage(
+        path: str, cache: Optional[dict] = None, exclude: Tuple[str, ...] = ()
+    ) -> Tuple[int, int]:
+        """
+        Returns the number of files under path and their size, links
+        are not followed. The names in exclude are skipped at any depth.
+        With a cache dict, the folders whose mtime didn't change are not
+        listed again on the next calls: it is fast but a file growing in
+        place is only counted again once its folder changes.
+        """
+        old = cache if cache is not None else {}
+        new = {}
+        files = size = 0
+        stack = [path]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            entry = old.get(folder)
+            if entry is None or entry[0] != mtime:
+                entry = [mtime, 0, 0, []]
+                try:
+                    with os.scandir(folder) as entries:
+                        for e in entries:
+                            if e.name in exclude:
+                                continue
+                            try:
+                                if e.is_dir(follow_symlinks=False):
+                                    entry[3].append(e.name)
+                                elif e.is_file(follow_symlinks=False):
+                                    entry[1] += 1
+                                    entry[2] += e.stat(follow_symlinks=False).st_size
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+            new[folder] = entry
+            files += entry[1]
+            size += entry[2]
+            stack.extend(os.path.join(folder, name) for name in entry[3])
+
+        if cache is not None:
+            cache.clear()
+            cache.update(new)
+        return files, size
+
     def get_disk_size(self, path: str = "/", human: bool = True) -> dict:
         """
         Returns the size of the disk. If human is True, returns as a
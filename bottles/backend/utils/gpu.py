@@ -15,15 +15,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-import re
-import shutil
-import subprocess
 from enum import Enum
-from functools import lru_cache
 
 from bottles.backend.logger import Logger
-from bottles.backend.utils.nvidia import get_nvidia_dll_path
-from bottles.backend.utils.vulkan import VulkanUtils
+from bottles.backend.utils.hardware import HardwareProfile
 
 logging = Logger()
 
@@ -36,29 +31,17 @@ class GPUVendors(Enum):
 
 # noinspection PyTypeChecker
 class GPUUtils:
-    __vendors = {
-        "nvidia": "NVIDIA Corporation",
-        "amd": "Advanced Micro Devices, Inc.",
-        "intel": "Intel Corporation",
-    }
+    """
+    The GPUs and their launch environment, from the HardwareProfile of
+    this boot, so no tool is spawned on the way to a launch.
+    """
 
-    def __init__(self):
-        self.vk = VulkanUtils()
+    @property
+    def profile(self) -> HardwareProfile:
+        return HardwareProfile.get()
 
     def list_all(self):
-        found = []
-        if not shutil.which("lspci"):
-            logging.warning("lspci not found, cannot detect GPUs natively via lspci.")
-            return found
-        try:
-            stdout = subprocess.check_output(["lspci"], text=True)
-            for _vendor in self.__vendors:
-                if self.__vendors[_vendor] in stdout:
-                    found.append(_vendor)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-
-        return found
+        return self.profile.vendors
 
     @staticmethod
     def assume_discrete(vendors: list):
@@ -72,21 +55,13 @@ class GPUUtils:
 
     @staticmethod
     def is_nouveau():
-        try:
-            stdout = subprocess.check_output(["lsmod"], text=True)
-            if "nouveau" in stdout:
-                logging.warning("Nouveau driver detected, this may cause issues")
-                return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+        if HardwareProfile.get().nouveau:
+            logging.warning("Nouveau driver detected, this may cause issues")
+            return True
         return False
 
     def get_gpu(self):
-        checks = {
-            "nvidia": {"query": "(VGA|3D|Display).*NVIDIA"},
-            "amd": {"query": "(VGA|3D|Display).*AMD/ATI"},
-            "intel": {"query": "(VGA|3D|Display).*Intel"},
-        }
+        icd = self.profile.icd
         gpus = {
             "nvidia": {
                 "vendor": "nvidia",
@@ -95,35 +70,29 @@ class GPUUtils:
                     "__GLX_VENDOR_LIBRARY_NAME": "nvidia",
                     "__VK_LAYER_NV_optimus": "NVIDIA_only",
                 },
-                "icd": self.vk.get_vk_icd("nvidia", as_string=True),
-                "nvngx_path": get_nvidia_dll_path(),
+                "icd": icd.get("nvidia", ""),
+                "nvngx_path": self.profile.nvngx_path,
             },
             "amd": {
                 "vendor": "amd",
                 "envs": {"DRI_PRIME": "1"},
-                "icd": self.vk.get_vk_icd("amd", as_string=True),
+                "icd": icd.get("amd", ""),
             },
             "intel": {
                 "vendor": "intel",
                 "envs": {"DRI_PRIME": "1"},
-                "icd": self.vk.get_vk_icd("intel", as_string=True),
+                "icd": icd.get("intel", ""),
             },
         }
-        found = []
+        found = self.profile.gpu_vendors
         result = {"vendors": {}, "prime": {"integrated": None, "discrete": None}}
 
         if self.is_nouveau():
             gpus["nvidia"]["envs"] = {"DRI_PRIME": "1"}
             gpus["nvidia"]["icd"] = ""
 
-        try:
-            stdout = subprocess.check_output(["lspci"], text=True)
-            for _check in checks:
-                if re.search(checks[_check]["query"], stdout, re.IGNORECASE):
-                    found.append(_check)
-                    result["vendors"][_check] = gpus[_check]
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
+        for _vendor in found:
+            result["vendors"][_vendor] = gpus[_vendor]
 
         if len(found) >= 2:
             _discrete = self.assume_discrete(found)
@@ -136,10 +105,5 @@ class GPUUtils:
         return result
 
     @staticmethod
-    @lru_cache
     def is_gpu(vendor: GPUVendors) -> bool:
-        try:
-            stdout = subprocess.check_output(["lspci"], text=True)
-            return re.search(vendor.value, stdout, re.IGNORECASE) is not None
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return vendor.value in HardwareProfile.get().gpu_vendors
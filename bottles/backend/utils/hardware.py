@@ -0,0 +1,203 @@
+# hardware.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+The GPUs of the system, probed once per boot. The PCI devices are read
+from sysfs (lspci is only a fallback) and the result is stored on disk
+with the boot id, so the following launches of Bottles and of every
+wine helper read it from memory instead of spawning lspci and lsmod.
+"""
+
+import dataclasses
+import os
+import shutil
+import subprocess
+from threading import Lock
+from typing import ClassVar, Dict, List, Optional, Tuple
+
+from bottles.backend.globals import Paths
+from bottles.backend.logger import Logger
+from bottles.backend.utils import json
+from bottles.backend.utils.storage import atomic_write
+
+logging = Logger()
+
+BOOT_ID = "/proc/sys/kernel/random/boot_id"
+PCI_VENDORS = {
+    "nvidia": 0x10DE,
+    "amd": 0x1002,
+    "intel": 0x8086,
+}
+# the PCI base class of display controllers, VGA is its subclass 0x00
+PCI_CLASS_DISPLAY = 0x03
+PCI_CLASS_VGA = 0x0300
+
+
+@dataclasses.dataclass
+class HardwareProfile:
+    boot_id: str = ""
+    # (vendor id, class code) of each PCI device
+    devices: List[Tuple[int, int]] = dataclasses.field(default_factory=list)
+    nouveau: bool = False
+    # the Vulkan ICD loaders of each vendor, joined by ":"
+    icd: Dict[str, str] = dataclasses.field(default_factory=dict)
+    nvngx_path: Optional[str] = None
+
+    __profile: ClassVar[Optional["HardwareProfile"]] = None
+    __lock = Lock()
+
+    @classmethod
+    def get(cls) -> "HardwareProfile":
+        """
+        The profile of this boot, from memory, from the disk or probed
+        on the first use after a reboot.
+        """
+        with cls.__lock:
+            boot_id = cls.get_boot_id()
+            profile = cls.__profile
+            if profile is None or profile.boot_id != boot_id:
+                profile = cls.load(Paths.hardware_profile)
+                if profile is None or profile.boot_id != boot_id:
+                    profile = cls.probe()
+                    profile.boot_id = boot_id
+                    profile.save(Paths.hardware_profile)
+                cls.__profile = profile
+            return profile
+
+    @classmethod
+    def invalidate(cls):
+        """Probe again on the next get(), e.g. after a driver change."""
+        with cls.__lock:
+            cls.__profile = None
+            try:
+                os.remove(Paths.hardware_profile)
+            except OSError:
+                pass
+
+    @staticmethod
+    def get_boot_id() -> str:
+        try:
+            with open(BOOT_ID) as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    @classmethod
+    def probe(cls, sysfs: str = "/sys") -> "HardwareProfile":
+        from bottles.backend.utils.nvidia import find_nvidia_dll_path
+        from bottles.backend.utils.vulkan import VulkanUtils
+
+        devices = cls.read_pci_devices(os.path.join(sysfs, "bus/pci/devices"))
+        if devices is None:
+            devices = cls.read_lspci()
+
+        profile = cls(
+            devices=devices,
+            nouveau=os.path.isdir(os.path.join(sysfs, "module/nouveau")),
+        )
+        vk = VulkanUtils()
+        profile.icd = {v: vk.get_vk_icd(v, as_string=True) for v in PCI_VENDORS}
+        if "nvidia" in profile.gpu_vendors and not profile.nouveau:
+            profile.nvngx_path = find_nvidia_dll_path()
+
+        logging.info(f"Hardware profile: GPUs {profile.gpu_vendors or 'unknown'}")
+        return profile
+
+    @staticmethod
+    def read_pci_devices(path: str) -> Optional[List[Tuple[int, int]]]:
+        """The devices from sysfs, None if it is not available."""
+        try:
+            entries = os.listdir(path)
+        except OSError:
+            return None
+
+        devices = []
+        for entry in sorted(entries):
+            try:
+                with open(os.path.join(path, entry, "vendor")) as f:
+                    vendor = int(f.read(), 16)
+                with open(os.path.join(path, entry, "class")) as f:
+                    # class, subclass and programming interface
+                    pci_class = int(f.read(), 16) >> 8
+            except (OSError, ValueError):
+                continue
+            devices.append((vendor, pci_class))
+        return devices
+
+    @staticmethod
+    def read_lspci() -> List[Tuple[int, int]]:
+        if not shutil.which("lspci"):
+            logging.warning("Neither sysfs nor lspci are available to detect GPUs.")
+            return []
+        try:
+            stdout = subprocess.check_output(["lspci", "-n"], text=True)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return []
+
+        # e.g. "00:02.0 0300: 8086:3e9b (rev 02)"
+        devices = []
+        for line in stdout.splitlines():
+            fields = line.split()
+            try:
+                pci_class = int(fields[1].rstrip(":"), 16)
+                vendor = int(fields[2].split(":")[0], 16)
+            except (IndexError, ValueError):
+                continue
+            devices.append((vendor, pci_class))
+        return devices
+
+    @property
+    def vendors(self) -> List[str]:
+        """The known vendors of any PCI device."""
+        ids = {vendor for vendor, _ in self.devices}
+        return [name for name, vendor in PCI_VENDORS.items() if vendor in ids]
+
+    @property
+    def gpu_vendors(self) -> List[str]:
+        """The known vendors of the display controllers."""
+        ids = {
+            vendor
+            for vendor, pci_class in self.devices
+            if pci_class >> 8 == PCI_CLASS_DISPLAY
+        }
+        return [name for name, vendor in PCI_VENDORS.items() if vendor in ids]
+
+    @property
+    def has_nvidia_vga(self) -> bool:
+        return (PCI_VENDORS["nvidia"], PCI_CLASS_VGA) in self.devices
+
+    @classmethod
+    def load(cls, path: str) -> "Optional[HardwareProfile]":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(
+                boot_id=data["boot_id"],
+                devices=[(int(v), int(c)) for v, c in data["devices"]],
+                nouveau=bool(data["nouveau"]),
+                icd=dict(data["icd"]),
+                nvngx_path=data.get("nvngx_path"),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, json.dumps(dataclasses.asdict(self)))
+        except OSError as e:
+            logging.warning(f"Cannot store the hardware profile: {e}")
@@ -0,0 +1,225 @@
+# hashing.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+File hashing: files are read in large blocks into a reused buffer and
+many files are hashed by a thread pool, as hashlib releases the GIL on
+large updates. The digests are stored by path, size, mtime and inode, so
+a file is only read again once it changed.
+"""
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bottles.backend.globals import Paths
+from bottles.backend.logger import Logger
+
+logging = Logger()
+
+ALGORITHMS = ("md5", "sha1", "sha256", "blake2b")
+BUFFER_SIZE = 1024 * 1024
+
+_buffers = threading.local()
+
+
+def new_hash(algorithm: str = "md5"):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+    return hashlib.new(algorithm)
+
+
+def hash_file(path: str, algorithm: str = "md5") -> str:
+    """The hex digest of the file, raises OSError if it can't be read."""
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _buffers.buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    digest = new_hash(algorithm)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest().lower()
+
+
+def file_key(path: str) -> Optional[Tuple[int, int, int]]:
+    """The size, mtime and inode of the file, None if missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class DigestCache:
+    """
+    The digests of the hashed files, in an SQLite database. An entry is
+    valid while the size, mtime and inode of the file match; the oldest
+    entries are dropped above max_entries.
+    """
+
+    max_entries = 200_000
+    __conn: Optional[sqlite3.Connection] = None
+    __conn_path: Optional[str] = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def __connect(cls) -> Optional[sqlite3.Connection]:
+        if cls.__conn is not None and cls.__conn_path == Paths.hash_cache:
+            return cls.__conn
+        try:
+            os.makedirs(os.path.dirname(Paths.hash_cache), exist_ok=True)
+            conn = sqlite3.connect(Paths.hash_cache, timeout=3, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS digests (
+                    path TEXT NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    PRIMARY KEY (path, algorithm)
+                );
+                """
+            )
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"The hash cache is not available: {e}")
+            return None
+        if cls.__conn is not None:
+            cls.__conn.close()
+        cls.__conn, cls.__conn_path = conn, Paths.hash_cache
+        return conn
+
+    @classmethod
+    def get_many(
+        cls, keys: Dict[str, Tuple[int, int, int]], algorithm: str
+    ) -> Dict[str, str]:
+        """The stored digests of the paths whose key still matches."""
+        found = {}
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return found
+            try:
+                for path, key in keys.items():
+                    row = conn.execute(
+                        "SELECT size, mtime, inode, digest FROM digests "
+                        "WHERE path = ? AND algorithm = ?",
+                        (os.path.abspath(path), algorithm),
+                    ).fetchone()
+                    if row is not None and tuple(row[:3]) == key:
+                        found[path] = row[3]
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot read the hash cache: {e}")
+        return found
+
+    @classmethod
+    def put_many(
+        cls, entries: List[Tuple[str, Tuple[int, int, int], str]], algorithm: str
+    ):
+        if not entries:
+            return
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (os.path.abspath(path), algorithm, *key, digest)
+                            for path, key, digest in entries
+                        ],
+                    )
+                    # the replaced rows get a new rowid, the lowest are the oldest
+                    conn.execute(
+                        "DELETE FROM digests WHERE rowid <= "
+                        "(SELECT MAX(rowid) FROM digests) - ?",
+                        (cls.max_entries,),
+                    )
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot write the hash cache: {e}")
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            conn = cls.__connect()
+            if conn is not None:
+                with contextlib.suppress(sqlite3.Error), conn:
+                    conn.execute("DELETE FROM digests")
+
+
+def hash_files(
+    paths: Iterable[str],
+    algorithm: str = "md5",
+    workers: Optional[int] = None,
+    cache: bool = True,
+) -> Dict[str, Optional[str]]:
+    """
+    The digests of the files, None for the files that can't be read.
+    The files missing from the cache are hashed by a pool of workers
+    threads, by default one per CPU, at most 8.
+    """
+    new_hash(algorithm)
+    keys = {}
+    digests: Dict[str, Optional[str]] = {}
+    for path in paths:
+        key = file_key(path)
+        if key is None:
+            digests[path] = None
+        else:
+            keys[path] = key
+
+    if cache:
+        digests.update(DigestCache.get_many(keys, algorithm))
+    pending = [path for path in keys if path not in digests]
+
+    def task(path: str) -> Optional[str]:
+        try:
+            return hash_file(path, algorithm)
+        except OSError:
+            return None
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+    # a single file is hashed sequentially anyway
+    if workers <= 1 or len(pending) <= 1:
+        results = [task(path) for path in pending]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, pending))
+
+    computed = []
+    for path, digest in zip(pending, results):
+        digests[path] = digest
+        # the file could change while hashed, store the key seen before
+        if digest is not None and file_key(path) == keys[path]:
+            computed.append((path, keys[path], digest))
+    if cache:
+        DigestCache.put_many(computed, algorithm)
+    return digests
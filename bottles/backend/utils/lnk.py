@@ -15,61 +15,191 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+"""
+A reader for the Windows shortcuts (.lnk, see [MS-SHLLINK]). Only the
+header, the LinkInfo and the StringData sections are read, with pread,
+and the results are cached by path, mtime and size.
+"""
+
 import locale
+import os
 import struct
-from functools import lru_cache
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple, Optional, Tuple
+
+HEADER_SIZE = 0x4C
+READ_SIZE = 4096
+
+# LinkFlags
+HAS_LINK_TARGET_ID_LIST = 0x01
+HAS_LINK_INFO = 0x02
+HAS_NAME = 0x04
+HAS_RELATIVE_PATH = 0x08
+HAS_WORKING_DIR = 0x10
+HAS_ARGUMENTS = 0x20
+HAS_ICON_LOCATION = 0x40
+IS_UNICODE = 0x80
+
+# LinkInfoFlags
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x01
+
+_ansi: Optional[str] = None
+
+
+def _ansi_encoding() -> str:
+    """The encoding of the non unicode strings, looked up once."""
+    global _ansi
+    if _ansi is None:
+        _ansi = locale.getpreferredencoding(False) or "cp1252"
+    return _ansi
+
+
+class LnkData(NamedTuple):
+    # the Windows path of the target
+    target: Optional[str]
+    arguments: str = ""
+    working_dir: str = ""
+    icon_location: str = ""
+    icon_index: int = 0
+    description: str = ""
+    relative_path: str = ""
+
+
+class _Reader:
+    """Reads the file on demand with pread, in blocks."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.data = b""
+
+    def read(self, offset: int, size: int) -> bytes:
+        end = offset + size
+        while len(self.data) < end:
+            block = os.pread(
+                self.fd, max(READ_SIZE, end - len(self.data)), len(self.data)
+            )
+            if not block:
+                raise ValueError("truncated shortcut")
+            self.data += block
+        return self.data[offset:end]
+
+    def unpack(self, fmt: str, offset: int) -> Tuple:
+        return struct.unpack_from(fmt, self.read(offset, struct.calcsize(fmt)))
+
+    def string(self, offset: int, unicode: bool) -> str:
+        """A null terminated string at offset."""
+        step = 2 if unicode else 1
+        end = offset
+        while True:
+            if self.read(end, step) == b"\0" * step:
+                break
+            end += step
+        raw = self.read(offset, end - offset)
+        if unicode:
+            return raw.decode("utf-16-le", errors="replace")
+        return raw.decode(_ansi_encoding(), errors="replace")
 
 
 class LnkUtils:
+    cache_size = 1024
+    __cache: "OrderedDict[Tuple[str, int, int], Optional[LnkData]]" = OrderedDict()
+    __lock = Lock()
+
     @staticmethod
-    @lru_cache
-    def get_data(path):
+    def get_data(path) -> Optional[str]:
+        """The Windows path of the shortcut target, None if unknown."""
+        data = LnkUtils.parse(path)
+        return data.target if data else None
+
+    @classmethod
+    def parse(cls, path) -> Optional[LnkData]:
         """
-        Gets data from a .lnk file, and returns them in a dictionary.
-        Thanks to @Winand and @Jared for the code.
-        <https://gist.github.com/Winand/997ed38269e899eb561991a0c663fa49>
+        The data of the shortcut, None if it is not a valid shortcut.
+        Raises OSError if it can't be read.
         """
-        with open(path, "rb") as stream:
-            content = stream.read()
-            """
-            Skip first 20 bytes (HeaderSize and LinkCLSID)
-            read the LinkFlags structure (4 bytes)
-            """
-            lflags = struct.unpack("I", content[0x14:0x18])[0]
-            position = 0x18
-
-            if (lflags & 0x01) == 1:
-                """
-                If the HasLinkTargetIDList bit is set then skip the stored IDList
-                structure and header
-                """
-                position = struct.unpack("H", content[0x4C:0x4E])[0] + 0x4E
-
-            last_pos = position
-            position += 0x04
-
-            # get how long the file information is (LinkInfoSize)
-            length = struct.unpack("I", content[last_pos:position])[0]
-
-            """
-            Skip 12 bytes (LinkInfoHeaderSize, LinkInfoFlags and
-            VolumeIDOffset)
-            """
-            position += 0x0C
-
-            # go to the LocalBasePath position
-            lbpos = struct.unpack("I", content[position : position + 0x04])[0]
-            position = last_pos + lbpos
-
-            # read the string at the given position of the determined length
-            size = (length + last_pos) - position - 0x02
-            content = content[position : position + size].split(b"\x00", 1)
-
-            decode = locale.getdefaultlocale()[1]
-            if len(content) > 1 or decode is None:
-                decode = "utf-16"
-
-            try:
-                return content[-1].decode(decode)
-            except UnicodeDecodeError:
-                return None
+        stat = os.stat(path)
+        key = (os.fspath(path), stat.st_mtime_ns, stat.st_size)
+        with cls.__lock:
+            if key in cls.__cache:
+                cls.__cache.move_to_end(key)
+                return cls.__cache[key]
+
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            data = cls.__parse(_Reader(fd))
+        except (ValueError, struct.error, UnicodeDecodeError):
+            data = None
+        finally:
+            os.close(fd)
+
+        with cls.__lock:
+            cls.__cache[key] = data
+            while len(cls.__cache) > cls.cache_size:
+                cls.__cache.popitem(last=False)
+        return data
+
+    @classmethod
+    def cache_clear(cls):
+        with cls.__lock:
+            cls.__cache.clear()
+
+    @staticmethod
+    def __parse(reader: _Reader) -> LnkData:
+        (header_size,) = reader.unpack("<I", 0)
+        if header_size != HEADER_SIZE:
+            raise ValueError("not a shortcut")
+        (flags,) = reader.unpack("<I", 0x14)
+        (icon_index,) = reader.unpack("<i", 0x38)
+        position = HEADER_SIZE
+
+        if flags & HAS_LINK_TARGET_ID_LIST:
+            (id_list_size,) = reader.unpack("<H", position)
+            position += 2 + id_list_size
+
+        target = None
+        if flags & HAS_LINK_INFO:
+            info = position
+            (info_size, info_header_size, info_flags) = reader.unpack("<III", info)
+            if info_flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+                (base, _, suffix) = reader.unpack("<III", info + 0x10)
+                if info_header_size >= 0x24:
+                    (base_w, suffix_w) = reader.unpack("<II", info + 0x1C)
+                    target = reader.string(info + base_w, True)
+                    if suffix_w:
+                        target += reader.string(info + suffix_w, True)
+                else:
+                    target = reader.string(info + base, False)
+                    if suffix:
+                        target += reader.string(info + suffix, False)
+            position += info_size
+
+        unicode = bool(flags & IS_UNICODE)
+        strings = {}
+        for flag in (
+            HAS_NAME,
+            HAS_RELATIVE_PATH,
+            HAS_WORKING_DIR,
+            HAS_ARGUMENTS,
+            HAS_ICON_LOCATION,
+        ):
+            if not flags & flag:
+                continue
+            (count,) = reader.unpack("<H", position)
+            size = count * 2 if unicode else count
+            raw = reader.read(position + 2, size)
+            if unicode:
+                strings[flag] = raw.decode("utf-16-le", errors="replace")
+            else:
+                strings[flag] = raw.decode(_ansi_encoding(), errors="replace")
+            position += 2 + size
+
+        return LnkData(
+            target=target or None,
+            arguments=strings.get(HAS_ARGUMENTS, ""),
+            working_dir=strings.get(HAS_WORKING_DIR, ""),
+            icon_location=strings.get(HAS_ICON_LOCATION, ""),
+            icon_index=icon_index,
+            description=strings.get(HAS_NAME, ""),
+            relative_path=strings.get(HAS_RELATIVE_PATH, ""),
+        )
@@ -191,7 +191,14 @@ class ManagerUtils:
         return os.path.dirname(executable_path)
 
     @staticmethod
-    def extract_icon(config: BottleConfig, program_name: str, program_path: str) -> str:
+    def extract_icon(
+        config: BottleConfig, program_name: str, program_path: str, index: int = 0
+    ) -> str:
+        """
+        Export the icon of the executable or library, the index-th one,
+        or the one with the resource id -index if negative (as in the
+        shortcuts). Returns the default program icon if it fails.
+        """
         from bottles.backend.wine.winepath import WinePath
 
         winepath = WinePath(config)
@@ -213,7 +220,10 @@ class ManagerUtils:
             if os.path.exists(ico_dest):
                 os.remove(ico_dest)
 
-            ico.export_icon(ico_dest_temp)
+            if index < 0:
+                ico.export_icon(ico_dest_temp, resource_id=-index)
+            else:
+                ico.export_icon(ico_dest_temp, num=index)
             if get_mime(ico_dest_temp) == "image/vnd.microsoft.icon":
                 if not ico_dest_temp.endswith(".ico"):
                     shutil.move(ico_dest_temp, f"{ico_dest_temp}.ico")
@@ -229,6 +239,25 @@ class ManagerUtils:
 
         return icon
 
+    @staticmethod
+    def get_program_icon(config: BottleConfig, program: dict) -> str:
+        """
+        The icon of the shortcut the program was discovered from, else
+        the one of its executable.
+        """
+        icon = "com.usebottles.bottles-program"
+        icon_path = program.get("icon_location") or ""
+        # the variables (e.g. %SystemRoot%) can't be resolved here
+        if icon_path.lower().endswith((".exe", ".dll")) and "%" not in icon_path:
+            icon = ManagerUtils.extract_icon(
+                config, program.get("name"), icon_path, program.get("icon_index") or 0
+            )
+        if icon == "com.usebottles.bottles-program":
+            icon = ManagerUtils.extract_icon(
+                config, program.get("name"), program.get("path")
+            )
+        return icon
+
     @staticmethod
     def create_desktop_entry(
         config,
@@ -242,9 +271,7 @@ class ManagerUtils:
         icon = "com.usebottles.bottles-program"
 
         if not skip_icon and not custom_icon:
-            icon = ManagerUtils.extract_icon(
-                config, program.get("name"), program.get("path")
-            )
+            icon = ManagerUtils.get_program_icon(config, program)
         elif custom_icon:
             icon = custom_icon
 
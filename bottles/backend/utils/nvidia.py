@@ -96,6 +96,11 @@ def get_nvidia_dll_path():
     if not GPUUtils.is_gpu(GPUVendors.NVIDIA):
         return None
 
+    return find_nvidia_dll_path()
+
+
+def find_nvidia_dll_path():
+    """The path of get_nvidia_dll_path(), without checking the GPU."""
     libglx_path = get_nvidia_glx_path()
     if not libglx_path:
         logging.warning("Unable to locate libGLX_nvidia")
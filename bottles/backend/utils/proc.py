@@ -15,20 +15,34 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import copy
 import os
-import subprocess
+import time
+from typing import Callable, Collection, Dict, List, NamedTuple, Optional, Union
 
 
 class Proc:
-    def __init__(self, pid):
+    def __init__(self, pid, root: str = "/proc", cached: bool = False):
         self.pid = pid
+        self.root = root
+        # with cached, each file is read once, for snapshots
+        self.__cache: Optional[Dict[str, str]] = {} if cached else None
 
     def __get_data(self, data):
+        if self.__cache is not None and data in self.__cache:
+            return self.__cache[data]
         try:
-            with open(os.path.join("/proc", str(self.pid), data), "rb") as f:
-                return f.read().decode("utf-8")
-        except (FileNotFoundError, PermissionError):
-            return ""
+            with open(os.path.join(self.root, str(self.pid), data), "rb") as f:
+                value = f.read().decode("utf-8", errors="replace")
+        except (FileNotFoundError, PermissionError, ProcessLookupError):
+            value = ""
+        if self.__cache is not None:
+            self.__cache[data] = value
+        return value
+
+    def is_read(self, data: str) -> bool:
+        """Whether data was already read, by a cached Proc."""
+        return self.__cache is not None and data in self.__cache
 
     def get_cmdline(self):
         return self.__get_data("cmdline")
@@ -36,68 +50,208 @@ class Proc:
     def get_env(self):
         return self.__get_data("environ")
 
+    def get_prefix(self) -> str:
+        """The WINEPREFIX of the process, empty if not set."""
+        for var in self.get_env().split("\x00"):
+            if var.startswith("WINEPREFIX="):
+                return var.split("=", 1)[1].rstrip("/")
+        return ""
+
     def get_cwd(self):
-        return self.__get_data("cwd")
+        try:
+            return os.readlink(os.path.join(self.root, str(self.pid), "cwd"))
+        except OSError:
+            return ""
 
     def get_stat(self):
         return self.__get_data("stat")
 
+    def __get_fields(self) -> List[str]:
+        # the fields after the name, which can hold spaces and parenthesis
+        stat = self.get_stat()
+        end = stat.rfind(")")
+        if end == -1:
+            return []
+        return stat[end + 1 :].split()
+
     def get_name(self):
         stat = self.get_stat()
         if not stat:
             return ""
         # The name is inside parenthesis, e.g. "123 (wineserver) S ..."
         try:
-            return stat.split("(", 1)[1].split(")", 1)[0]
+            return stat.split("(", 1)[1].rsplit(")", 1)[0]
         except IndexError:
             return ""
 
     def get_state(self):
-        stat = self.get_stat()
-        if not stat:
-            return ""
+        fields = self.__get_fields()
         # The state is the field immediately following the closing parenthesis
+        return fields[0] if fields else ""
+
+    def get_stat_field(self, index: int) -> int:
+        """
+        A numeric field of stat, counted from the state after the name
+        (e.g. 1 is the parent pid, 17 the threads), 0 if it is gone.
+        """
+        fields = self.__get_fields()
         try:
-            return stat.split(")", 1)[1].strip().split(" ", 1)[0]
-        except IndexError:
-            return ""
+            return int(fields[index])
+        except (IndexError, ValueError):
+            return 0
+
+    def get_start_time(self) -> int:
+        """The start time in clock ticks after boot, 0 if it is gone."""
+        return self.get_stat_field(19)
 
     def kill(self, signal: int = 15):
-        subprocess.Popen(
-            ["kill", f"-{signal}", str(self.pid)],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
+        try:
+            os.kill(int(self.pid), signal)
+        except (ProcessLookupError, PermissionError, ValueError):
+            pass
+
+
+class ProcDelta(NamedTuple):
+    started: List[Proc]
+    exited: List[Proc]
+
+
+class ProcSnapshot:
+    """
+    The processes listed by a single pass over /proc. Their files are
+    read on first use and only once, so the filters can be combined
+    and repeated on the same snapshot without touching /proc again.
+    """
+
+    def __init__(self, root: str = "/proc"):
+        self.root = root
+        self.time = time.monotonic()
+        self.procs: Dict[int, Proc] = {
+            int(pid): Proc(pid, root, cached=True)
+            for pid in os.listdir(root)
+            if pid.isdigit()
+        }
+
+    def __iter__(self):
+        return iter(self.procs.values())
+
+    def __len__(self):
+        return len(self.procs)
+
+    def __contains__(self, pid) -> bool:
+        return int(pid) in self.procs
+
+    def get(self, pid) -> Optional[Proc]:
+        return self.procs.get(int(pid))
+
+    def filter(
+        self,
+        prefix: Optional[str] = None,
+        name: Optional[str] = None,
+        state: Union[str, Collection[str], None] = None,
+        cmdline: Optional[str] = None,
+        env: Optional[str] = None,
+        cwd: Optional[str] = None,
+        exclude_states: Collection[str] = (),
+        predicate: Optional[Callable[[Proc], bool]] = None,
+    ) -> List[Proc]:
+        """
+        The processes matching all the given conditions: the WINEPREFIX
+        prefix, the exact name (truncated as the kernel does), one of the
+        states, and the cmdline, env and cwd substrings. The cheaper
+        checks on stat come first.
+        """
+        if prefix is not None:
+            prefix = prefix.rstrip("/")
+        if name is not None:
+            name = name[:15]
+        if isinstance(state, str):
+            state = (state,)
+
+        checks: List[Callable[[Proc], bool]] = []
+        if name is not None:
+            checks.append(lambda p: p.get_name() == name)
+        if state is not None or exclude_states:
+            checks.append(
+                lambda p: (
+                    (state is None or p.get_state() in state)
+                    and p.get_state() not in exclude_states
+                )
+            )
+        if cmdline is not None:
+            checks.append(lambda p: cmdline in p.get_cmdline())
+        if prefix is not None:
+            checks.append(lambda p: p.get_prefix() == prefix)
+        if env is not None:
+            checks.append(lambda p: env in p.get_env())
+        if cwd is not None:
+            checks.append(lambda p: cwd in p.get_cwd())
+        if predicate is not None:
+            checks.append(predicate)
+
+        return [p for p in self.procs.values() if all(c(p) for c in checks)]
+
+    def by_prefix(self) -> Dict[str, List[Proc]]:
+        """The processes with a WINEPREFIX, grouped by it."""
+        prefixes: Dict[str, List[Proc]] = {}
+        for proc in self.procs.values():
+            prefix = proc.get_prefix()
+            if prefix:
+                prefixes.setdefault(prefix, []).append(proc)
+        return prefixes
+
+    def delta(self, previous: "ProcSnapshot") -> ProcDelta:
+        """
+        The processes started and exited since previous. A reused pid
+        counts as both, it is recognised if previous has read its stat.
+        """
+        started = []
+        exited = []
+        for pid, proc in self.procs.items():
+            old = previous.procs.get(pid)
+            if old is None:
+                started.append(proc)
+            elif old.is_read("stat") and old.get_start_time() != proc.get_start_time():
+                started.append(proc)
+                exited.append(old)
+        exited.extend(p for pid, p in previous.procs.items() if pid not in self.procs)
+        return ProcDelta(started, exited)
+
+    def refresh(self) -> ProcDelta:
+        """Take a new pass over /proc, returns the changes."""
+        previous = copy.copy(self)
+        self.__init__(self.root)
+        return self.delta(previous)
 
 
 class ProcUtils:
+    @staticmethod
+    def snapshot() -> ProcSnapshot:
+        return ProcSnapshot()
+
     @staticmethod
     def get_procs():
-        procs = []
-        for pid in os.listdir("/proc"):
-            if pid.isdigit():
-                procs.append(Proc(pid))
-        return procs
+        return list(ProcSnapshot())
 
     @staticmethod
     def get_by_cmdline(cmdline):
-        _procs = ProcUtils.get_procs()
-        return [proc for proc in _procs if cmdline in proc.get_cmdline()]
+        return ProcSnapshot().filter(cmdline=cmdline)
 
     @staticmethod
     def get_by_env(env):
-        _procs = ProcUtils.get_procs()
-        return [proc for proc in _procs if env in proc.get_env()]
+        return ProcSnapshot().filter(env=env)
+
+    @staticmethod
+    def get_by_prefix(prefix):
+        return ProcSnapshot().filter(prefix=prefix)
 
     @staticmethod
     def get_by_cwd(cwd):
-        _procs = ProcUtils.get_procs()
-        return [proc for proc in _procs if cwd in proc.get_cwd()]
+        return ProcSnapshot().filter(cwd=cwd)
 
     @staticmethod
     def get_by_name(name):
-        _procs = ProcUtils.get_procs()
-        return [proc for proc in _procs if name in proc.get_name()]
+        return ProcSnapshot().filter(predicate=lambda p: name in p.get_name())
 
     @staticmethod
     def get_by_pid(pid):
@@ -0,0 +1,165 @@
+# storage.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Crash-safe storage for the YAML files written by Bottles.
+
+Files are written to a temporary file in the same directory, fsynced and
+then renamed over the target, so readers (the GUI or the CLI, in another
+process) see either the old or the new content, never a truncated one.
+The first line of each file carries a checksum of the rest as a YAML
+comment, which keeps the files readable by any YAML parser and lets us
+reuse the already parsed content while the file is unchanged.
+"""
+
+import contextlib
+import copy
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from bottles.backend.utils import yaml
+
+T = TypeVar("T")
+
+CHECKSUM_HEADER = "# checksum: blake2b-"
+CACHE_SIZE = 256
+
+_cache: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+_cache_lock = Lock()
+
+
+@dataclass
+class StoredFile:
+    text: str
+    # the checksum from the header, None if missing or not matching
+    checksum: Optional[str]
+
+    @property
+    def verified(self) -> bool:
+        return self.checksum is not None
+
+
+def checksum(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def atomic_write(path: str, content: str, encoding: str = "utf-8"):
+    """
+    Replace path with content: write a temporary file next to it, fsync
+    it and rename it over path. The permissions of an existing file are
+    kept. Raises OSError on failure, leaving the original untouched.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+    # make the rename itself durable
+    with contextlib.suppress(OSError):
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def write_yaml(path: str, data: Any, encoding: str = "utf-8", **kwargs) -> str:
+    """
+    Atomically write data as YAML with the checksum header. Extra kwargs
+    are passed to yaml.dump. Returns the checksum.
+    """
+    text = yaml.dump(data, **kwargs)
+    digest = checksum(text)
+    atomic_write(path, f"{CHECKSUM_HEADER}{digest}\n{text}", encoding)
+    return digest
+
+
+def read(path: str, encoding: str = "utf-8") -> StoredFile:
+    """Read a stored file and validate its checksum header, if any."""
+    with open(path, "r", encoding=encoding) as f:
+        text = f.read()
+
+    if not text.startswith(CHECKSUM_HEADER):
+        return StoredFile(text, None)
+
+    header, _sep, body = text.partition("\n")
+    digest = header[len(CHECKSUM_HEADER) :].strip()
+    if checksum(body) != digest:
+        # edited by hand, the content is still valid YAML
+        return StoredFile(text, None)
+    return StoredFile(text, digest)
+
+
+def load_cached(path: str, parse: Callable[[str], T], kind: str = "yaml") -> T:
+    """
+    Return parse(content of path). While the file carries a valid
+    checksum equal to the one seen last time, a copy of the previous
+    result is returned instead of parsing it again. Files without a valid
+    checksum are always parsed. kind separates the parsers using the
+    cache for the same path.
+    """
+    stored = read(path)
+    key = (kind, os.path.realpath(path))
+
+    if stored.verified:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None and cached[0] == stored.checksum:
+                _cache.move_to_end(key)
+                return copy.deepcopy(cached[1])
+
+    result = parse(stored.text)
+
+    if stored.verified:
+        with _cache_lock:
+            _cache[key] = (stored.checksum, copy.deepcopy(result))
+            _cache.move_to_end(key)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return result
+
+
+def load_yaml(path: str) -> Any:
+    """Load a YAML file, reusing the parsed data while it is unchanged."""
+    return load_cached(path, yaml.load)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
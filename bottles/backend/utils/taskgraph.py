@@ -0,0 +1,121 @@
+# taskgraph.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class GraphTask:
+    name: str
+    func: Callable[[], Any]
+    depends: List[str] = field(default_factory=list)
+
+
+class TaskGraph:
+    """
+    Run a set of named tasks on a thread pool, starting each one as soon
+    as the tasks it depends on have finished. Callbacks are always invoked
+    from the thread calling run(), so callers don't need extra locking.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self.__tasks: Dict[str, GraphTask] = {}
+
+    def add(
+        self, name: str, func: Callable[[], Any], depends: Sequence[str] = ()
+    ) -> None:
+        if name in self.__tasks:
+            raise ValueError(f"Task {name} already registered.")
+        self.__tasks[name] = GraphTask(name, func, list(depends))
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
+
+    def __validate(self):
+        for task in self.__tasks.values():
+            for dep in task.depends:
+                if dep not in self.__tasks:
+                    raise ValueError(f"Task {task.name} depends on unknown {dep}.")
+
+        # Kahn's algorithm, only to detect cycles before starting anything
+        indegree = {name: len(t.depends) for name, t in self.__tasks.items()}
+        ready = [name for name, count in indegree.items() if count == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for task in self.__tasks.values():
+                if current in task.depends:
+                    indegree[task.name] -= 1
+                    if indegree[task.name] == 0:
+                        ready.append(task.name)
+        if visited != len(self.__tasks):
+            raise ValueError("Task graph contains a dependency cycle.")
+
+    def run(
+        self,
+        on_start: Optional[Callable[[str], None]] = None,
+        on_done: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute every task and return a name -> result mapping. Tasks are
+        started in registration order whenever their dependencies allow it.
+        If a task raises, no new task is started and the exception is
+        re-raised once the running ones have finished.
+        """
+        self.__validate()
+
+        results: Dict[str, Any] = {}
+        pending = list(self.__tasks.values())
+        running: Dict[Future, GraphTask] = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="taskgraph"
+        ) as executor:
+            while pending or running:
+                if error is None:
+                    for task in list(pending):
+                        if all(dep in results for dep in task.depends):
+                            pending.remove(task)
+                            if on_start:
+                                on_start(task.name)
+                            running[executor.submit(task.func)] = task
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        results[task.name] = future.result()
+                    except BaseException as ex:
+                        if error is None:
+                            error = ex
+                        continue
+                    if on_done:
+                        on_done(task.name, results[task.name])
+
+        if error is not None:
+            raise error
+
+        return results
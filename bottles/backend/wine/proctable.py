@@ -0,0 +1,302 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from bottles.backend.logger import Logger
+from bottles.backend.utils.proc import ProcSnapshot
+
+logging = Logger()
+
+# the loaders wine processes are started through, skipped in the cmdline
+# to find the Windows image they run
+WINE_LOADERS = {
+    "wine",
+    "wine64",
+    "wine-preloader",
+    "wine64-preloader",
+    "wine-stable",
+    "wine-staging",
+    "wine-development",
+}
+WINE_HELPERS = {"wineserver", "wineserver64"}
+IMAGE_EXTENSIONS = (".exe", ".com", ".scr", ".msi")
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class WineProcess(NamedTuple):
+    pid: int
+    parent: Optional[int]
+    threads: int
+    name: str
+    image: str
+    rss: int  # bytes
+    cpu: float  # percent of one core, since the previous tick
+
+    def to_dict(self) -> dict:
+        """The format of the processes listed by winedbg."""
+        return {
+            "pid": str(self.pid),
+            "threads": str(self.threads),
+            "name": self.name,
+            "parent": str(self.parent) if self.parent is not None else None,
+            "image": self.image,
+            "rss": self.rss,
+            "cpu": self.cpu,
+        }
+
+
+class ProcessDiff(NamedTuple):
+    added: List[WineProcess]
+    removed: List[WineProcess]
+    changed: List[WineProcess]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def image_from_cmdline(argv: List[str]) -> Optional[str]:
+    """
+    The Windows image a wine process runs, from its argv. Wine replaces
+    the argv of the processes it starts with the image path, older wine
+    versions keep the loader in front of it. None for non wine processes.
+    """
+    loader = False
+    for arg in argv:
+        base = arg.replace("\\", "/").rsplit("/", 1)[-1]
+        if base in WINE_LOADERS:
+            loader = True
+            continue
+        if base in WINE_HELPERS:
+            return None
+        windows = len(arg) > 2 and arg[1] == ":" and arg[2] == "\\"
+        if loader or windows or base.lower().endswith(IMAGE_EXTENSIONS):
+            return arg
+        return None
+    return None
+
+
+def image_name(image: str) -> str:
+    return image.replace("\\", "/").rsplit("/", 1)[-1]
+
+
+class ProcessTable:
+    """
+    The wine processes of a prefix, read from /proc without launching
+    winedbg. The processes are matched on the WINEPREFIX in their
+    environment. Each table has a single poller, shared by the
+    subscribers, which takes a ProcSnapshot once per tick.
+    """
+
+    interval = 1.0
+    __tables: Dict[str, "ProcessTable"] = {}
+    __tables_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, prefix: str) -> "ProcessTable":
+        prefix = os.path.normpath(prefix)
+        with cls.__tables_lock:
+            table = cls.__tables.get(prefix)
+            if table is None:
+                table = cls.__tables[prefix] = cls(prefix)
+            return table
+
+    def __init__(self, prefix: str, proc: str = "/proc"):
+        self.prefix = os.path.normpath(prefix)
+        self.proc = proc
+        # (pid, start time) -> whether the process belongs to the prefix,
+        # as the environment of a process doesn't change
+        self.__matches: Dict[Tuple[int, int], bool] = {}
+        self.__cpu: Dict[int, Tuple[int, float]] = {}
+        self.__processes: Dict[int, WineProcess] = {}
+        self.__scanned = 0.0
+        self.__lock = threading.Lock()
+        self.__subscribers: List["ProcessSubscription"] = []
+        self.__stop: Optional[threading.Event] = None
+
+    def scan(self) -> Dict[int, WineProcess]:
+        """Walk /proc once, returns the processes by pid."""
+        now = time.monotonic()
+        found: Dict[int, Tuple[int, int, str, int, int]] = {}
+        matches: Dict[Tuple[int, int], bool] = {}
+
+        for proc in ProcSnapshot(self.proc):
+            if not proc.get_stat():
+                continue
+            pid = int(proc.pid)
+            key = (pid, proc.get_start_time())
+            match = self.__matches.get(key)
+            if match is None:
+                match = proc.get_prefix() == self.prefix
+            matches[key] = match
+            if not match:
+                continue
+
+            argv = proc.get_cmdline().split("\0")
+            image = image_from_cmdline([a for a in argv if a])
+            if image is None:
+                continue
+            found[pid] = (
+                proc.get_stat_field(1),
+                proc.get_stat_field(17),
+                image,
+                proc.get_stat_field(21) * _PAGE_SIZE,
+                proc.get_stat_field(11) + proc.get_stat_field(12),
+            )
+
+        processes = {}
+        cpu = {}
+        for pid, (ppid, threads, image, rss, ticks) in found.items():
+            usage = 0.0
+            previous = self.__cpu.get(pid)
+            if previous is not None and now > previous[1]:
+                elapsed = now - previous[1]
+                usage = round((ticks - previous[0]) / _CLK_TCK / elapsed * 100, 1)
+            cpu[pid] = (ticks, now)
+            processes[pid] = WineProcess(
+                pid=pid,
+                parent=ppid if ppid in found else None,
+                threads=threads,
+                name=image_name(image),
+                image=image,
+                rss=rss,
+                cpu=max(usage, 0.0),
+            )
+
+        with self.__lock:
+            self.__matches = matches
+            self.__cpu = cpu
+            self.__processes = processes
+            self.__scanned = now
+        return processes
+
+    def snapshot(self) -> List[WineProcess]:
+        """The processes of the last tick, scanning if it is stale."""
+        with self.__lock:
+            fresh = time.monotonic() - self.__scanned < self.interval
+            processes = self.__processes
+        if not fresh:
+            processes = self.scan()
+        return list(processes.values())
+
+    def find(self, name: str) -> List[WineProcess]:
+        """
+        The processes running the image name, compared without case
+        and path, the .exe extension can be omitted.
+        """
+        name = image_name(name).lower()
+        return [
+            p
+            for p in self.snapshot()
+            if p.name.lower() == name or p.name.lower() == f"{name}.exe"
+        ]
+
+    @staticmethod
+    def diff(old: Dict[int, WineProcess], new: Dict[int, WineProcess]) -> ProcessDiff:
+        return ProcessDiff(
+            added=[p for pid, p in new.items() if pid not in old],
+            removed=[p for pid, p in old.items() if pid not in new],
+            changed=[p for pid, p in new.items() if pid in old and old[pid] != p],
+        )
+
+    def subscribe(
+        self, callback: Optional[Callable[[ProcessDiff], None]] = None
+    ) -> "ProcessSubscription":
+        """
+        Receive the changes of the table, from the shared poller, until
+        the subscription is closed. The first diff lists the processes
+        already running as added. With no callback the diffs are queued,
+        to be read iterating the subscription.
+        """
+        subscription = ProcessSubscription(self, callback)
+        with self.__lock:
+            current = None
+            if self.__stop is None:
+                self.__stop = threading.Event()
+                threading.Thread(
+                    target=self.__poll, args=(self.__stop,), daemon=True
+                ).start()
+            else:
+                # the poller already sent its first diff
+                current = dict(self.__processes)
+            self.__subscribers.append(subscription)
+        if current is not None:
+            subscription.push(self.diff({}, current))
+        return subscription
+
+    def unsubscribe(self, subscription: "ProcessSubscription"):
+        with self.__lock:
+            if subscription in self.__subscribers:
+                self.__subscribers.remove(subscription)
+            if not self.__subscribers and self.__stop is not None:
+                self.__stop.set()
+                self.__stop = None
+
+    def __poll(self, stop: threading.Event):
+        previous: Dict[int, WineProcess] = {}
+        first = True
+        while not stop.is_set():
+            try:
+                processes = self.scan()
+            except OSError as e:
+                logging.error(f"Cannot read the processes of {self.prefix}: {e}")
+                processes = {}
+
+            diff = self.diff(previous, processes)
+            previous = processes
+            with self.__lock:
+                subscribers = list(self.__subscribers)
+            if diff or first:
+                for subscriber in subscribers:
+                    subscriber.push(diff)
+            first = False
+            stop.wait(self.interval)
+
+
+class ProcessSubscription:
+    def __init__(
+        self,
+        table: ProcessTable,
+        callback: Optional[Callable[[ProcessDiff], None]] = None,
+    ):
+        self.table = table
+        self.callback = callback
+        self.__queue: "queue.Queue[ProcessDiff]" = queue.Queue()
+        self.closed = False
+
+    def push(self, diff: ProcessDiff):
+        if self.closed:
+            return
+        if self.callback is None:
+            self.__queue.put(diff)
+            return
+        try:
+            self.callback(diff)
+        except Exception as e:
+            logging.error(f"Process table subscriber failed: {e}")
+
+    def get(self, timeout: Optional[float] = None) -> Optional[ProcessDiff]:
+        """The next diff, None if nothing changed within timeout."""
+        try:
+            return self.__queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __iter__(self):
+        while not self.closed:
+            diff = self.get(self.table.interval)
+            if diff is not None:
+                yield diff
+
+    def close(self):
+        self.closed = True
+        self.table.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
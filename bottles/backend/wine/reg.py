@@ -1,20 +1,31 @@
 import codecs
+import contextlib
 import dataclasses
 import os
-import uuid
 from datetime import datetime
 from itertools import groupby
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Union
 
 from bottles.backend.globals import Paths
 from bottles.backend.logger import Logger
 from bottles.backend.utils.generic import random_string
 from bottles.backend.utils.manager import ManagerUtils
+from bottles.backend.wine.regfile import (
+    OfflineRegistry,
+    RegChange,
+    UnsupportedRegistryEdit,
+    format_reg,
+    parse_reg,
+    reg_exe_change,
+)
 from bottles.backend.wine.winedbg import WineDbg
 from bottles.backend.wine.wineprogram import WineProgram
+from bottles.backend.wine.wineserver import WineServer
 
 logging = Logger()
 
+REG_V5_HEADER = "Windows Registry Editor Version 5.00"
+
 
 @dataclasses.dataclass
 class RegItem:
@@ -25,19 +36,120 @@ class RegItem:
 
 
 class Reg(WineProgram):
+    """
+    Edit the bottle registry. The edits are done on the registry files
+    while the bottle is not running, with reg.exe otherwise. The methods
+    return the number of wine processes launched for the edit.
+    """
+
     program = "Wine Registry CLI"
     command = "reg"
 
-    def bulk_add(self, regs: List[RegItem]):
-        """Import multiple registries at once, with v5.00 reg file"""
+    def edit_offline(
+        self, edit: Callable[[OfflineRegistry], None], action: str = "edit"
+    ) -> bool:
+        """
+        Apply edit to the registry files of the bottle, without launching
+        wine. This is only possible while the wineserver of the bottle is
+        not running, returns False if the edit has to be done with wine.
+
+        A wineserver starting meanwhile would load the files and write
+        them back on exit: the server is checked again around the save,
+        and if it came up the edit is left to wine as well (the edits
+        are sets and deletes, applying them twice is harmless).
+        """
         config = self.config
-        logging.info(f"Importing {len(regs)} Key(s) to {config.Name} registry")
-        winedbg = WineDbg(config)
+        if config.Environment == "Steam":
+            bottle = config.Path
+        else:
+            bottle = ManagerUtils.get_bottle_path(config)
+
+        if not OfflineRegistry.available(bottle):
+            return False
+
+        server = WineServer(config)
+        with OfflineRegistry.lock(bottle):
+            if server.is_alive():
+                return False
+
+            registry = OfflineRegistry(bottle)
+            try:
+                edit(registry)
+                if server.is_alive():
+                    return False
+                written = registry.save()
+            except (UnsupportedRegistryEdit, ValueError, OSError) as e:
+                logging.info(f"Registry {action} needs wine: {e}")
+                return False
+            if server.is_alive():
+                logging.info(f"Wineserver started, registry {action} needs wine")
+                return False
+
+        logging.info(f"Registry {action} done offline, {len(written)} file(s) written")
+        return True
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Collect the edits made through the yielded RegTransaction and
+        apply them at once on exit. Nothing is applied if the block raises.
+        """
+        transaction = RegTransaction(self)
+        yield transaction
+        transaction.commit()
+
+    def apply(self, changes: List[RegChange], action: str = "apply") -> int:
+        """Apply changes on the files, or with a single reg import."""
+        if not changes:
+            return 0
+        if self.edit_offline(lambda registry: registry.apply(changes), action):
+            return 0
+        return self.__import(format_reg(changes), action)
+
+    def import_reg(self, content: str, action: str = "import") -> int:
+        """Import the content of a .reg file (REGEDIT4 if no header)."""
+        try:
+            changes = parse_reg(content)
+        except UnsupportedRegistryEdit as e:
+            logging.info(f"Importing the .reg file as it is: {e}")
+            return self.__import(content, action)
+        return self.apply(changes, action)
+
+    def __import(self, content: str, action: str) -> int:
+        content = content.lstrip()
+        unicode = content.startswith(REG_V5_HEADER)
+        if not unicode and not content.upper().startswith("REGEDIT4"):
+            content = f"REGEDIT4\n\n{content}"
+
+        reg_file = os.path.join(
+            Paths.temp,
+            f"{action}_{int(datetime.now().timestamp())}_{random_string(8)}.reg",
+        )
+        with open(reg_file, "wb") as f:
+            if unicode:
+                f.write(codecs.BOM_UTF16_LE)
+                f.write(content.encode("utf-16le"))
+            else:
+                f.write(content.encode())
+
+        # avoid conflicts when executing async
+        WineDbg(self.config).wait_for_process("reg.exe")
+
+        res = self.launch(
+            ("import", reg_file), communicate=True, minimal=True, action_name=action
+        )
+        logging.info(f"Import result: '{res.data}'")
+
+        os.remove(reg_file)
+        return 1
 
+    @staticmethod
+    def bulk_to_reg(regs: List[RegItem]) -> str:
+        """The v5.00 reg file importing regs"""
         mapping: Dict[str, List[RegItem]] = {
             k: list(v) for k, v in groupby(regs, lambda x: x.key)
         }
-        reg_file_header = "Windows Registry Editor Version 5.00\n\n"
+        reg_file_header = f"{REG_V5_HEADER}\n\n"
         reg_key_header = "[%s]\n"
         reg_item_fmt = '"%s"="%s:%s"\n'
         reg_item_def_fmt = '"%s"="%s"\n'  # default is REG_SZ(string)
@@ -55,31 +167,46 @@ class Reg(WineProgram):
                 else:
                     file_content += reg_item_def_fmt % (item.value, item.data)
             file_content += "\n"
+        return file_content
 
-        tmp_reg_filepath = os.path.join(
-            Paths.temp, f"bulk_{int(datetime.now().timestamp())}_{random_string(8)}.reg"
-        )
-        with open(tmp_reg_filepath, "wb") as f:
-            f.write(codecs.BOM_UTF16_LE)
-            f.write(file_content.encode("utf-16le"))
+    @staticmethod
+    def bundle_to_reg(bundle: dict) -> str:
+        """The REGEDIT4 reg file importing bundle"""
+        content = "REGEDIT4\n\n"
+        for key in bundle:
+            content += f"[{key}]\n"
 
-        # avoid conflicts when executing async
-        winedbg.wait_for_process("reg.exe")
+            for value in bundle[key]:
+                if value["data"] == "-":
+                    content += f'"{value["value"]}"=-\n'
+                elif "key_type" in value:
+                    content += (
+                        f'"{value["value"]}"={value["key_type"]}:{value["data"]}\n'
+                    )
+                else:
+                    content += f'"{value["value"]}"="{value["data"]}"\n'
 
-        res = self.launch(
-            ("import", tmp_reg_filepath),
-            communicate=True,
-            minimal=True,
-            action_name="bulk_add",
-        )
-        logging.info(res.data)
+            content += "\n"
+        return content
 
-    def add(self, key: str, value: str, data: str, value_type: Optional[str] = None):
+    def bulk_add(self, regs: List[RegItem]) -> int:
+        """Import multiple registries at once, with v5.00 reg file"""
+        logging.info(f"Importing {len(regs)} Key(s) to {self.config.Name} registry")
+        return self.import_reg(self.bulk_to_reg(regs), "bulk_add")
+
+    def add(
+        self, key: str, value: str, data: str, value_type: Optional[str] = None
+    ) -> int:
         config = self.config
         logging.info(
             f"Adding Key: [{key}] with Value: [{value}] and "
             f"Data: [{data}] in {config.Name} registry"
         )
+        if self.edit_offline(
+            lambda registry: registry.add(key, value, data, value_type), "add"
+        ):
+            return 0
+
         winedbg = WineDbg(config)
         args = "add '%s' /v '%s' /d '%s' /f" % (key, value, data)
 
@@ -91,13 +218,17 @@ class Reg(WineProgram):
 
         res = self.launch(args, communicate=True, minimal=True, action_name="add")
         logging.info(res.data)
+        return 1
 
-    def remove(self, key: str, value: str):
+    def remove(self, key: str, value: str) -> int:
         """Remove a key from the registry"""
         config = self.config
         logging.info(
             f"Removing Value: [{key}] from Key: [{value}] in {config.Name} registry"
         )
+        if self.edit_offline(lambda registry: registry.delete(key, value), "remove"):
+            return 0
+
         winedbg = WineDbg(config)
         args = "delete '%s' /v %s /f" % (key, value)
 
@@ -106,42 +237,97 @@ class Reg(WineProgram):
 
         res = self.launch(args, communicate=True, minimal=True, action_name="remove")
         logging.info(res.data)
+        return 1
 
-    def import_bundle(self, bundle: dict):
+    def import_bundle(self, bundle: dict) -> int:
         """Import a bundle of keys into the registry"""
-        config = self.config
-        logging.info(f"Importing bundle to {config.Name} registry")
-        winedbg = WineDbg(config)
-        reg_file = ManagerUtils.get_temp_path(f"{uuid.uuid4()}.reg")
+        logging.info(f"Importing bundle to {self.config.Name} registry")
+        return self.import_reg(self.bundle_to_reg(bundle), "import_bundle")
 
-        # prepare reg file
-        with open(reg_file, "w") as f:
-            f.write("REGEDIT4\n\n")
 
-            for key in bundle:
-                f.write(f"[{key}]\n")
+class RegTransaction:
+    """
+    Collect registry edits, through the same methods of Reg, and apply
+    them with Reg.apply() on commit: a single rewrite of the registry
+    files, or a single reg import if the bottle is running. Edits that
+    can't be expressed as changes (e.g. malformed .reg files) are run on
+    their own, in order.
+    """
 
-                for value in bundle[key]:
-                    if value["data"] == "-":
-                        f.write(f'"{value["value"]}"=-\n')
-                    elif "key_type" in value:
-                        f.write(
-                            f'"{value["value"]}"={value["key_type"]}:{value["data"]}\n'
-                        )
-                    else:
-                        f.write(f'"{value["value"]}"="{value["data"]}"\n')
+    def __init__(self, reg: Reg):
+        self.reg = reg
+        self.__steps: List[Union[List[RegChange], Callable[[], int]]] = []
+        self.__after_live: List[Callable[[], None]] = []
+        # the wine launches the edits would need one by one
+        self.launches = 0
 
-                f.write("\n")
+    @property
+    def changes(self) -> List[RegChange]:
+        return [c for step in self.__steps if isinstance(step, list) for c in step]
 
-        args = f"import {reg_file}"
+    def __append(self, changes: List[RegChange]):
+        self.launches += 1
+        if self.__steps and isinstance(self.__steps[-1], list):
+            self.__steps[-1].extend(changes)
+        else:
+            self.__steps.append(list(changes))
 
-        # avoid conflicts when executing async
-        winedbg.wait_for_process("reg.exe")
+    def __fallback(self, func: Callable[[], int]):
+        self.launches += 1
+        self.__steps.append(func)
 
-        res = self.launch(
-            args, communicate=True, minimal=True, action_name="import_bundle"
-        )
-        logging.info(f"Import bundle result: '{res.data}'")
+    def add(self, key: str, value: str, data: str, value_type: Optional[str] = None):
+        try:
+            self.__append([reg_exe_change(key, value, data, value_type)])
+        except UnsupportedRegistryEdit:
+            self.__fallback(lambda: self.reg.add(key, value, data, value_type))
 
-        # remove reg file
-        os.remove(reg_file)
+    def remove(self, key: str, value: str):
+        self.__append([RegChange(key, value, remove=True)])
+
+    def import_reg(self, content: str):
+        try:
+            self.__append(parse_reg(content))
+        except UnsupportedRegistryEdit:
+            self.__fallback(lambda: self.reg.import_reg(content))
+
+    def import_bundle(self, bundle: dict):
+        self.import_reg(Reg.bundle_to_reg(bundle))
+
+    def bulk_add(self, regs: List[RegItem]):
+        self.import_reg(Reg.bulk_to_reg(regs))
+
+    def after_live(self, func: Callable[[], None]):
+        """
+        Run func (once, even if registered more times) after the commit,
+        if wine had to be launched, e.g. to restart the running bottle.
+        """
+        self.launches += 1
+        if func not in self.__after_live:
+            self.__after_live.append(func)
+
+    def commit(self) -> int:
+        """Apply the collected edits, returns the wine processes launched."""
+        steps, self.__steps = self.__steps, []
+        after_live, self.__after_live = self.__after_live, []
+        if not steps:
+            return 0
+
+        launches = 0
+        for step in steps:
+            if isinstance(step, list):
+                launches += self.reg.apply(step, "transaction")
+            else:
+                launches += step()
+
+        if launches:
+            for func in after_live:
+                func()
+                launches += 1
+
+        logging.info(
+            f"Registry transaction for {self.reg.config.Name} done with "
+            f"{launches} wine launch(es) instead of {self.launches}"
+        )
+        self.launches = 0
+        return launches
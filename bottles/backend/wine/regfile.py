@@ -0,0 +1,690 @@
+# regfile.py
+#
+# Copyright 2025 mirkobrombin <brombin94@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, in version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Read and write the registry files of a Wine prefix (system.reg, user.reg
+and userdef.reg) without starting Wine. The wineserver loads them on
+startup and rewrites them on shutdown, so they must only be edited while
+no wineserver is running for the prefix.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from bottles.backend.logger import Logger
+from bottles.backend.utils import storage
+
+logging = Logger()
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_LINK = 6
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+# reg.exe type names
+REG_TYPES = {
+    "REG_NONE": REG_NONE,
+    "REG_SZ": REG_SZ,
+    "REG_EXPAND_SZ": REG_EXPAND_SZ,
+    "REG_BINARY": REG_BINARY,
+    "REG_DWORD": REG_DWORD,
+    "REG_MULTI_SZ": REG_MULTI_SZ,
+    "REG_QWORD": REG_QWORD,
+}
+
+RegData = Union[str, int, bytes, List[str]]
+
+# root keys stored in each file, HKEY_CLASSES_ROOT is a merged view of
+# two keys and is left to wine
+HIVES = (
+    ("HKEY_LOCAL_MACHINE", "system.reg"),
+    ("HKLM", "system.reg"),
+    ("HKEY_CURRENT_USER", "user.reg"),
+    ("HKCU", "user.reg"),
+    ("HKEY_USERS\\.DEFAULT", "userdef.reg"),
+)
+HIVE_FILES = ("system.reg", "user.reg", "userdef.reg")
+
+# the files are ASCII, latin-1 keeps any other byte as it is
+_ENCODING = "latin-1"
+_EPOCH_AS_FILETIME = 11644473600
+_C_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, "e": 27}
+_C_ESCAPES_REV = {v: k for k, v in _C_ESCAPES.items()}
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+class UnsupportedRegistryEdit(Exception):
+    """The edit can't be done on the registry files, wine must do it."""
+
+
+def unescape(text: str, pos: int = 0, end: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Decode a string escaped as in Wine registry files, from pos up to the
+    unescaped end character if given. Returns the string and the position
+    following it.
+    """
+    out = []
+    length = len(text)
+    while pos < length:
+        char = text[pos]
+        if end is not None and char == end:
+            return "".join(out), pos + 1
+        pos += 1
+        if char != "\\" or pos >= length:
+            out.append(char)
+            continue
+
+        char = text[pos]
+        pos += 1
+        if char in _C_ESCAPES:
+            out.append(chr(_C_ESCAPES[char]))
+        elif char == "x":
+            digits = ""
+            while pos < length and len(digits) < 4 and text[pos] in _HEX_DIGITS:
+                digits += text[pos]
+                pos += 1
+            out.append(chr(int(digits, 16)) if digits else "x")
+        elif "0" <= char <= "7":
+            digits = char
+            while pos < length and len(digits) < 3 and "0" <= text[pos] <= "7":
+                digits += text[pos]
+                pos += 1
+            out.append(chr(int(digits, 8)))
+        else:
+            out.append(char)
+
+    if end is not None:
+        raise ValueError("Unterminated string in registry file")
+    return "".join(out), pos
+
+
+def escape(text: str, special: str = '"') -> str:
+    """Encode a string as Wine does in its registry files."""
+    out = []
+    length = len(text)
+    for i, char in enumerate(text):
+        code = ord(char)
+        following = text[i + 1] if i + 1 < length else ""
+        if code > 127:
+            if following and following in _HEX_DIGITS:
+                out.append("\\x%04x" % code)
+            else:
+                out.append("\\x%x" % code)
+        elif code < 32:
+            if code in _C_ESCAPES_REV:
+                out.append("\\" + _C_ESCAPES_REV[code])
+            elif following and "0" <= following <= "7":
+                out.append("\\%03o" % code)
+            else:
+                out.append("\\%o" % code)
+        else:
+            if char == "\\" or char in special:
+                out.append("\\")
+            out.append(char)
+    return "".join(out)
+
+
+def _hex_bytes(text: str) -> bytes:
+    return bytes.fromhex(re.sub(r"[\\,\s]", "", text))
+
+
+def _decode_sz(data: bytes) -> str:
+    text = data.decode("utf-16-le", errors="replace")
+    return text[:-1] if text.endswith("\0") else text
+
+
+def _split_multi_sz(text: str) -> List[str]:
+    text = text.rstrip("\0")
+    return text.split("\0") if text else []
+
+
+def parse_value(raw: str) -> Tuple[int, RegData]:
+    """Return (type, data) of a value entry of a registry file."""
+    pos = 1 if raw.startswith("@") else unescape(raw, 1, '"')[1]
+    if raw[pos : pos + 1] != "=":
+        raise ValueError(f"Invalid registry value: {raw}")
+    data = raw[pos + 1 :]
+
+    if data.startswith('"'):
+        return REG_SZ, unescape(data, 1, '"')[0]
+    if data.startswith("str("):
+        value_type = int(data[4 : data.index(")")], 16)
+        text = unescape(data, data.index(":") + 2, '"')[0]
+        if value_type == REG_MULTI_SZ:
+            return value_type, _split_multi_sz(text)
+        return value_type, text
+    if data.startswith("dword:"):
+        return REG_DWORD, int(data[6:].strip(), 16)
+    if data.startswith("hex"):
+        value_type = REG_BINARY
+        if data.startswith("hex("):
+            value_type = int(data[4 : data.index(")")], 16)
+        raw_bytes = _hex_bytes(data[data.index(":") + 1 :])
+        if value_type in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+            return value_type, _decode_sz(raw_bytes)
+        if value_type == REG_MULTI_SZ:
+            return value_type, _split_multi_sz(_decode_sz(raw_bytes))
+        if value_type == REG_QWORD and len(raw_bytes) == 8:
+            return value_type, int.from_bytes(raw_bytes, "little")
+        return value_type, raw_bytes
+    raise ValueError(f"Unknown registry value format: {raw}")
+
+
+def format_value(name: str, value_type: int, data: RegData) -> str:
+    """Format a value entry the way the wineserver saves it."""
+    prefix = "@=" if not name else f'"{escape(name)}"='
+
+    if value_type in (REG_SZ, REG_EXPAND_SZ, REG_MULTI_SZ) and isinstance(
+        data, (str, list)
+    ):
+        if isinstance(data, list):
+            data = "".join(f"{s}\0" for s in data)
+        text = f'"{escape(data)}"'
+        if value_type != REG_SZ:
+            text = f"str({value_type:x}):{text}"
+        return prefix + text
+
+    if value_type == REG_DWORD and isinstance(data, int):
+        return f"{prefix}dword:{data & 0xFFFFFFFF:08x}"
+
+    if isinstance(data, int):
+        data = data.to_bytes(8 if value_type == REG_QWORD else 4, "little")
+    if not isinstance(data, bytes):
+        raise UnsupportedRegistryEdit(f"Unsupported data for type {value_type}")
+
+    out = prefix + ("hex:" if value_type == REG_BINARY else f"hex({value_type:x}):")
+    count = len(out)
+    for i, byte in enumerate(data):
+        out += f"{byte:02x}"
+        count += 2
+        if i < len(data) - 1:
+            out += ","
+            count += 1
+            if count > 76:
+                out += "\\\n  "
+                count = 2
+    return out
+
+
+class RegistryKey:
+    """A key block of a registry file, with its values kept as raw text."""
+
+    def __init__(self, path: str, header: List[str], trailer: str = "\n"):
+        self.path = path
+        # "#time=", "#class=", "#link" lines, in file order
+        self.header = header
+        # the newlines closing the block
+        self.trailer = trailer
+        # [lowercase name, name, raw entry]
+        self.values: List[List[str]] = []
+
+    @property
+    def is_link(self) -> bool:
+        return "#link" in self.header
+
+    @classmethod
+    def parse(cls, block: str) -> "RegistryKey":
+        body = block.rstrip("\n")
+        lines = body.split("\n")
+        key = cls(unescape(lines[0], 1, "]")[0], [], block[len(body) :] or "\n")
+        for line in lines[1:]:
+            if key.values and key.values[-1][2].endswith("\\"):
+                key.values[-1][2] += "\n" + line
+            elif line.startswith("#"):
+                key.header.append(line)
+            elif line.startswith(("@", '"')):
+                name = "" if line.startswith("@") else unescape(line, 1, '"')[0]
+                key.values.append([name.lower(), name, line])
+        return key
+
+    def find(self, name: str) -> Optional[List[str]]:
+        name = name.lower()
+        for entry in self.values:
+            if entry[0] == name:
+                return entry
+        return None
+
+    def get(self, name: str) -> Optional[Tuple[int, RegData]]:
+        entry = self.find(name)
+        return None if entry is None else parse_value(entry[2])
+
+    def set(self, name: str, value_type: int, data: RegData):
+        raw = format_value(name, value_type, data)
+        entry = self.find(name)
+        if entry is None:
+            self.values.append([name.lower(), name, raw])
+        else:
+            entry[2] = raw
+
+    def delete(self, name: str) -> bool:
+        entry = self.find(name)
+        if entry is None:
+            return False
+        self.values.remove(entry)
+        return True
+
+    def dump(self, modified: int, with_time: bool) -> str:
+        lines = [f"[{escape(self.path, '[]')}] {modified}"]
+        if with_time:
+            filetime = (modified + _EPOCH_AS_FILETIME) * 10_000_000
+            lines.append(f"#time={filetime:x}")
+        lines += [h for h in self.header if not h.startswith("#time=")]
+        lines += [entry[2] for entry in self.values]
+        return "\n".join(lines) + self.trailer
+
+
+class RegistryFile:
+    """
+    A Wine registry file. The content is only split into key blocks, a
+    block is parsed when accessed and written back verbatim unless it
+    was modified, so the timestamps, escaping and order of everything
+    else are preserved.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "r", encoding=_ENCODING, newline="") as f:
+            text = f.read()
+
+        if not text.startswith("WINE REGISTRY Version 2"):
+            raise UnsupportedRegistryEdit(f"Unknown registry format: {path}")
+
+        blocks = re.split(r"(?<=\n)(?=\[)", text)
+        self.__header = blocks[0]
+        self.__with_time = "\n#time=" in text
+        # raw text of each block, None once deleted
+        self.__raw: List[Optional[str]] = list(blocks[1:])
+        self.__keys: Dict[int, RegistryKey] = {}
+        self.__index: Dict[str, int] = {
+            unescape(block, 1, "]")[0].lower(): i for i, block in enumerate(self.__raw)
+        }
+        self.__modified: Set[int] = set()
+
+        match = re.search(r"relative to (\S+)", self.__header)
+        self.root = unescape(match.group(1))[0] if match else ""
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.__modified)
+
+    def __key(self, path: str, create: bool = False) -> Optional[RegistryKey]:
+        i = self.__index.get(path.lower())
+        if i is None:
+            if not create:
+                return None
+            i = self.__index[path.lower()] = len(self.__raw)
+            self.__raw.append("")
+            self.__keys[i] = RegistryKey(path, [])
+        elif i not in self.__keys:
+            self.__keys[i] = RegistryKey.parse(self.__raw[i])
+        return self.__keys[i]
+
+    def resolve(self, path: str) -> str:
+        """Follow the symbolic links (e.g. CurrentControlSet) in path."""
+        parts = path.split("\\")
+        for depth in range(1, len(parts) + 1):
+            key = self.__key("\\".join(parts[:depth]))
+            if key is None or not key.is_link:
+                continue
+            target = key.get("SymbolicLinkValue")
+            if target is None or not isinstance(target[1], str):
+                raise UnsupportedRegistryEdit(f"Broken registry link: {key.path}")
+
+            # links are absolute, e.g. \Registry\Machine\System\ControlSet001
+            prefix = f"\\Registry{self.root}\\"
+            if not self.root or not target[1].lower().startswith(prefix.lower()):
+                raise UnsupportedRegistryEdit(f"Link out of {self.path}: {target[1]}")
+            return self.resolve("\\".join([target[1][len(prefix) :], *parts[depth:]]))
+        return path
+
+    def get(self, path: str, name: str) -> Optional[Tuple[int, RegData]]:
+        key = self.__key(self.resolve(path))
+        return None if key is None else key.get(name)
+
+    def set(self, path: str, name: str, value_type: int, data: RegData):
+        path = self.resolve(path)
+        self.__key(path, create=True).set(name, value_type, data)
+        self.__modified.add(self.__index[path.lower()])
+
+    def delete(self, path: str, name: Optional[str] = None) -> bool:
+        """Delete a value, or the key with its subkeys if name is None."""
+        path = self.resolve(path)
+        if name is not None:
+            key = self.__key(path)
+            if key is None or not key.delete(name):
+                return False
+            self.__modified.add(self.__index[path.lower()])
+            return True
+
+        lower = path.lower()
+        removed = False
+        for key_path, i in list(self.__index.items()):
+            if key_path == lower or key_path.startswith(lower + "\\"):
+                self.__raw[i] = None
+                self.__keys.pop(i, None)
+                self.__modified.add(i)
+                del self.__index[key_path]
+                removed = True
+        return removed
+
+    def save(self) -> bool:
+        """Write the file if modified, returns whether it was written."""
+        if not self.__modified:
+            return False
+
+        now = int(time.time())
+        out = [self.__header]
+        for i, raw in enumerate(self.__raw):
+            if raw is None:
+                continue
+            # keys are separated by a blank line
+            if not out[-1].endswith("\n\n"):
+                out.append("\n")
+            if i in self.__modified:
+                out.append(self.__keys[i].dump(now, self.__with_time))
+            else:
+                out.append(raw)
+
+        storage.atomic_write(self.path, "".join(out), encoding=_ENCODING)
+        self.__modified.clear()
+        return True
+
+
+class RegChange(NamedTuple):
+    """
+    A registry edit. With remove, the value is deleted, or the whole key
+    if value is None.
+    """
+
+    key: str
+    value: Optional[str]
+    data: RegData = ""
+    value_type: int = REG_SZ
+    remove: bool = False
+
+
+def _strtoul(data: str) -> int:
+    """Parse a number as reg.exe does (decimal, 0x hex or 0 octal)."""
+    text = data.strip().lower()
+    try:
+        if text.startswith("0x"):
+            return int(text[2:], 16)
+        if len(text) > 1 and text.startswith("0"):
+            return int(text[1:], 8)
+        return int(text, 10)
+    except ValueError:
+        raise UnsupportedRegistryEdit(f"Invalid number: {data}")
+
+
+def reg_exe_change(
+    key: str, value: str, data: str, value_type: Optional[str] = None
+) -> RegChange:
+    """The change made by reg.exe add, data is converted as reg.exe does."""
+    reg_type = REG_TYPES.get((value_type or "REG_SZ").upper())
+    if reg_type in (REG_SZ, REG_EXPAND_SZ):
+        return RegChange(key, value, data, reg_type)
+    if reg_type == REG_MULTI_SZ:
+        return RegChange(key, value, data.split("\\0") if data else [], reg_type)
+    if reg_type in (REG_DWORD, REG_QWORD):
+        return RegChange(key, value, _strtoul(data), reg_type)
+    if reg_type == REG_BINARY:
+        try:
+            return RegChange(key, value, bytes.fromhex(data), reg_type)
+        except ValueError:
+            raise UnsupportedRegistryEdit(f"Invalid binary data: {data}")
+    raise UnsupportedRegistryEdit(f"Unsupported type: {value_type}")
+
+
+_REGEDIT_ESCAPES = {"\\": "\\", '"': '"', "n": "\n", "r": "\r", "0": "\0"}
+_REGEDIT_ESCAPES_REV = {v: k for k, v in _REGEDIT_ESCAPES.items()}
+
+
+def _regedit_unescape(text: str) -> str:
+    return re.sub(
+        r"\\(.)",
+        lambda m: _REGEDIT_ESCAPES.get(m.group(1), m.group(0)),
+        text,
+        flags=re.S,
+    )
+
+
+def _regedit_escape(text: str) -> str:
+    return "".join(
+        "\\" + _REGEDIT_ESCAPES_REV[c] if c in _REGEDIT_ESCAPES_REV else c for c in text
+    )
+
+
+def _regedit_hex(key: str, value: str, value_type: int, data: bytes, unicode: bool):
+    if value_type in (REG_SZ, REG_EXPAND_SZ, REG_MULTI_SZ):
+        # REGEDIT4 files store these as ANSI
+        text = _decode_sz(data) if unicode else data.decode("latin-1").rstrip("\0")
+        if value_type == REG_MULTI_SZ:
+            return RegChange(key, value, _split_multi_sz(text), value_type)
+        return RegChange(key, value, text, value_type)
+    return RegChange(key, value, data, value_type)
+
+
+def regedit_change(
+    key: str, value: str, data: str, key_type: str = "", unicode: bool = False
+) -> Optional[RegChange]:
+    """
+    The change made by regedit for a "value"=key_type:data line, None for
+    the lines regedit skips as invalid.
+    """
+    if data == "-":
+        return RegChange(key, value, remove=True)
+    if not key_type:
+        return RegChange(key, value, _regedit_unescape(data))
+    if key_type == "dword":
+        try:
+            return RegChange(key, value, int(data, 16), REG_DWORD)
+        except ValueError:
+            logging.warning(f"Skipping invalid dword [{key}] {value}: {data}")
+            return None
+    match = re.fullmatch(r"hex(?:\(([0-9a-fA-F]+)\))?", key_type)
+    if match is None:
+        raise UnsupportedRegistryEdit(f"Unsupported type: {key_type}")
+    value_type = int(match.group(1), 16) if match.group(1) else REG_BINARY
+    try:
+        return _regedit_hex(key, value, value_type, _hex_bytes(data), unicode)
+    except ValueError:
+        raise UnsupportedRegistryEdit(f"Invalid hex data: {data}")
+
+
+def _regedit_name(line: str) -> Tuple[str, int]:
+    match = re.match(r'"((?:[^"\\]|\\.)*)"', line)
+    if match is None:
+        raise UnsupportedRegistryEdit(f"Invalid value line: {line}")
+    return _regedit_unescape(match.group(1)), match.end()
+
+
+def parse_reg(text: str) -> List[RegChange]:
+    """
+    Parse the content of a .reg file (REGEDIT4, the default, or version
+    5.00) into changes, as regedit would import it.
+    """
+    lines: List[str] = []
+    for line in text.lstrip("\ufeff").splitlines():
+        if lines and lines[-1].endswith("\\"):
+            lines[-1] = lines[-1][:-1] + line.strip()
+        else:
+            lines.append(line.strip())
+
+    unicode = False
+    key = None
+    changes = []
+    for line in lines:
+        if not line or line.startswith((";", "#")):
+            continue
+        if line == "REGEDIT4":
+            unicode = False
+        elif line.startswith("Windows Registry Editor Version 5.00"):
+            unicode = True
+        elif line.startswith("[-") and line.endswith("]"):
+            key = None
+            changes.append(RegChange(line[2:-1], None, remove=True))
+        elif line.startswith("[") and line.endswith("]"):
+            key = line[1:-1]
+        elif key is None:
+            raise UnsupportedRegistryEdit(f"Value out of a key: {line}")
+        else:
+            if line.startswith("@"):
+                value, pos = "", 1
+            else:
+                value, pos = _regedit_name(line)
+            data = line[pos:].lstrip()
+            if not data.startswith("="):
+                raise UnsupportedRegistryEdit(f"Invalid value line: {line}")
+            data = data[1:].lstrip()
+
+            if data.startswith('"'):
+                string, end = _regedit_name(data)
+                change = RegChange(key, value, string)
+            elif data == "-":
+                change = RegChange(key, value, remove=True)
+            else:
+                key_type, sep, raw = data.partition(":")
+                if not sep:
+                    raise UnsupportedRegistryEdit(f"Invalid value line: {line}")
+                change = regedit_change(key, value, raw, key_type.lower(), unicode)
+            if change is not None:
+                changes.append(change)
+    return changes
+
+
+def format_reg(changes: List[RegChange]) -> str:
+    """Compile changes into a version 5.00 .reg file, imported in order."""
+    out = ["Windows Registry Editor Version 5.00\n"]
+    current = None
+    for change in changes:
+        if change.value is None:
+            out.append(f"\n[-{change.key}]\n")
+            current = None
+            continue
+        if change.key != current:
+            out.append(f"\n[{change.key}]\n")
+            current = change.key
+
+        name = "@" if not change.value else f'"{_regedit_escape(change.value)}"'
+        data = change.data
+        value_type = change.value_type
+        if change.remove:
+            line = "-"
+        elif value_type == REG_SZ and isinstance(data, str):
+            line = f'"{_regedit_escape(data)}"'
+        elif value_type == REG_DWORD and isinstance(data, int):
+            line = f"dword:{data & 0xFFFFFFFF:08x}"
+        else:
+            if isinstance(data, list):
+                data = "".join(f"{s}\0" for s in data) + "\0"
+            elif isinstance(data, str):
+                data += "\0"
+            if isinstance(data, str):
+                data = data.encode("utf-16-le")
+            elif isinstance(data, int):
+                data = data.to_bytes(8 if value_type == REG_QWORD else 4, "little")
+            kind = "hex" if value_type == REG_BINARY else f"hex({value_type:x})"
+            line = f"{kind}:{','.join(f'{b:02x}' for b in data)}"
+        out.append(f"{name}={line}\n")
+    return "".join(out)
+
+
+class OfflineRegistry:
+    """
+    The registry of a prefix, edited through its files. Keys are full
+    paths as accepted by reg.exe (HKEY_CURRENT_USER\\Software\\Wine...).
+    Changes are kept in memory until save(). Raises UnsupportedRegistryEdit
+    for what can't be done on the files, so callers can use wine instead.
+    """
+
+    __locks: Dict[str, threading.Lock] = {}
+    __locks_lock = threading.Lock()
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.__files: Dict[str, RegistryFile] = {}
+
+    @staticmethod
+    def available(prefix: str) -> bool:
+        return all(os.path.isfile(os.path.join(prefix, f)) for f in HIVE_FILES)
+
+    @classmethod
+    def lock(cls, prefix: str) -> threading.Lock:
+        """The lock serializing the edits on the prefix files."""
+        with cls.__locks_lock:
+            return cls.__locks.setdefault(os.path.realpath(prefix), threading.Lock())
+
+    def __locate(self, key: str) -> Tuple[RegistryFile, str]:
+        key = key.strip("\\")
+        upper = key.upper()
+        for root, file_name in HIVES:
+            if upper == root or upper.startswith(root + "\\"):
+                break
+        else:
+            raise UnsupportedRegistryEdit(f"Unsupported root key: {key}")
+
+        if file_name not in self.__files:
+            try:
+                self.__files[file_name] = RegistryFile(
+                    os.path.join(self.prefix, file_name)
+                )
+            except OSError as e:
+                raise UnsupportedRegistryEdit(str(e))
+        path = key[len(root) + 1 :]
+        if not path:
+            raise UnsupportedRegistryEdit("Can't edit a root key")
+        return self.__files[file_name], path
+
+    def get(self, key: str, value: str) -> Optional[Tuple[int, RegData]]:
+        """Return (type, data) of a value, None if missing."""
+        registry, path = self.__locate(key)
+        return registry.get(path, value)
+
+    def set(self, key: str, value: str, data: RegData, value_type: int = REG_SZ):
+        registry, path = self.__locate(key)
+        registry.set(path, value, value_type, data)
+
+    def delete(self, key: str, value: Optional[str] = None) -> bool:
+        """Delete a value, or the whole key if value is None."""
+        registry, path = self.__locate(key)
+        return registry.delete(path, value)
+
+    def apply(self, changes: List[RegChange]):
+        for change in changes:
+            if change.remove:
+                self.delete(change.key, change.value)
+            else:
+                self.set(change.key, change.value, change.data, change.value_type)
+
+    def add(self, key: str, value: str, data: str, value_type: Optional[str] = None):
+        """Same as reg.exe add."""
+        self.apply([reg_exe_change(key, value, data, value_type)])
+
+    def import_reg(self, content: str):
+        """Same as importing the .reg file content with regedit."""
+        self.apply(parse_reg(content))
+
+    def save(self) -> List[str]:
+        """Write the modified files, returns their paths."""
+        return [f.path for f in self.__files.values() if f.save()]
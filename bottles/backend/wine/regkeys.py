@@ -1,10 +1,11 @@
+import contextlib
 from typing import Optional
 
 from bottles.backend.logger import Logger
 from bottles.backend.models.config import BottleConfig
 from bottles.backend.models.enum import Arch
 from bottles.backend.wine.catalogs import win_versions
-from bottles.backend.wine.reg import Reg
+from bottles.backend.wine.reg import Reg, RegTransaction
 from bottles.backend.wine.wineboot import WineBoot
 from bottles.backend.wine.winecfg import WineCfg
 
@@ -15,6 +16,26 @@ class RegKeys:
     def __init__(self, config: BottleConfig):
         self.config = config
         self.reg = Reg(self.config)
+        self.wineboot = WineBoot(self.config)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Collect the registry edits of the RegKeys methods called in the
+        block and apply them at once on exit, see Reg.transaction.
+        Nested blocks join the outer transaction.
+        """
+        if isinstance(self.reg, RegTransaction):
+            yield self.reg
+            return
+
+        reg = self.reg
+        with reg.transaction() as transaction:
+            self.reg = transaction
+            try:
+                yield transaction
+            finally:
+                self.reg = reg
 
     def lg_set_windows(self, version: str):
         """
@@ -52,7 +73,6 @@ class RegKeys:
         if version == "winxp" and self.config.Arch == Arch.WIN64:
             version = "winxp64"
 
-        wineboot = WineBoot(self.config)
         del_keys = {
             "HKEY_LOCAL_MACHINE\\Software\\Microsoft\\Windows\\CurrentVersion": [
                 "SubVersionNumber",
@@ -68,13 +88,13 @@ class RegKeys:
             "HKEY_LOCAL_MACHINE\\System\\CurrentControlSet\\Control\\Windows": "CSDVersion",
             "HKEY_CURRENT_USER\\Software\\Wine": "Version",
         }
+        removals = []
         for d in del_keys:
             _val = del_keys.get(d)
             if isinstance(_val, list):
-                for v in _val:
-                    self.reg.remove(d, v)
+                removals += [(d, v) for v in _val]
             else:
-                self.reg.remove(d, _val)
+                removals.append((d, _val))
 
         if version not in ["win98", "win95"]:
             bundle = {
@@ -148,10 +168,13 @@ class RegKeys:
                 "HKEY_LOCAL_MACHINE\\System\\CurrentControlSet\\Control\\ProductOptions"
             ] = [{"value": "ProductType", "data": win_version["ProductType"]}]
 
-        self.reg.import_bundle(bundle)
-
-        wineboot.restart()
-        wineboot.update()
+        with self.transaction() as transaction:
+            for key, value in removals:
+                transaction.remove(key, value)
+            transaction.import_bundle(bundle)
+            # a stopped bottle reads the new version on the next start
+            transaction.after_live(self.wineboot.restart)
+            transaction.after_live(self.wineboot.update)
 
     def set_app_default(self, version: str, executable: str):
         """
@@ -175,24 +198,24 @@ class RegKeys:
         This function toggles the virtual desktop for a bottle, updating
         the Desktop's registry key.
         """
-        wineboot = WineBoot(self.config)
-
-        if state:
-            self.reg.add(
-                key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer",
-                value="Desktop",
-                data="Default",
-            )
-            self.reg.add(
-                key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer\\Desktops",
-                value="Default",
-                data=resolution,
-            )
-        else:
-            self.reg.remove(
-                key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer", value="Desktop"
-            )
-        wineboot.update()
+        with self.transaction() as transaction:
+            if state:
+                transaction.add(
+                    key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer",
+                    value="Desktop",
+                    data="Default",
+                )
+                transaction.add(
+                    key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer\\Desktops",
+                    value="Default",
+                    data=resolution,
+                )
+            else:
+                transaction.remove(
+                    key="HKEY_CURRENT_USER\\Software\\Wine\\Explorer",
+                    value="Desktop",
+                )
+            transaction.after_live(self.wineboot.update)
 
     def toggle_wayland_driver(self, state: bool):
         key = "HKEY_CURRENT_USER\\Software\\Wine\\Drivers"
@@ -4,8 +4,10 @@ import shlex
 import stat
 import subprocess
 import tempfile
+from collections import OrderedDict
 from pathlib import Path
-from typing import Iterable, Optional
+from threading import Lock
+from typing import Iterable, Optional, Tuple
 
 from bottles.backend.globals import (
     Paths,
@@ -24,7 +26,9 @@ from bottles.backend.utils.display import DisplayUtils
 from bottles.backend.utils.generic import detect_encoding
 from bottles.backend.utils.gpu import GPUUtils
 from bottles.backend.utils.manager import ManagerUtils
+from bottles.backend.utils.proc import ProcUtils
 from bottles.backend.utils.steam import SteamUtils
+from bottles.backend.utils.storage import checksum
 from bottles.backend.utils.terminal import TerminalUtils
 from bottles.backend.utils.umu import UMUUtils
 from bottles.backend.utils.wine import WineUtils
@@ -130,12 +134,67 @@ def _needs_steam_virtual_gamepad_workaround(runner_name: Optional[str]) -> bool:
     return major <= 8
 
 
+class EnvCache:
+    """
+    The environments built by WineCommand.get_env(), by the inputs they
+    depend on: the bottle config, the runner, the runtimes, the vkBasalt
+    configuration file, the host environment and the command flags.
+    Entries are dropped when the config is updated or a component is
+    installed, and evicted LRU past maxsize.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries: "OrderedDict[tuple, Tuple[str, dict]]" = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, bottle: str, env: dict):
+        with self.__lock:
+            self.__entries[key] = (bottle, env)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, bottle: Optional[str] = None):
+        """Drop the entries of the bottle path, or all of them."""
+        with self.__lock:
+            if bottle is None:
+                self.__entries.clear()
+                return
+            for key in [k for k, e in self.__entries.items() if e[0] == bottle]:
+                del self.__entries[key]
+
+    def stats(self) -> dict:
+        with self.__lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.__entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
 class WineCommand:
     """
     This class is used to run a wine command with a custom environment.
     It also handles the launch in a terminal or not.
     """
 
+    env_cache = EnvCache()
+
     def __init__(
         self,
         config: BottleConfig,
@@ -215,11 +274,79 @@ class WineCommand:
 
         return cwd
 
+    def __get_env_key(
+        self, bottle: str, environment: dict, return_steam_env: bool, clean: bool
+    ) -> tuple:
+        config = self.config
+        if config.Environment == "Steam":
+            runner_path = config.RunnerPath
+        else:
+            runner_path = ManagerUtils.get_runner_path(config.Runner)
+        try:
+            runner_mtime = os.stat(runner_path).st_mtime_ns
+        except (OSError, TypeError):
+            runner_mtime = 0
+
+        # the files and runtimes the environment points to, when present
+        params = config.Parameters
+        runtimes = None
+        if params.use_runtime or params.use_eac_runtime or params.use_be_runtime:
+            runtimes = repr(RuntimeManager.get_runtimes("bottles"))
+        vkbasalt_conf = os.path.isfile(os.path.join(bottle, "vkBasalt.conf"))
+
+        digest = checksum(repr(config.to_dict()))
+        return (
+            digest,
+            bottle,
+            runner_path,
+            runner_mtime,
+            runtimes,
+            vkbasalt_conf,
+            hash(frozenset(os.environ.items())),
+            tuple(sorted((str(k), str(v)) for k, v in environment.items())),
+            self.runner,
+            self.minimal,
+            self.terminal,
+            self.gamescope_activated,
+            return_steam_env,
+            clean,
+            getattr(self, "umu_proton_path", None),
+            getattr(self, "umu_id", None),
+            getattr(self, "umu_store", None),
+            logging.debug_mode,
+        )
+
     def get_env(
         self,
         environment: Optional[dict] = None,
         return_steam_env: bool = False,
         return_clean_env: bool = False,
+    ) -> dict:
+        """
+        The environment of the command, reused from WineCommand.env_cache
+        while nothing it depends on has changed.
+        """
+        config = self.config
+        environment = dict(environment or {})
+        if config.Environment == "Steam":
+            bottle = config.Path
+        else:
+            bottle = ManagerUtils.get_bottle_path(config)
+
+        key = self.__get_env_key(
+            bottle, environment, return_steam_env, return_clean_env
+        )
+        env = self.env_cache.get(key)
+        if env is None:
+            env = self.__build_env(environment, return_steam_env, return_clean_env)
+            self.env_cache.put(key, bottle, env)
+        return dict(env)
+
+    def __build_env(
+        self,
+        environment: dict,
+        return_steam_env: bool = False,
+        return_clean_env: bool = False,
     ) -> dict:
         config = self.config
         clean_env = return_steam_env or return_clean_env
@@ -237,9 +364,6 @@ class WineCommand:
         if None in [arch, params]:
             return env.get()["envs"]
 
-        if environment is None:
-            environment = {}
-
         bottle = ManagerUtils.get_bottle_path(config)
         runner_path = ManagerUtils.get_runner_path(config.Runner)
 
@@ -256,7 +380,6 @@ class WineCommand:
 
         dll_overrides = []
         gpu = GPUUtils().get_gpu()
-        DisplayUtils.check_nvidia_device()
         ld = []
 
         # Bottle environment variables
@@ -773,12 +896,8 @@ class WineCommand:
         self.command = f"{vmtouch_available} {vmtouch_flags} {vmtouch_file_size} {self.vmtouch_files} && {self.command}"
 
     def _vmtouch_free(self):
-        subprocess.Popen(
-            "kill $(pidof vmtouch)",
-            shell=True,
-            env=self.env,
-            cwd=self.cwd,
-        )
+        for proc in ProcUtils.snapshot().filter(name="vmtouch"):
+            proc.kill()
         if not self.vmtouch_files:
             return
 
@@ -1,13 +1,11 @@
-import re
-import time
-import subprocess
 from typing import Optional
 
 from bottles.backend.logger import Logger
+from bottles.backend.utils.manager import ManagerUtils
+from bottles.backend.utils.proc import ProcUtils
+from bottles.backend.wine.proctable import ProcessTable
 from bottles.backend.wine.wineprogram import WineProgram
 from bottles.backend.wine.wineserver import WineServer
-from bottles.backend.wine.wineboot import WineBoot
-from bottles.backend.utils.decorators import cache
 
 logging = Logger()
 
@@ -20,114 +18,60 @@ class WineDbg(WineProgram):
     def __wineserver_status(self):
         return WineServer(self.config).is_alive()
 
-    @cache(seconds=5)
+    def __get_prefix(self) -> str:
+        if self.config.Environment == "Steam":
+            return self.config.Path
+        return ManagerUtils.get_bottle_path(self.config)
+
+    def get_table(self) -> ProcessTable:
+        """The process table of the bottle, shared by its users."""
+        return ProcessTable.get(self.__get_prefix())
+
     def get_processes(self):
         """Get all processes running on the wineprefix."""
-        processes = []
-
         if not self.__wineserver_status():
-            return processes
-
-        res = self.launch(
-            args='--command "info proc"', communicate=True, action_name="get_processes"
-        )
-        if not res.ready:
-            return processes
-
-        # Regex to match winedbg output:
-        # pid (hex) | (D) flag | child marker \_ | threads (dec) | name (quoted or unquoted)
-        # Examples:
-        #  00000008 1      'C:\windows\system32\services.exe'
-        #  00000009 1       \_ 'C:\windows\system32\winedevice.exe'
-        #  00000020 (D) 1   'C:\windows\system32\services.exe'
-        #  12345678 (D) \_ 2   name
-        pattern = re.compile(
-            r"^\s*"
-            r"(?P<pid>[0-9a-fA-F]+)\s+"  # PID in hex
-            r"(?:\(D\)\s+)?"  # Optional (D) flag
-            r"(?P<child>\\_\s+)?"  # Optional child marker
-            r"(?P<threads>\d+)\s+"  # Thread count
-            r"(?P<name>.*)$"  # Executable name
-        )
-
-        lines = res.data.split("\n")
-        last_pid = None
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("pid"):
-                continue
-
-            match = pattern.match(line)
-            if not match:
-                continue
-
-            d = match.groupdict()
-            w_pid = d["pid"]
-            w_threads = d["threads"]
-            w_name = d["name"].strip().strip("'").strip('"')
-            is_child = bool(d["child"])
-
-            # Determine parent PID
-            w_parent = None
-            if is_child:
-                w_parent = last_pid
-            else:
-                last_pid = w_pid
-
-            processes.append(
-                {
-                    "pid": w_pid,
-                    "threads": w_threads,
-                    "name": w_name,
-                    "parent": w_parent,
-                }
-            )
-
-        return processes
+            return []
+        return [p.to_dict() for p in self.get_table().snapshot()]
 
     def wait_for_process(self, name: str, timeout: float = 0.5):
-        """Wait for a process to exit."""
+        """
+        Wait for a process to exit. The table is followed through its
+        shared poller, timeout is how often the wineserver is checked
+        while nothing changes.
+        """
         if not self.__wineserver_status():
             return True
 
-        while True:
-            processes = self.get_processes()
-            if len(processes) == 0:
-                break
-            if name not in [p["name"] for p in processes]:
-                break
-            time.sleep(timeout)
+        table = self.get_table()
+        if not table.find(name):
+            return True
+
+        with table.subscribe() as subscription:
+            while table.find(name):
+                diff = subscription.get(timeout)
+                if diff is None and not self.__wineserver_status():
+                    break
         return True
 
     def kill_process(self, pid: Optional[str] = None, name: Optional[str] = None):
         """
-        Kill a process by its PID or name.
+        Kill a process by its PID (as listed by get_processes) or name.
+        A pid that is not a number is taken as a name, as the callers
+        passed the executable there when the pids came from winedbg.
         """
-        wineboot = WineBoot(self.config)
         if not self.__wineserver_status():
             return
 
+        if pid and not str(pid).isdigit():
+            pid, name = None, str(pid)
+
         if pid:
-            args = "\n".join(
-                ["<< END_OF_INPUTS", f"attach 0x{pid}", "kill", "quit", "END_OF_INPUTS"]
-            )
-            res = self.launch(args=args, communicate=True, action_name="kill_process")
-            if res.has_data and "error 5" in res.data and name:
-                subprocess.Popen(
-                    f"kill $(pgrep {name[:15]})",
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    shell=True,
-                )
-                return
-            wineboot.kill()
+            ProcUtils.get_by_pid(pid).kill()
+            return
 
         if name:
-            processes = self.get_processes()
-            for p in processes:
-                if p["name"] == name:
-                    self.kill_process(p["pid"], name)
+            for p in self.get_table().find(name):
+                ProcUtils.get_by_pid(p.pid).kill()
 
     def is_process_alive(self, pid: Optional[str] = None, name: Optional[str] = None):
         """
@@ -136,10 +80,9 @@ class WineDbg(WineProgram):
         if not self.__wineserver_status():
             return False
 
-        processes = self.get_processes()
-
+        table = self.get_table()
         if pid:
-            return pid in [p["pid"] for p in processes]
+            return str(pid) in [str(p.pid) for p in table.snapshot()]
         if name:
-            return name in [p["name"] for p in processes]
+            return len(table.find(name)) > 0
         return False
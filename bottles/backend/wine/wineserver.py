@@ -1,85 +1,141 @@
+import fcntl
 import os
-import subprocess
+import struct
+import threading
 import time
+from typing import Dict, Optional, Tuple
 
 from bottles.backend.logger import Logger
 from bottles.backend.utils.manager import ManagerUtils
 from bottles.backend.utils.proc import ProcUtils
-from bottles.backend.utils.steam import SteamUtils
 from bottles.backend.wine.wineprogram import WineProgram
 
 logging = Logger()
 
+# struct flock: l_type, l_whence, l_start, l_len, l_pid
+_FLOCK = "hhqqi"
+
 
 class WineServer(WineProgram):
     program = "Wine Server"
     command = "wineserver"
 
-    def is_alive(self):
-        config = self.config
-
-        # If the config has no Runner, skip the execution
-        if not config.Runner:
+    # probe() answers are reused for this long, unless the server
+    # directory changes, as it does when a server starts or stops
+    probe_ttl = 0.5
+    __probes: Dict[str, Tuple[float, int, bool]] = {}
+    __waiters: Dict[str, threading.Event] = {}
+    __lock = threading.Lock()
+
+    def __get_prefix(self) -> str:
+        if self.config.Environment == "Steam":
+            return self.config.Path
+        return ManagerUtils.get_bottle_path(self.config)
+
+    @staticmethod
+    def get_server_dir(prefix: str) -> Optional[str]:
+        """
+        The directory of the wineserver for prefix, named by Wine after
+        the prefix device and inode. None if the prefix doesn't exist.
+        """
+        try:
+            stat = os.stat(prefix)
+        except OSError:
+            return None
+        return f"/tmp/.wine-{os.getuid()}/server-{stat.st_dev:x}-{stat.st_ino:x}"
+
+    @staticmethod
+    def __is_locked(lock_path: str) -> bool:
+        """Whether a process holds the lock a running wineserver keeps."""
+        fd = os.open(lock_path, os.O_RDONLY)
+        try:
+            query = struct.pack(_FLOCK, fcntl.F_WRLCK, os.SEEK_SET, 0, 1, 0)
+            res = fcntl.fcntl(fd, fcntl.F_GETLK, query)
+        finally:
+            os.close(fd)
+        return struct.unpack(_FLOCK, res)[0] != fcntl.F_UNLCK
+
+    @classmethod
+    def probe(cls, prefix: str) -> bool:
+        """
+        Whether a wineserver is running for prefix, checked on its lock
+        without launching any process.
+        """
+        server_dir = cls.get_server_dir(prefix)
+        if server_dir is None:
             return False
-
-        # Perform native check before wasting time using wine
-        res = subprocess.Popen(["pgrep", "wineserver"], stdout=subprocess.PIPE)
-        if res.stdout.read() == b"":
+        try:
+            mtime = os.stat(server_dir).st_mtime_ns
+        except OSError:
             return False
 
-        # Check using wine
-        bottle = ManagerUtils.get_bottle_path(config)
-        runner = ManagerUtils.get_runner_path(config.Runner)
-
-        if config.Environment == "Steam":
-            bottle = config.Path
-            runner = config.RunnerPath
-
-        if SteamUtils.is_proton(runner):
-            runner = SteamUtils.get_dist_directory(runner)
-
-        env = os.environ.copy()
-        env["WINEPREFIX"] = bottle
-        if not config.Runner.startswith("sys-"):
-            env["PATH"] = f"{runner}/bin:{env['PATH']}"
-        res = subprocess.Popen(
-            "wineserver -w",
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-            cwd=bottle,
-            env=env,
-        )
-        time.sleep(0.5)
-        if res.poll() is None:
-            res.kill()  # kill the process to avoid zombie incursion
+        now = time.monotonic()
+        with cls.__lock:
+            cached = cls.__probes.get(server_dir)
+        if cached is not None and cached[0] > now and cached[1] == mtime:
+            return cached[2]
+
+        try:
+            alive = cls.__is_locked(os.path.join(server_dir, "lock"))
+        except FileNotFoundError:
+            alive = False
+        except OSError:
+            # the lock can't be queried, trust the socket
+            alive = os.path.exists(os.path.join(server_dir, "socket"))
+
+        with cls.__lock:
+            cls.__probes[server_dir] = (now + cls.probe_ttl, mtime, alive)
+        return alive
+
+    @classmethod
+    def wait_until_stopped(cls, prefix: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the wineserver of prefix exits, waiting on its lock
+        as wineserver -w does. The wait runs in a background thread, shared
+        by the callers for the same prefix, so a timed out call can simply
+        be repeated. Returns False if the server is still running after
+        timeout seconds.
+        """
+        server_dir = cls.get_server_dir(prefix)
+        if server_dir is None:
             return True
-        return False
 
-    def wait(self):
-        config = self.config
-        bottle = ManagerUtils.get_bottle_path(config)
-        runner = ManagerUtils.get_runner_path(config.Runner)
+        with cls.__lock:
+            stopped = cls.__waiters.get(server_dir)
+            if stopped is None:
+                try:
+                    fd = os.open(os.path.join(server_dir, "lock"), os.O_RDONLY)
+                except OSError:
+                    return True
+                stopped = cls.__waiters[server_dir] = threading.Event()
+                threading.Thread(
+                    target=cls.__wait_lock, args=(server_dir, fd, stopped), daemon=True
+                ).start()
+        return stopped.wait(timeout)
+
+    @classmethod
+    def __wait_lock(cls, server_dir: str, fd: int, stopped: threading.Event):
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_SH, 1)
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1)
+        except OSError as e:
+            logging.debug(f"Cannot wait on the wineserver lock: {e}")
+        finally:
+            os.close(fd)
+            with cls.__lock:
+                cls.__probes.pop(server_dir, None)
+                cls.__waiters.pop(server_dir, None)
+            stopped.set()
 
-        if config.Environment == "Steam":
-            bottle = config.Path
-            runner = config.RunnerPath
-
-        if SteamUtils.is_proton(runner):
-            runner = SteamUtils.get_dist_directory(runner)
-
-        env = os.environ.copy()
-        env["WINEPREFIX"] = bottle
-        env["PATH"] = f"{runner}/bin:{env['PATH']}"
+    def is_alive(self):
+        # If the config has no Runner, skip the execution
+        if not self.config.Runner:
+            return False
+        return self.probe(self.__get_prefix())
 
-        subprocess.Popen(
-            "wineserver -w",
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-            cwd=bottle,
-            env=env,
-        ).wait()
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the wineserver to exit, see wait_until_stopped."""
+        return self.wait_until_stopped(self.__get_prefix(), timeout)
 
     def kill(self, signal: int = -1):
         args = "-k"
@@ -91,8 +147,7 @@ class WineServer(WineProgram):
         )
 
     def force_kill(self):
-        bottle = ManagerUtils.get_bottle_path(self.config)
-        procs = ProcUtils.get_by_env(f"WINEPREFIX={bottle}")
+        procs = ProcUtils.get_by_prefix(self.__get_prefix())
         for proc in procs:
             proc.kill(9)
 
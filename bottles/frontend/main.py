@@ -46,6 +46,8 @@ from bottles.frontend.views.preferences import PreferencesWindow
 from bottles.frontend.windows.window import BottlesWindow
 
 logging = Logger()
+# keep the UI thread free from terminal writes
+Logger.set_async()
 
 # region Translations
 """
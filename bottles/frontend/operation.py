@@ -73,6 +73,9 @@ class TaskSyncer:
         task_id: UUID = res.data
         task = TaskManager.get(task_id)
         self._TASK_WIDGETS[task_id] = self._new_widget(task.title, task.cancellable)
+        self._TASK_WIDGETS[task_id].btn_cancel.connect(
+            "clicked", lambda _button: TaskManager.cancel(task_id)
+        )
         self._set_task_btn_visible(True)
 
     @GtkUtils.run_in_main_loop
@@ -39,6 +39,7 @@ from bottles.backend.globals import (
 )
 from bottles.backend.logger import Logger
 from bottles.backend.managers.library import LibraryManager
+from bottles.backend.managers.manager import ConfigChange
 from bottles.backend.managers.runtime import RuntimeManager
 from bottles.backend.models.config import BottleConfig
 from bottles.backend.models.enum import Arch
@@ -729,7 +730,7 @@ class PreferencesView(Adw.PreferencesPage):
     def __toggle_feature(self, state: bool, key: str) -> None:
         """Toggle a specific feature."""
         self.config = self.manager.update_config(
-            config=self.config, key=key, value=state, scope="Parameters"
+            config=self.config, key=key, value=state, scope="Parameters", debounce=True
         ).data["config"]
 
     def __toggle_feature_cb(self, _widget: Gtk.Widget, state: bool, key: str) -> None:
@@ -910,8 +911,12 @@ class PreferencesView(Adw.PreferencesPage):
             ).data["config"]
         else:
             dxvk = self.manager.dxvk_available[self.combo_dxvk.get_selected() - 1]
-            self.config = self.manager.update_config(
-                config=self.config, key="DXVK", value=dxvk
+            self.config = self.manager.update_config_many(
+                self.config,
+                [
+                    ConfigChange("DXVK", dxvk),
+                    ConfigChange("dxvk", True, scope="Parameters"),
+                ],
             ).data["config"]
 
             RunAsync(
@@ -921,10 +926,6 @@ class PreferencesView(Adw.PreferencesPage):
                 component="dxvk",
             )
 
-            self.config = self.manager.update_config(
-                config=self.config, key="dxvk", value=True, scope="Parameters"
-            ).data["config"]
-
     def __set_vkd3d(self, *_args):
         """Set the VKD3D version to use for the bottle"""
         self.set_vkd3d_status(pending=True)
@@ -950,8 +951,12 @@ class PreferencesView(Adw.PreferencesPage):
                 self.combo_dxvk.set_selected(1)
 
             vkd3d = self.manager.vkd3d_available[self.combo_vkd3d.get_selected() - 1]
-            self.config = self.manager.update_config(
-                config=self.config, key="VKD3D", value=vkd3d
+            self.config = self.manager.update_config_many(
+                self.config,
+                [
+                    ConfigChange("VKD3D", vkd3d),
+                    ConfigChange("vkd3d", True, scope="Parameters"),
+                ],
             ).data["config"]
 
             RunAsync(
@@ -961,10 +966,6 @@ class PreferencesView(Adw.PreferencesPage):
                 component="vkd3d",
             )
 
-            self.config = self.manager.update_config(
-                config=self.config, key="vkd3d", value=True, scope="Parameters"
-            ).data["config"]
-
     def __set_nvapi(self, *_args):
         """Set the NVAPI version to use for the bottle"""
         self.set_nvapi_status(pending=True)
@@ -973,8 +974,12 @@ class PreferencesView(Adw.PreferencesPage):
         self.switch_nvapi.set_active(True)
 
         nvapi = self.manager.nvapi_available[self.combo_nvapi.get_selected()]
-        self.config = self.manager.update_config(
-            config=self.config, key="NVAPI", value=nvapi
+        self.config = self.manager.update_config_many(
+            self.config,
+            [
+                ConfigChange("NVAPI", nvapi),
+                ConfigChange("dxvk_nvapi", True, scope="Parameters"),
+            ],
         ).data["config"]
 
         RunAsync(
@@ -984,10 +989,6 @@ class PreferencesView(Adw.PreferencesPage):
             component="nvapi",
         )
 
-        self.config = self.manager.update_config(
-            config=self.config, key="dxvk_nvapi", value=True, scope="Parameters"
-        ).data["config"]
-
     def __set_latencyflex(self, *_args):
         """Set the latency flex value"""
         self.queue.add_task()
@@ -1007,8 +1008,12 @@ class PreferencesView(Adw.PreferencesPage):
             latencyflex = self.manager.latencyflex_available[
                 self.combo_latencyflex.get_selected() - 1
             ]
-            self.config = self.manager.update_config(
-                config=self.config, key="LatencyFleX", value=latencyflex
+            self.config = self.manager.update_config_many(
+                self.config,
+                [
+                    ConfigChange("LatencyFleX", latencyflex),
+                    ConfigChange("latencyflex", True, scope="Parameters"),
+                ],
             ).data["config"]
 
             RunAsync(
@@ -1017,9 +1022,6 @@ class PreferencesView(Adw.PreferencesPage):
                 config=self.config,
                 component="latencyflex",
             )
-            self.config = self.manager.update_config(
-                config=self.config, key="latencyflex", value=True, scope="Parameters"
-            ).data["config"]
 
     def __set_windows(self, *_args):
         """Set the Windows version to use for the bottle"""
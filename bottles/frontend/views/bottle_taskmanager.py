@@ -15,12 +15,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from typing import Optional
+from typing import Dict, Optional
 
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 
 from bottles.backend.models.config import BottleConfig
 from bottles.backend.utils.threading import RunAsync
+from bottles.backend.wine.proctable import ProcessDiff, WineProcess
 from bottles.backend.wine.winebridge import WineBridge
 from bottles.backend.wine.winedbg import WineDbg
 from bottles.frontend.utils.gtk import GtkUtils
@@ -45,13 +46,17 @@ class TaskManagerView(Gtk.ScrolledWindow):
         self.window = details.window
         self.manager = details.window.manager
         self.config = config
+        self.subscription = None
+        self.rows: Dict[str, Gtk.TreeRowReference] = {}
 
         self.btn_update.connect("clicked", self.sensitive_update)
         self.btn_kill.connect("clicked", self.kill_process)
         self.treeview_processes.connect("cursor-changed", self.show_kill_btn)
+        self.connect("map", self.__subscribe)
+        self.connect("unmap", self.__unsubscribe)
 
         # apply model to treeview_processes
-        self.liststore_processes = Gtk.ListStore(str, str, str)
+        self.liststore_processes = Gtk.ListStore(str, str, str, str, str)
         self.treeview_processes.set_model(self.liststore_processes)
 
         cell_renderer = Gtk.CellRendererText()
@@ -61,6 +66,8 @@ class TaskManagerView(Gtk.ScrolledWindow):
             "PID",
             "Name",
             "Threads",
+            "Memory",
+            "CPU",
             # "Parent"
         ]:
             """
@@ -74,6 +81,63 @@ class TaskManagerView(Gtk.ScrolledWindow):
 
     def set_config(self, config):
         self.config = config
+        if self.subscription is not None:
+            self.__unsubscribe()
+            self.__subscribe()
+
+    def __subscribe(self, *_args):
+        """
+        Follow the process table of the bottle while the view is shown,
+        the rows are updated from the diffs of its poller.
+        """
+        if self.subscription is not None or not self.config.Runner:
+            return
+        if WineBridge(self.config).is_available():
+            return
+        self.liststore_processes.clear()
+        self.rows.clear()
+        table = WineDbg(self.config).get_table()
+        self.subscription = table.subscribe(
+            lambda diff: GLib.idle_add(self.__apply_diff, diff)
+        )
+
+    def __unsubscribe(self, *_args):
+        if self.subscription is not None:
+            self.subscription.close()
+            self.subscription = None
+
+    @staticmethod
+    def __row(process: WineProcess) -> list:
+        return [
+            str(process.pid),
+            process.name,
+            str(process.threads),
+            GLib.format_size(process.rss),
+            f"{process.cpu:.1f}%",
+        ]
+
+    def __apply_diff(self, diff: ProcessDiff):
+        if self.subscription is None:
+            return
+        for process in diff.removed:
+            ref = self.rows.pop(str(process.pid), None)
+            if ref is not None and ref.valid():
+                self.liststore_processes.remove(
+                    self.liststore_processes.get_iter(ref.get_path())
+                )
+        for process in diff.changed + diff.added:
+            row = self.__row(process)
+            ref = self.rows.get(row[0])
+            if ref is not None and ref.valid():
+                treeiter = self.liststore_processes.get_iter(ref.get_path())
+                for column, value in enumerate(row):
+                    self.liststore_processes.set_value(treeiter, column, value)
+                continue
+            treeiter = self.liststore_processes.append(row)
+            self.rows[row[0]] = Gtk.TreeRowReference.new(
+                self.liststore_processes,
+                self.liststore_processes.get_path(treeiter),
+            )
 
     def show_kill_btn(self, widget):
         selected = self.treeview_processes.get_selection()
@@ -88,6 +152,9 @@ class TaskManagerView(Gtk.ScrolledWindow):
         This function scan for new processed and update the
         liststore_processes with the new data
         """
+        if self.subscription is not None:
+            # the rows already follow the process table
+            return
         self.liststore_processes.clear()
 
         def fetch_processes(config: Optional[BottleConfig] = None):
@@ -114,6 +181,8 @@ class TaskManagerView(Gtk.ScrolledWindow):
                             process.get("pid"),
                             process.get("name", "n/a"),
                             process.get("threads", "0"),
+                            "n/a",
+                            "n/a",
                             # process.get("parent", "0")
                         ]
                     )
@@ -144,7 +213,9 @@ class TaskManagerView(Gtk.ScrolledWindow):
 
         @GtkUtils.run_in_main_loop
         def reset(result, error):
-            self.liststore_processes.remove(treeiter)
+            # the subscription removes the row once the process exits
+            if self.subscription is None:
+                self.liststore_processes.remove(treeiter)
 
         if winebridge.is_available():
             RunAsync(task_func=winebridge.kill_proc, callback=reset, pid=pid)
@@ -17,6 +17,7 @@
 
 from datetime import datetime
 from gettext import gettext as _
+from typing import Optional
 
 from gi.repository import Adw, GLib, Gtk
 
@@ -25,6 +26,7 @@ try:
 except (ImportError, ValueError):
     Xdp = None
 
+from bottles.backend.managers.bottle_index import BottlesDiff
 from bottles.backend.models.config import BottleConfig
 from bottles.backend.models.result import Result
 from bottles.backend.state import SignalManager, Signals
@@ -179,7 +181,27 @@ class BottleView(Adw.Bin):
         text = row.get_title().lower()
         return terms.lower() in text
 
-    def update_bottles_list(self, *args) -> None:
+    def update_bottles_list(self, data: Optional[Result] = None, *args) -> None:
+        diff = data.data if data and isinstance(data.data, BottlesDiff) else None
+        if diff is None or not self.__bottles:
+            self.__rebuild_bottles_list()
+        else:
+            self.__apply_bottles_diff(diff)
+
+        local_bottles = self.window.manager.local_bottles
+        is_empty_local_bottles = len(local_bottles) == 0
+
+        self.pref_page.set_visible(not is_empty_local_bottles)
+        self.bottle_status.set_visible(is_empty_local_bottles)
+
+        if self.list_steam.get_first_child() is None:
+            self.group_steam.set_visible(False)
+            self.group_bottles.set_title("")
+        else:
+            self.group_steam.set_visible(True)
+            self.group_bottles.set_title(_("Your Bottles"))
+
+    def __rebuild_bottles_list(self) -> None:
         self.__bottles = {}
         while self.list_bottles.get_first_child():
             self.list_bottles.remove(self.list_bottles.get_first_child())
@@ -187,27 +209,31 @@ class BottleView(Adw.Bin):
         while self.list_steam.get_first_child():
             self.list_steam.remove(self.list_steam.get_first_child())
 
+        for config in self.window.manager.local_bottles.values():
+            self.__add_bottle_row(config)
+
+    def __apply_bottles_diff(self, diff: BottlesDiff) -> None:
+        """Only touch the rows of the bottles which actually changed."""
         local_bottles = self.window.manager.local_bottles
-        is_empty_local_bottles = len(local_bottles) == 0
 
-        self.pref_page.set_visible(not is_empty_local_bottles)
-        self.bottle_status.set_visible(is_empty_local_bottles)
+        for name in diff.removed + diff.changed:
+            for path, row in list(self.__bottles.items()):
+                if row.config.Name == name:
+                    row.get_parent().remove(row)
+                    del self.__bottles[path]
+
+        for name in diff.added + diff.changed:
+            if config := local_bottles.get(name):
+                self.__add_bottle_row(config)
 
-        for name, config in local_bottles.items():
-            _entry = BottlesBottleRow(self.window, config)
-            self.__bottles[config.Path] = _entry
-
-            if config.Environment != "Steam":
-                self.list_bottles.append(_entry)
-            else:
-                self.list_steam.append(_entry)
-
-            if self.list_steam.get_first_child() is None:
-                self.group_steam.set_visible(False)
-                self.group_bottles.set_title("")
-            else:
-                self.group_steam.set_visible(True)
-                self.group_bottles.set_title(_("Your Bottles"))
+    def __add_bottle_row(self, config: BottleConfig) -> None:
+        _entry = BottlesBottleRow(self.window, config)
+        self.__bottles[config.Path] = _entry
+
+        if config.Environment != "Steam":
+            self.list_bottles.append(_entry)
+        else:
+            self.list_steam.append(_entry)
 
     def show_page(self, page: str) -> None:
         if config := self.window.manager.local_bottles.get(page):
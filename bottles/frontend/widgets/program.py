@@ -255,7 +255,7 @@ class ProgramEntry(Adw.ActionRow):
         self.window.show_toast(_('Stopping "{0}"…').format(self.program["name"]))
         winedbg = WineDbg(self.config)
         widget.set_sensitive(False)
-        winedbg.kill_process(self.executable)
+        winedbg.kill_process(name=self.executable)
         self.__reset_buttons(True)
 
     @GtkUtils.run_in_main_loop
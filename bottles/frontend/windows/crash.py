@@ -22,6 +22,7 @@ from gettext import gettext as _
 
 from gi.repository import Adw, Gtk
 
+from bottles.backend.logger import RECENT_LOG_HEADER
 from bottles.backend.utils import json
 
 
@@ -71,7 +72,8 @@ class CrashReportDialog(Adw.Window):
         self.check_unlock_send.connect("toggled", self.__on_unlock_send)
 
         self.label_output.set_text(log)
-        __similar_reports = self.__get_similar_issues(log)
+        # the recent log records would only add noise to the comparison
+        __similar_reports = self.__get_similar_issues(log.split(RECENT_LOG_HEADER)[0])
         if len(__similar_reports) >= 5:
             """
             This issue was reported 5 times, preventing the user from
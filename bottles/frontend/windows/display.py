@@ -20,8 +20,8 @@ from gettext import gettext as _
 from gi.repository import Adw, GLib, Gtk
 
 from bottles.backend.logger import Logger
+from bottles.backend.managers.manager import ConfigChange
 from bottles.backend.utils.threading import RunAsync
-from bottles.backend.wine.reg import Reg
 from bottles.backend.wine.regkeys import RegKeys
 from bottles.frontend.utils.gtk import GtkUtils
 
@@ -95,177 +95,91 @@ class DisplayDialog(Adw.Window):
         width = int(self.spin_width.get_value())
         height = int(self.spin_height.get_value())
         resolution = f"{width}x{height}"
+        virtual_desktop = self.expander_virtual_desktop.get_enable_expansion()
+        mouse_warp = self.switch_mouse_warp.get_active()
+        dpi = int(self.spin_dpi.get_value())
+        renderer = renderers[self.combo_renderer.get_selected()]
 
-        """Queue system"""
-        self.started = 0
-        self.queued = 0
-        self.completed = 0
+        """Collect the changes, the registry ones are applied at once"""
+        changes = []
+        edits = []
 
-        def add_queue():
-            if self.started == 0:
-                self.window.show_toast(_("Updating display settings, please wait…"))
-                self.spinner_display.start()
-                self.started = 1
-            self.queue.add_task()
-            self.widget.set_sensitive(False)
-            self.queued += 1
-
-        def complete_queue():
-            self.completed += 1
-            if self.queued == self.completed:
-                self.widget.set_sensitive(True)
-                self.spinner_display.stop()
-                self.window.show_toast(_("Display settings updated"))
-            self.queue.end_task()
-
-        if (
-            self.expander_virtual_desktop.get_enable_expansion()
-            != self.parameters.virtual_desktop
-        ):
+        if virtual_desktop != self.parameters.virtual_desktop:
             """Toggle virtual desktop"""
-
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config,
-                    key="virtual_desktop",
-                    value=self.expander_virtual_desktop.get_enable_expansion(),
-                    scope="Parameters",
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            rk = RegKeys(self.config)
-            RunAsync(
-                task_func=rk.toggle_virtual_desktop,
-                callback=update,
-                state=self.expander_virtual_desktop.get_enable_expansion(),
-                resolution=resolution,
+            changes.append(
+                ConfigChange("virtual_desktop", virtual_desktop, "Parameters")
+            )
+            edits.append(
+                lambda rk: rk.toggle_virtual_desktop(virtual_desktop, resolution)
             )
 
-        if (
-            self.expander_virtual_desktop.get_enable_expansion()
-            and resolution != self.parameters.virtual_desktop_res
-        ):
+        if virtual_desktop and resolution != self.parameters.virtual_desktop_res:
             """Set virtual desktop resolution"""
+            changes.append(
+                ConfigChange("virtual_desktop_res", resolution, "Parameters")
+            )
+            if virtual_desktop == self.parameters.virtual_desktop:
+                edits.append(lambda rk: rk.toggle_virtual_desktop(True, resolution))
 
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config,
-                    key="virtual_desktop_res",
-                    value=resolution,
-                    scope="Parameters",
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            rk = RegKeys(self.config)
-            if self.expander_virtual_desktop.get_enable_expansion():
-                RunAsync(
-                    task_func=rk.toggle_virtual_desktop,
-                    callback=update,
-                    state=True,
-                    resolution=resolution,
-                )
-
-        if self.switch_mouse_warp.get_active() != self.parameters.mouse_warp:
+        if mouse_warp != self.parameters.mouse_warp:
             """Set mouse warp"""
+            changes.append(ConfigChange("mouse_warp", mouse_warp, "Parameters"))
+            edits.append(lambda rk: rk.set_mouse_warp(mouse_warp))
 
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config,
-                    key="mouse_warp",
-                    value=self.switch_mouse_warp.get_active(),
-                    scope="Parameters",
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            rk = RegKeys(self.config)
-
-            RunAsync(
-                rk.set_mouse_warp,
-                callback=update,
-                state=self.switch_mouse_warp.get_active(),
-            )
-
-        if self.spin_dpi.get_value() != self.parameters.custom_dpi:
+        if dpi != self.parameters.custom_dpi:
             """Set DPI"""
+            changes.append(ConfigChange("custom_dpi", dpi, "Parameters"))
+            edits.append(lambda rk: rk.set_dpi(dpi))
 
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config, key="custom_dpi", value=dpi, scope="Parameters"
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            rk = RegKeys(self.config)
-            dpi = int(self.spin_dpi.get_value())
-
-            RunAsync(rk.set_dpi, callback=update, value=dpi)
-
-        if renderers[self.combo_renderer.get_selected()] != self.parameters.renderer:
+        if renderer != self.parameters.renderer:
             """Set renderer"""
+            changes.append(ConfigChange("renderer", renderer, "Parameters"))
+            edits.append(lambda rk: rk.set_renderer(renderer))
 
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config,
-                    key="renderer",
-                    value=renderer,
-                    scope="Parameters",
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            rk = RegKeys(self.config)
-            renderer = renderers[self.combo_renderer.get_selected()]
-
-            RunAsync(rk.set_renderer, callback=update, value=renderer)
-
-        def toggle_x11_reg_key(state, rkey, ckey):
-            """Update x11 registry keys"""
-
-            @GtkUtils.run_in_main_loop
-            def update(result, error=False):
-                self.config = self.manager.update_config(
-                    config=self.config, key=ckey, value=state, scope="Parameters"
-                ).data["config"]
-                complete_queue()
-
-            add_queue()
-            reg = Reg(self.config)
-            _rule = "Y" if state else "N"
-
-            RunAsync(
-                reg.add,
-                callback=update,
-                key="HKEY_CURRENT_USER\\Software\\Wine\\X11 Driver",
-                value=rkey,
-                data=_rule,
-            )
-
-        if self.switch_mouse_capture.get_active() != self.parameters.fullscreen_capture:
-            toggle_x11_reg_key(
-                self.switch_mouse_capture.get_active(),
-                "GrabFullscreen",
+        """Update x11 registry keys"""
+        for switch, ckey, setter in (
+            (
+                self.switch_mouse_capture,
                 "fullscreen_capture",
-            )
-        if self.switch_take_focus.get_active() != self.parameters.take_focus:
-            toggle_x11_reg_key(
-                self.switch_take_focus.get_active(), "UseTakeFocus", "take_focus"
-            )
-        if self.switch_decorated.get_active() != self.parameters.decorated:
-            toggle_x11_reg_key(
-                self.switch_decorated.get_active(), "Decorated", "decorated"
-            )
+                RegKeys.set_grab_fullscreen,
+            ),
+            (self.switch_take_focus, "take_focus", RegKeys.set_take_focus),
+            (self.switch_decorated, "decorated", RegKeys.set_decorated),
+        ):
+            state = switch.get_active()
+            if state != self.parameters[ckey]:
+                changes.append(ConfigChange(ckey, state, "Parameters"))
+                edits.append(lambda rk, s=state, f=setter: f(rk, s))
+
+        if changes:
+            self.__apply(changes, edits)
 
         """Close window"""
         self.close()
         return GLib.SOURCE_REMOVE
 
+    def __apply(self, changes, edits):
+        @GtkUtils.run_in_main_loop
+        def update(result, error=False):
+            self.config = self.manager.update_config_many(
+                config=self.config, changes=changes
+            ).data["config"]
+            self.widget.set_sensitive(True)
+            self.spinner_display.stop()
+            self.window.show_toast(_("Display settings updated"))
+            self.queue.end_task()
+
+        def apply_edits():
+            rk = RegKeys(self.config)
+            with rk.transaction():
+                for edit in edits:
+                    edit(rk)
+
+        self.window.show_toast(_("Updating display settings, please wait…"))
+        self.spinner_display.start()
+        self.queue.add_task()
+        self.widget.set_sensitive(False)
+        RunAsync(apply_edits, callback=update)
+
     def __save(self, *args):
         GLib.idle_add(self.__idle_save)
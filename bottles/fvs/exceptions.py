@@ -28,3 +28,7 @@ class FVSMissingStateIndex(FVSException):
 
 class FVSEmptyStateIndex(FVSException):
     pass
+
+
+class FVSCancelled(FVSException):
+    pass
@@ -15,15 +15,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import contextlib
 import os
 import time
 import subprocess
 from datetime import datetime
-from threading import Lock
-from typing import Optional
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
 from bottles.backend.logger import Logger
 from bottles.fvs.exceptions import (
+    FVSCancelled,
     FVSNothingToCommit,
     FVSNothingToRestore,
     FVSStateNotFound,
@@ -34,7 +36,112 @@ FVS2_CMD = "fvs2"
 logging = Logger()
 
 
+class FVSState(NamedTuple):
+    id: str
+    timestamp: int
+    message: str
+
+
+class FVSProgress(NamedTuple):
+    files: int
+    total_files: int
+    bytes: int
+    total_bytes: int
+    rate: float  # bytes per second
+    eta: Optional[float]  # seconds, None while unknown
+
+    @property
+    def percent(self) -> int:
+        if self.total_bytes:
+            return min(int(self.bytes * 100 / self.total_bytes), 100)
+        if self.total_files:
+            return min(int(self.files * 100 / self.total_files), 100)
+        return 0
+
+    def describe(self) -> str:
+        from bottles.backend.utils.file import FileUtils
+
+        text = (
+            f"{self.percent}% · {self.files}/{self.total_files} · "
+            f"{FileUtils.get_human_size(self.rate)}/s"
+        )
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f" · {minutes}:{seconds:02d}"
+        return text
+
+
+class FVSStatus(NamedTuple):
+    head: Optional[str] = None
+    branch: Optional[str] = None
+
+
+def parse_status(stdout: str) -> FVSStatus:
+    """The key=value lines of fvs2 status."""
+    values = {}
+    for line in stdout.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip()] = value.strip()
+    return FVSStatus(
+        head=values.get("head_commit") or None, branch=values.get("branch") or None
+    )
+
+
+def parse_states(stdout: str) -> List[FVSState]:
+    """The lines of fvs2 states: id, ISO time and message split by two spaces."""
+    states = []
+    for line in stdout.splitlines():
+        parts = line.strip().split("  ", 2)
+        if len(parts) < 3:
+            continue
+        state_id, time_str, message = (part.strip() for part in parts)
+        try:
+            dt = datetime.strptime(
+                time_str.split(".")[0].replace("Z", ""), "%Y-%m-%dT%H:%M:%S"
+            )
+            timestamp = int(datetime.timestamp(dt))
+        except ValueError:
+            timestamp = int(datetime.timestamp(datetime.now()))
+        states.append(FVSState(state_id, timestamp, message))
+    return states
+
+
+def parse_branches(stdout: str) -> List[str]:
+    """The lines of fvs2 branch list, the active one starts with "*"."""
+    return [b.strip().lstrip("* ") for b in stdout.splitlines() if b.strip()]
+
+
 class FVSRepo:
+    """
+    A fvs2 repository. Use FVSRepo.get() to share a session per path:
+    the status, states and branches are queried once and kept until a
+    mutating operation or a change in the .fvs2 folder makes them stale.
+    """
+
+    __sessions: Dict[str, "FVSRepo"] = {}
+    __sessions_lock = Lock()
+
+    @classmethod
+    def get(cls, repo_path: str, use_compression: bool = False) -> "FVSRepo":
+        """The session of the repository, refreshed if stale."""
+        repo_path = os.path.normpath(repo_path)
+        with cls.__sessions_lock:
+            repo = cls.__sessions.get(repo_path)
+            # recreate the session if the repository was removed, to init it
+            if repo is None or not os.path.exists(os.path.join(repo_path, ".fvs2")):
+                repo = cls(repo_path, use_compression=use_compression)
+                cls.__sessions[repo_path] = repo
+        repo._use_compression = use_compression
+        repo.refresh()
+        return repo
+
+    @classmethod
+    def forget(cls, repo_path: str):
+        """Drop the session of the repository, e.g. once removed."""
+        with cls.__sessions_lock:
+            cls.__sessions.pop(os.path.normpath(repo_path), None)
+
     def __init__(
         self, repo_path: str, use_compression: bool = False, no_init: bool = False
     ):
@@ -50,6 +157,9 @@ class FVSRepo:
         self.__has_no_states = True
         self.__dirty = False
         self.__changed_files = 0
+        self.__stale = True
+        self.__fingerprint = None
+        self.__history: List[FVSState] = []
 
         if not no_init:
             self._init_repo()
@@ -57,7 +167,7 @@ class FVSRepo:
         self._refresh()
 
     def _get_fvs2_bin(self):
-        return "fvs2"
+        return FVS2_CMD
 
     def _run_cmd(self, *args, check=True):
         cmd = [self._fvs2] + list(args)
@@ -84,48 +194,131 @@ class FVSRepo:
                 if res.returncode != 0 and "already initialized" not in res.stderr:
                     raise RuntimeError(f"Failed to initialize FVS: {res.stderr}")
 
-    def commit(self, message: str, ignore: list = None, task_id: str = None):
-        """Create a commit. Does NOT auto-refresh; caller should refresh if needed."""
+    def __list_objects(self) -> Set[str]:
+        files = set()
+        for root, _, names in os.walk(os.path.join(self._repo_path, ".fvs2")):
+            files.update(os.path.join(root, name) for name in names)
+        return files
+
+    @staticmethod
+    def __watch(process: subprocess.Popen, cancel_event: Event):
+        """Terminate the process once cancel_event is set."""
+        while process.poll() is None:
+            if cancel_event.wait(0.2):
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                return
+
+    def __stream(
+        self,
+        args: list,
+        marker: str,
+        task_id=None,
+        total: Optional[Tuple[int, int]] = None,
+        cancel_event: Optional[Event] = None,
+        progress: Optional[Callable[[FVSProgress], None]] = None,
+    ) -> Tuple[int, str, str]:
+        """
+        Run a verbose fvs2 command, reporting the files it prints after
+        marker to the task and to progress. total is the expected number
+        of files and bytes, used for the percentage and the ETA.
+        """
         from bottles.backend.state import TaskManager
 
+        process = subprocess.Popen(
+            [self._fvs2] + args,
+            cwd=self._repo_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        if cancel_event is not None:
+            Thread(
+                target=self.__watch, args=(process, cancel_event), daemon=True
+            ).start()
+
+        total_files, total_bytes = total or (0, 0)
+        files = size = 0
+        start = last_update = time.monotonic()
+        other = []
+
+        def report():
+            elapsed = time.monotonic() - start
+            rate = size / elapsed if elapsed > 0 else 0.0
+            update = FVSProgress(
+                files=files,
+                total_files=max(total_files, files),
+                bytes=size,
+                total_bytes=max(total_bytes, size),
+                rate=rate,
+                eta=(max(total_bytes - size, 0) / rate) if rate else None,
+            )
+            if progress:
+                progress(update)
+            if task_id:
+                task = TaskManager.get(task_id)
+                if task:
+                    task.subtitle = update.describe()
+
+        for line in process.stdout:
+            line = line.strip()
+            if not line.startswith(marker):
+                other.append(line)
+                continue
+            files += 1
+            with contextlib.suppress(OSError):
+                path = os.path.join(self._repo_path, line[len(marker) :])
+                size += os.lstat(path).st_size
+            if time.monotonic() - last_update > 0.1:
+                report()
+                last_update = time.monotonic()
+
+        stderr = process.stderr.read()
+        process.wait()
+        if process.returncode == 0:
+            report()
+        return process.returncode, "\n".join(other), stderr
+
+    def commit(
+        self,
+        message: str,
+        ignore: list = None,
+        task_id: str = None,
+        total: Optional[Tuple[int, int]] = None,
+        cancel_event: Optional[Event] = None,
+        progress: Optional[Callable[[FVSProgress], None]] = None,
+    ):
+        """
+        Create a commit. Does NOT auto-refresh; caller should refresh if needed.
+        Setting cancel_event stops fvs2 and removes the objects it wrote,
+        raising FVSCancelled.
+        """
         with self._lock:
-            args = [self._fvs2, "commit", "-m", message, "-v"]
-
-            process = subprocess.Popen(
-                args,
-                cwd=self._repo_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
+            self.__stale = True
+            objects = self.__list_objects() if cancel_event is not None else None
+            returncode, stdout, stderr = self.__stream(
+                ["commit", "-m", message, "-v"],
+                "hashing: ",
+                task_id=task_id,
+                total=total,
+                cancel_event=cancel_event,
+                progress=progress,
             )
 
-            last_update = 0
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                if line:
-                    line = line.strip()
-                    if line.startswith("hashing: "):
-                        current_time = time.time()
-                        if current_time - last_update > 0.1:
-                            file_path = line.replace("hashing: ", "")
-                            if task_id:
-                                task = TaskManager.get(task_id)
-                                if task:
-                                    task.subtitle = file_path
-                            last_update = current_time
-
-            stdout, stderr = process.communicate()
-
-            if process.returncode != 0:
-                full_stdout = stdout.lower()
-                full_stderr = stderr.lower()
+            if returncode != 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    # nothing refers to the objects of an interrupted commit
+                    for path in self.__list_objects() - objects:
+                        with contextlib.suppress(OSError):
+                            os.remove(path)
+                    raise FVSCancelled()
                 if (
-                    "nothing to commit" in full_stdout
-                    or "nothing to commit" in full_stderr
+                    "nothing to commit" in stdout.lower()
+                    or "nothing to commit" in stderr.lower()
                 ):
                     raise FVSNothingToCommit()
                 raise RuntimeError(f"FVS commit failed: {stderr}")
@@ -136,11 +329,12 @@ class FVSRepo:
         ignore: list = None,
         reset: bool = True,
         task_id: str = None,
+        total: Optional[Tuple[int, int]] = None,
+        progress: Optional[Callable[[FVSProgress], None]] = None,
     ):
         """Restore to a state. Does NOT auto-refresh; caller should refresh if needed."""
-        from bottles.backend.state import TaskManager
-
         with self._lock:
+            self.__stale = True
             state_id = str(state_id)
             matched = False
             for k in self.__states.keys():
@@ -151,98 +345,87 @@ class FVSRepo:
             if not matched:
                 raise FVSStateNotFound(state_id)
 
-            args = [self._fvs2, "restore", "-s", state_id, "-v"]
+            args = ["restore", "-s", state_id, "-v"]
             if reset:
                 args.append("--reset")
 
-            process = subprocess.Popen(
-                args,
-                cwd=self._repo_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
+            returncode, _, stderr = self.__stream(
+                args, "restoring: ", task_id=task_id, total=total, progress=progress
             )
-
-            last_update = 0
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                if line:
-                    line = line.strip()
-                    if line.startswith("restoring: "):
-                        current_time = time.time()
-                        if current_time - last_update > 0.1:
-                            file_path = line.replace("restoring: ", "")
-                            if task_id:
-                                task = TaskManager.get(task_id)
-                                if task:
-                                    task.subtitle = file_path
-                            last_update = current_time
-
-            stdout, stderr = process.communicate()
-            if process.returncode != 0:
+            if returncode != 0:
                 if "nothing to restore" in stderr.lower():
                     raise FVSNothingToRestore()
                 raise RuntimeError(f"FVS restore failed: {stderr}")
 
-    def _refresh(self):
-        """Fetch status, states and branches in one pass."""
+    def __get_fingerprint(self) -> Optional[Tuple]:
+        """The mtimes of the .fvs2 folder and its entries, to notice the
+        changes made by other fvs2 processes."""
+        path = os.path.join(self._repo_path, ".fvs2")
+        try:
+            with os.scandir(path) as entries:
+                return (os.stat(path).st_mtime_ns,) + tuple(
+                    sorted((e.name, e.stat().st_mtime_ns) for e in entries)
+                )
+        except OSError:
+            return None
+
+    def __query(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Run status, states and branch list at once, None for failures."""
+        processes = [
+            subprocess.Popen(
+                [self._fvs2] + args,
+                cwd=self._repo_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            for args in (["status"], ["states"], ["branch", "list"])
+        ]
+        outputs = []
+        for process in processes:
+            stdout, _ = process.communicate()
+            outputs.append(stdout if process.returncode == 0 else None)
+        return outputs[0], outputs[1], outputs[2]
+
+    def refresh(self, force: bool = False):
+        """Fetch status, states and branches, unless they are up to date."""
         with self._lock:
+            fingerprint = self.__get_fingerprint()
+            if not force and not self.__stale and fingerprint == self.__fingerprint:
+                return
+
             self.__states = {}
+            self.__history = []
             self.__active_state_id = None
             self.__active_branch = None
             self.__branches = []
             self.__has_no_states = True
+            # the dirty check is run on demand, see check_dirty()
+            self.__dirty = False
+            self.__changed_files = 0
+            self.__stale = False
+            self.__fingerprint = fingerprint
 
-            if not os.path.exists(os.path.join(self._repo_path, ".fvs2")):
+            if fingerprint is None:
                 return
 
-            status_res = self._run_cmd("status", check=False)
-            if status_res.returncode == 0:
-                for sline in status_res.stdout.split("\n"):
-                    if sline.startswith("head_commit="):
-                        self.__active_state_id = sline.replace(
-                            "head_commit=", ""
-                        ).strip()
-                    elif sline.startswith("branch="):
-                        self.__active_branch = sline.replace("branch=", "").strip()
-
-            states_res = self._run_cmd("states", check=False)
-            if states_res.returncode == 0:
-                for line in states_res.stdout.strip().split("\n"):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    parts = line.split("  ", 2)
-                    if len(parts) >= 3:
-                        state_id = parts[0].strip()
-                        time_str = parts[1].strip()
-                        message = parts[2].strip()
-                        try:
-                            dt = datetime.strptime(
-                                time_str.split(".")[0].replace("Z", ""),
-                                "%Y-%m-%dT%H:%M:%S",
-                            )
-                            timestamp = int(datetime.timestamp(dt))
-                        except:
-                            timestamp = int(datetime.timestamp(datetime.now()))
-                        self.__states[state_id] = {
-                            "timestamp": timestamp,
-                            "message": message,
-                        }
-                if self.__states:
-                    self.__has_no_states = False
-
-            branches_res = self._run_cmd("branch", "list", check=False)
-            if branches_res.returncode == 0:
-                self.__branches = [
-                    b.strip().lstrip("* ")
-                    for b in branches_res.stdout.split("\n")
-                    if b.strip()
-                ]
+            status, states, branches = self.__query()
+            if status is not None:
+                status = parse_status(status)
+                self.__active_state_id = status.head
+                self.__active_branch = status.branch
+            if states is not None:
+                self.__history = parse_states(states)
+                self.__states = {
+                    s.id: {"timestamp": s.timestamp, "message": s.message}
+                    for s in self.__history
+                }
+                self.__has_no_states = not self.__states
+            if branches is not None:
+                self.__branches = parse_branches(branches)
+
+    def _refresh(self):
+        self.refresh(force=True)
 
     def check_dirty(self):
         """Specifically runs the slow dirty check and updates the dirty/changed_files properties."""
@@ -291,9 +474,19 @@ class FVSRepo:
     def branches(self) -> list:
         return self.__branches
 
+    @property
+    def history(self) -> List[FVSState]:
+        """The states, in the order listed by fvs2."""
+        return list(self.__history)
+
+    @property
+    def status(self) -> FVSStatus:
+        return FVSStatus(self.__active_state_id, self.__active_branch)
+
     def create_branch(self, branch_name: str):
         """Create a branch. Does NOT auto-refresh; caller should refresh if needed."""
         with self._lock:
+            self.__stale = True
             res = self._run_cmd("branch", "create", branch_name, check=False)
             if res.returncode != 0:
                 raise RuntimeError(f"FVS create branch failed: {res.stderr}")
@@ -301,6 +494,7 @@ class FVSRepo:
     def delete_branch(self, branch_name: str):
         """Delete a branch. Does NOT auto-refresh; caller should refresh if needed."""
         with self._lock:
+            self.__stale = True
             res = self._run_cmd("branch", "delete", branch_name, check=False)
             if res.returncode != 0:
                 raise RuntimeError(f"FVS delete branch failed: {res.stderr}")
@@ -308,6 +502,7 @@ class FVSRepo:
     def checkout(self, target: str):
         """Switch HEAD to a branch. Does NOT auto-refresh; caller should refresh if needed."""
         with self._lock:
+            self.__stale = True
             res = self._run_cmd("checkout", target, check=False)
             if res.returncode != 0:
                 raise RuntimeError(f"FVS checkout failed: {res.stderr}")
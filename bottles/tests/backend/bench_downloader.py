@@ -0,0 +1,118 @@
+"""
+Benchmark the Downloader against the former implementation (a new
+requests.get per file, no resume) on a local HTTP server that limits
+each connection to RATE bytes per second, as many mirrors do.
+
+Run with: python -m bottles.tests.backend.bench_downloader
+"then md5" verifies the file by reading it again as ComponentManager
+did, "md5 streamed" hashes it while it arrives. The last case kills a
+download half way and resumes it, the former implementation had to
+start again from zero.
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bottles.backend.downloader import SEGMENT_MIN_SIZE, Downloader
+from bottles.backend.utils.file import FileUtils
+from bottles.tests.backend.range_server import RangeServer
+
+SIZE = 4 * SEGMENT_MIN_SIZE
+RATE = 64 * 1024 * 1024
+
+DOWNLOAD = "from bottles.backend.downloader import Downloader; import sys; Downloader(sys.argv[1], sys.argv[2]).download()"
+
+
+def legacy_download(url: str, file: str):
+    with open(file, "wb") as f:
+        response = requests.get(url, stream=True, headers={"User-Agent": "curl"})
+        for data in response.iter_content(1024 * 1024):
+            f.write(data)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def kill_half_way(url: str, file: str):
+    """Start a download in another process, kill it at half the size."""
+    process = subprocess.Popen([sys.executable, "-c", DOWNLOAD, url, file])
+    state = f"{file}.part.json"
+    while process.poll() is None:
+        try:
+            with open(state) as f:
+                segments = json.load(f)["segments"]
+            if sum(offset - start for start, _, offset in segments) >= SIZE // 2:
+                break
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.05)
+    process.send_signal(signal.SIGKILL)
+    process.wait()
+
+
+def main():
+    data = os.urandom(SIZE)
+    with tempfile.TemporaryDirectory(prefix="bottles-bench-") as tmp:
+        with RangeServer(data, rate=RATE) as server:
+            url = server.url
+
+            def path(name):
+                return os.path.join(tmp, name)
+
+            results = [
+                ("former", timed(lambda: legacy_download(url, path("a")))),
+                ("1 segment", timed(lambda: Downloader(url, path("b")).download())),
+                (
+                    "4 segments",
+                    timed(lambda: Downloader(url, path("c"), segments=4).download()),
+                ),
+            ]
+            results += [
+                (
+                    "then md5",
+                    timed(
+                        lambda: (
+                            Downloader(url, path("e"), segments=4).download(),
+                            FileUtils.get_checksum(path("e"), cache=False),
+                        )
+                    ),
+                ),
+                (
+                    "md5 streamed",
+                    timed(
+                        lambda: Downloader(
+                            url, path("f"), segments=4, algorithm="md5"
+                        ).download()
+                    ),
+                ),
+            ]
+            kill_half_way(url, path("d"))
+            results.append(
+                ("resume at 50%", timed(lambda: Downloader(url, path("d")).download()))
+            )
+            for name in "abcdef":
+                with open(path(name), "rb") as f:
+                    assert f.read() == data, name
+
+        size = SIZE / 1024 / 1024
+        sys.stdout.write(
+            f"{size:.0f} MiB, {RATE / 1024 / 1024:.0f} MiB/s per connection\n"
+        )
+        for name, seconds in results:
+            sys.stdout.write(
+                f"{name:<16}{seconds:>8.2f}s{size / seconds:>10.1f} MiB/s\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark the cost per call of the backend Logger.
+
+Run with: python -m bottles.tests.backend.bench_logger
+The log output goes to /dev/null, timings are printed to stdout.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+os.environ["XDG_DATA_HOME"] = tempfile.mkdtemp(prefix="bottles-bench-")
+os.environ.pop("LOG_LEVEL", None)
+_stdout = sys.stdout
+sys.stderr = open(os.devnull, "w")
+
+from bottles.backend.logger import Logger  # noqa: E402
+
+CALLS = 20000
+
+
+def per_call(func) -> float:
+    start = time.perf_counter()
+    for i in range(CALLS):
+        func(i)
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+def main():
+    logging = Logger()
+    payload = {"path": "/tmp/bottle/drive_c/Program Files", "size": 1024}
+    cases = [
+        ("debug, filtered out", lambda i: logging.debug(f"progress {i} {payload}")),
+        ("info, emitted", lambda i: logging.info(f"progress {i} {payload}")),
+    ]
+    if hasattr(Logger, "set_async"):
+        cases.insert(
+            1,
+            (
+                "debug %-args, filtered out",
+                lambda i: logging.debug("progress %s %s", i, payload),
+            ),
+        )
+
+    for name, func in cases:
+        _stdout.write(f"{name:<32}{per_call(func):>8.2f} us/call\n")
+
+    if hasattr(Logger, "set_async"):
+        Logger.set_async()
+        cost = per_call(lambda i: logging.info(f"progress {i} {payload}"))
+        Logger.flush()
+        _stdout.write(f"{'info, emitted (async)':<32}{cost:>8.2f} us/call\n")
+
+
+if __name__ == "__main__":
+    main()
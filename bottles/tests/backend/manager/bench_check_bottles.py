@@ -0,0 +1,67 @@
+"""
+Benchmark Manager.check_bottles() cold loads with different worker counts.
+
+Run with: python -m bottles.tests.backend.manager.bench_check_bottles
+It builds synthetic bottles in a temporary XDG_DATA_HOME, so it never
+touches the user data.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+_XDG = tempfile.mkdtemp(prefix="bottles-bench-")
+os.environ["XDG_DATA_HOME"] = _XDG
+
+from bottles.backend.globals import Paths  # noqa: E402
+from bottles.backend.managers.bottle_index import BottleIndexManager  # noqa: E402
+from bottles.backend.managers.manager import Manager  # noqa: E402
+from bottles.backend.models.config import BottleConfig  # noqa: E402
+
+SIZES = [10, 50, 100, 250, 500]
+WORKERS = [1, 4, 8]
+ROUNDS = 3
+
+
+def make_bottles(count: int):
+    for i in range(count):
+        name = f"bench-{i:04d}"
+        path = os.path.join(Paths.bottles, name)
+        if os.path.exists(os.path.join(path, "bottle.yml")):
+            continue
+        os.makedirs(os.path.join(path, "drive_c"), exist_ok=True)
+        BottleConfig(Name=name, Path=name).dump(os.path.join(path, "bottle.yml"))
+
+
+def cold_check(manager: Manager, workers: int) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        # drop the in-memory configs and the persisted index
+        manager.bottle_index.load_index()
+        with open(BottleIndexManager.index_path, "w"):
+            pass
+        manager.bottle_index.load_index()
+        start = time.perf_counter()
+        manager.check_bottles(silent=True, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    manager = Manager(is_cli=True, check_connection=False)
+    manager.check_app_dirs()
+
+    header = "bottles" + "".join(f"{f'{w} worker(s)':>14}" for w in WORKERS)
+    sys.stdout.write(header + "\n")
+    for size in SIZES:
+        make_bottles(size)
+        timings = [cold_check(manager, w) for w in WORKERS]
+        assert len(manager.local_bottles) == size
+        sys.stdout.write(
+            f"{size:>7}" + "".join(f"{t * 1000:>12.1f}ms" for t in timings) + "\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
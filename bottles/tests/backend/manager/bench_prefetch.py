@@ -0,0 +1,83 @@
+"""
+Benchmark DependencyManager.prefetch against downloading the files step
+after step, for a dotnet + vcredist + d3dx like bundle.
+
+Run with: python -m bottles.tests.backend.manager.bench_prefetch
+The files are served by a local server limited to RATE bytes per second
+per connection, Bottles runs in a temporary XDG_DATA_HOME.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_XDG = tempfile.mkdtemp(prefix="bottles-bench-")
+os.environ["XDG_DATA_HOME"] = _XDG
+
+from bottles.backend.globals import Paths  # noqa: E402
+from bottles.backend.managers.artifact import ArtifactStore  # noqa: E402
+from bottles.backend.managers.manager import Manager  # noqa: E402
+from bottles.backend.models.config import BottleConfig  # noqa: E402
+from bottles.tests.backend.range_server import RangeServer  # noqa: E402
+
+# file name and size in MiB
+FILES = {"ndp48.exe": 16, "vc_redist.x64.exe": 8, "directx_Jun2010.exe": 12}
+RATE = 16 * 1024 * 1024
+
+
+def main():
+    data = os.urandom(max(FILES.values()) * 1024 * 1024)
+    manager = Manager(is_cli=True)
+    component_manager = manager.component_manager
+    dependency_manager = manager.dependency_manager
+
+    with RangeServer(data, rate=RATE) as server:
+        manifests, previous = {}, []
+        for name, size in FILES.items():
+            url = f"{server.url}?{name}&size={size}"
+            manifests[name] = {
+                "Dependencies": list(previous),
+                "Steps": [{"action": "install_exe", "file_name": name, "url": url}],
+            }
+            previous.append(name)
+        dependency_manager.get_dependency = manifests.get
+        manager.supported_dependencies = manifests
+        config = BottleConfig(Name="bench")
+
+        def reset():
+            ArtifactStore.clear(keep_pinned=False)
+            shutil.rmtree(Paths.temp, ignore_errors=True)
+            os.makedirs(Paths.temp)
+
+        reset()
+        start = time.perf_counter()
+        for name, manifest in manifests.items():
+            step = manifest["Steps"][0]
+            component_manager.download(step["url"], step["file_name"])
+        sequential = time.perf_counter() - start
+
+        reset()
+        start = time.perf_counter()
+        dependency_manager.prefetch(config, [name])
+        prefetch = time.perf_counter() - start
+
+        # a second bottle installing the same bundle
+        shutil.rmtree(Paths.temp)
+        os.makedirs(Paths.temp)
+        start = time.perf_counter()
+        dependency_manager.prefetch(config, [name])
+        cached = time.perf_counter() - start
+
+    shutil.rmtree(_XDG, ignore_errors=True)
+    sys.stdout.write(
+        f"{len(FILES)} files at {RATE / 1024 / 1024:.0f} MiB/s per connection\n"
+        f"step after step {sequential:>8.2f}s\n"
+        f"prefetch        {prefetch:>8.2f}s\n"
+        f"again, cached   {cached:>8.2f}s\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
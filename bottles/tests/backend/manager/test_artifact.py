@@ -0,0 +1,91 @@
+"""Artifacts store tests"""
+
+import hashlib
+import os
+
+import pytest
+
+from bottles.backend.globals import Paths
+from bottles.backend.managers.artifact import ArtifactStore
+from bottles.tests.backend.range_server import RangeServer
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "artifacts", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(Paths, "temp", str(tmp_path / "temp"))
+    monkeypatch.setattr(Paths, "hash_cache", str(tmp_path / "hash_cache.sqlite"))
+    os.makedirs(Paths.temp)
+
+
+def put(name: str, data: bytes, url: str):
+    path = os.path.join(Paths.temp, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return ArtifactStore.put(path, hashlib.md5(data).hexdigest(), url)
+
+
+def test_content_addressed_and_evicted(monkeypatch):
+    vcredist = put("vcredist_x64.exe", b"a" * 100, "https://a/2019/vc.exe")
+    assert (
+        os.stat(vcredist.path).st_ino
+        == os.stat(f"{Paths.temp}/vcredist_x64.exe").st_ino
+    )
+
+    # found by digest from another url after temp is gone, never by url
+    os.remove(f"{Paths.temp}/vcredist_x64.exe")
+    assert ArtifactStore.get("https://mirror/vc.exe", vcredist.digest) == vcredist
+    assert ArtifactStore.get("https://a/2019/vc.exe", "0" * 32) is None
+    dest = f"{Paths.temp}/vc.exe"
+    ArtifactStore.link(vcredist, dest)
+    with open(dest, "rb") as f:
+        assert f.read() == b"a" * 100
+
+    # the least recently used unpinned files go above max_size
+    monkeypatch.setattr(ArtifactStore, "max_size", 250)
+    dotnet = put("dotnet48.exe", b"b" * 100, "https://b/dotnet48.exe")
+    ArtifactStore.pin({"template:1234": ["https://a/2019/vc.exe"]})
+    d3dx9 = put("d3dx9.cab", b"c" * 100, "https://c/d3dx9.cab")
+    assert ArtifactStore.get("https://b/dotnet48.exe", dotnet.digest) is None
+    assert not os.path.exists(dotnet.path)
+    assert ArtifactStore.get("https://a/2019/vc.exe", vcredist.digest) == vcredist
+
+    stats = ArtifactStore.get_stats()
+    assert (stats["files"], stats["size"], stats["pinned"]) == (2, 200, 1)
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert ArtifactStore.get_linked_size(Paths.temp) == 200
+
+    ArtifactStore.clear()
+    assert ArtifactStore.get_stats()["files"] == 1
+    assert ArtifactStore.get("https://c/d3dx9.cab", d3dx9.digest) is None
+
+
+def test_component_download_uses_the_store(monkeypatch):
+    from bottles.backend.managers.manager import Manager
+
+    data = os.urandom(200 * 1024)
+    checksum = hashlib.md5(data).hexdigest()
+    manager = Manager(is_cli=True)
+    with RangeServer(data) as server:
+        for _ in range(2):
+            res = manager.component_manager.download(
+                server.url, "dxvk-2.3.tar.gz", checksum=checksum
+            )
+            assert res.ok and res.data["checksum"] == checksum
+            os.remove(res.data["file_path"])
+        assert len(server.requests) == 1
+
+        # without a checksum the url may serve another file, it is fetched
+        # again once temp is cleared
+        for _ in range(2):
+            res = manager.component_manager.download(server.url, "dxvk-latest.tar.gz")
+            assert res.ok
+            os.remove(res.data["file_path"])
+        assert len(server.requests) == 3
+
+        # a corrupted download is not stored
+        res = manager.component_manager.download(
+            server.url + "?v2", "dxvk-2.4.tar.gz", checksum="0" * 32
+        )
+        assert not res.ok and len(server.requests) == 4
+    assert ArtifactStore.get_stats()["files"] == 1
@@ -0,0 +1,74 @@
+"""BottleIndexManager tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.managers.bottle_index import BottleIndexManager
+from bottles.backend.models.config import BottleConfig
+
+
+@pytest.fixture()
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        BottleIndexManager, "index_path", str(tmp_path / "bottle_index.yml")
+    )
+    manager = BottleIndexManager()
+    manager.load_index()
+    return manager
+
+
+def _write_config(path, name="Test", **kwargs):
+    config = BottleConfig(Name=name, Path=name, **kwargs)
+    assert config.dump(str(path)).status
+    return config
+
+
+def test_unchanged_config_is_reused(index, tmp_path):
+    config_path = str(tmp_path / "bottle.yml")
+    _write_config(config_path)
+
+    first, maintained, parsed = index.load(config_path)
+    assert first.Name == "Test" and parsed and not maintained
+
+    index.update(config_path, first, maintained=True)
+    second, maintained, parsed = index.load(config_path)
+    assert second is first and maintained and not parsed
+
+
+def test_changed_config_is_parsed_again(index, tmp_path):
+    config_path = str(tmp_path / "bottle.yml")
+    _write_config(config_path)
+    first, _maintained, _parsed = index.load(config_path)
+    index.update(config_path, first, maintained=True)
+
+    _write_config(config_path, Windows="win7")
+    os.utime(config_path, ns=(0, 0))
+    second, maintained, parsed = index.load(config_path)
+
+    assert second is not first and second.Windows == "win7"
+    assert parsed and not maintained
+
+
+def test_maintained_flag_survives_restart(index, tmp_path):
+    config_path = str(tmp_path / "bottle.yml")
+    _write_config(config_path)
+    config, _maintained, _parsed = index.load(config_path)
+    index.update(config_path, config, maintained=True)
+    index.save_index()
+
+    index.load_index()
+    _config, maintained, parsed = index.load(config_path)
+    assert maintained and parsed
+
+
+def test_diff():
+    a, b, c = BottleConfig(Name="a"), BottleConfig(Name="b"), BottleConfig(Name="c")
+    changed_b = BottleConfig(Name="b", Windows="win7")
+
+    diff = BottleIndexManager.diff({"a": a, "b": b}, {"b": changed_b, "c": c})
+
+    assert diff.added == ["c"]
+    assert diff.removed == ["a"]
+    assert diff.changed == ["b"]
+    assert BottleIndexManager.diff({"a": a}, {"a": a}).empty
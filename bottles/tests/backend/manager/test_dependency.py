@@ -0,0 +1,127 @@
+"""Dependency prefetch tests"""
+
+import threading
+import time
+
+from bottles.backend.managers.manager import Manager
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.models.result import Result
+
+
+def step(action, name, arch="win64_win32"):
+    return {
+        "action": action,
+        "file_name": name,
+        "url": f"https://example.com/{name}",
+        "for": arch,
+    }
+
+
+MANIFESTS = {
+    "d3dx9": {
+        "Dependencies": ["vcredist2019", "dotnet48"],
+        "Steps": [step("cab_extract", "directx.exe"), step("copy_dll", "d3dx9.dll")],
+    },
+    # a cycle back to d3dx9
+    "vcredist2019": {
+        "Dependencies": ["d3dx9"],
+        "Steps": [
+            step("install_exe", "vc_redist.x64.exe", "win64"),
+            step("install_exe", "vc_redist.x86.exe", "win32"),
+        ],
+    },
+    # already installed in the bottle
+    "dotnet48": {"Steps": [step("install_exe", "ndp48.exe")]},
+}
+
+
+def test_prefetch_downloads_the_closure_concurrently(monkeypatch):
+    manager = Manager(is_cli=True)
+    dependency_manager = manager.dependency_manager
+    monkeypatch.setattr(manager, "supported_dependencies", dict(MANIFESTS))
+    monkeypatch.setattr(dependency_manager, "get_dependency", MANIFESTS.get)
+
+    # both downloads must be running at once to get through the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    downloaded = []
+
+    def download(download_url, file, rename="", checksum="", func=None, task=None):
+        barrier.wait()
+        func(50, 100)
+        downloaded.append(file)
+        return Result(file != "directx.exe")
+
+    monkeypatch.setattr(manager.component_manager, "download", download)
+    fractions = []
+    config = BottleConfig(
+        Name="test", Arch="win64", Installed_Dependencies=["dotnet48"]
+    )
+    res = dependency_manager.prefetch(
+        config, ["d3dx9"], progress_progress_cb=fractions.append
+    )
+
+    assert sorted(downloaded) == ["directx.exe", "vc_redist.x64.exe"]
+    assert not res.ok and res.data["failed"] == ["directx.exe"]
+    assert fractions[-1] == 0.5
+
+
+def test_prefetch_errors_are_left_to_the_steps(monkeypatch):
+    manager = Manager(is_cli=True)
+    dependency_manager = manager.dependency_manager
+    nameless = step("install_exe", "setup.exe")
+    del nameless["file_name"]
+    manifests = {"broken": {"Steps": [nameless, step("install_exe", "mfc42.exe")]}}
+    monkeypatch.setattr(manager, "supported_dependencies", manifests)
+    monkeypatch.setattr(dependency_manager, "get_dependency", manifests.get)
+
+    def download(download_url, file, rename="", checksum="", func=None, task=None):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(manager.component_manager, "download", download)
+    res = dependency_manager.prefetch(BottleConfig(Name="test"), ["broken"])
+
+    assert not res.ok and res.data["failed"] == ["mfc42.exe"]
+
+
+def test_bundle_takes_as_long_as_the_slowest_download(monkeypatch):
+    manager = Manager(is_cli=True)
+    dependency_manager = manager.dependency_manager
+    manifests = {
+        "vcredist2019": {"Steps": [step("install_exe", "vc_redist.exe")]},
+        "d3dx9": {"Steps": [step("cab_extract", "directx.exe")]},
+        "mfc42": {"Steps": [step("install_exe", "mfc42.exe")]},
+    }
+    delays = {"vc_redist.exe": 0.2, "directx.exe": 0.3, "mfc42.exe": 0.4}
+    monkeypatch.setattr(manager, "supported_dependencies", manifests)
+    monkeypatch.setattr(dependency_manager, "get_dependency", manifests.get)
+
+    stored = set()
+
+    def download(download_url, file, rename="", checksum="", func=None, task=None):
+        # the steps find the prefetched files in the store
+        if file not in stored:
+            time.sleep(delays[file])
+            stored.add(file)
+        return Result(True)
+
+    installed = []
+
+    def install(
+        config, dependency, progress_cb=None, progress_progress_cb=None, prefetch=True
+    ):
+        assert not prefetch
+        for _step in dependency[1]["Steps"]:
+            download(_step["url"], _step["file_name"])
+        installed.append(dependency[0])
+        return Result(True)
+
+    monkeypatch.setattr(manager.component_manager, "download", download)
+    monkeypatch.setattr(dependency_manager, "install", install)
+    start = time.monotonic()
+    res = manager.installer_manager._InstallerManager__install_dependencies(
+        BottleConfig(Name="test"), list(manifests), step_fn=lambda dep: None
+    )
+    elapsed = time.monotonic() - start
+
+    assert res and installed == list(manifests)
+    assert elapsed < sum(delays.values()) - 0.2
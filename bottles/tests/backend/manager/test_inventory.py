@@ -0,0 +1,53 @@
+"""InventoryManager tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.managers.inventory import InventoryManager
+
+
+@pytest.fixture()
+def inventory(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        InventoryManager, "inventory_path", str(tmp_path / "inventory.yml")
+    )
+    manager = InventoryManager()
+    manager.load_inventory()
+    return manager
+
+
+def test_scan_is_skipped_while_unchanged(inventory, tmp_path):
+    component_dir = tmp_path / "dxvk"
+    component_dir.mkdir()
+    calls = []
+
+    def scan():
+        calls.append(1)
+        return sorted(os.listdir(component_dir))
+
+    assert inventory.get("dxvk", str(component_dir), scan) == []
+    assert inventory.get("dxvk", str(component_dir), scan) == []
+    assert len(calls) == 1
+
+    (component_dir / "dxvk-2.3").mkdir()
+    assert inventory.get("dxvk", str(component_dir), scan) == ["dxvk-2.3"]
+    assert len(calls) == 2
+
+
+def test_inventory_is_persisted(inventory, tmp_path):
+    component_dir = tmp_path / "vkd3d"
+    component_dir.mkdir()
+    inventory.get("vkd3d", str(component_dir), lambda: ["vkd3d-2.12"])
+
+    inventory.load_inventory()
+    assert inventory.get("vkd3d", str(component_dir), lambda: []) == ["vkd3d-2.12"]
+
+
+def test_missing_path_is_not_cached(inventory, tmp_path):
+    calls = []
+    missing = str(tmp_path / "missing")
+
+    inventory.get("nvapi", missing, lambda: calls.append(1))
+    inventory.get("nvapi", missing, lambda: calls.append(1))
+    assert len(calls) == 2
@@ -0,0 +1,67 @@
+"""JournalManager tests"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from bottles.backend.managers.journal import JournalManager, JournalSeverity
+from bottles.backend.utils import storage
+
+
+@pytest.fixture()
+def journal(tmp_path, monkeypatch):
+    JournalManager.flush()
+    monkeypatch.setattr(JournalManager, "path", str(tmp_path / "journal.sqlite"))
+    monkeypatch.setattr(JournalManager, "legacy_path", str(tmp_path / "journal.yml"))
+    yield tmp_path
+    JournalManager.flush()
+
+
+def _messages(events: dict) -> list:
+    return [e["message"] for e in events.values() if e["message"].startswith("test")]
+
+
+def test_write_is_queued_and_readable(journal):
+    for i in range(50):
+        JournalManager.write(JournalSeverity.WARNING, f"test {i}")
+    JournalManager.write("unknown", "test severity")
+
+    events = JournalManager.get(period="today")
+    messages = _messages(events)
+    assert len(messages) == 51
+    assert messages[0] == "test severity" and messages[-1] == "test 0"
+    severities = {e["severity"] for e in events.values()}
+    assert severities <= {JournalSeverity.WARNING, JournalSeverity.INFO}
+
+    event_id = next(iter(events))
+    assert JournalManager.get_event(event_id) == events[event_id]
+
+
+def test_periods_are_range_queries(journal):
+    JournalManager.write(JournalSeverity.INFO, "test now")
+    JournalManager.flush()
+
+    old = (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d %H:%M:%S")
+    with sqlite3.connect(JournalManager.path) as conn:
+        conn.execute(
+            "INSERT INTO events VALUES (?, ?, ?, ?)", ("old", "info", "test old", old)
+        )
+
+    assert _messages(JournalManager.get(period="today")) == ["test now"]
+    assert _messages(JournalManager.get(period="week")) == ["test now", "test old"]
+    assert JournalManager.first_event_date() == datetime.strptime(
+        old, "%Y-%m-%d %H:%M:%S"
+    )
+
+
+def test_legacy_journal_is_imported(journal):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    storage.write_yaml(
+        JournalManager.legacy_path,
+        {"abc": {"severity": "error", "message": "test legacy", "timestamp": now}},
+    )
+
+    assert JournalManager.get_event("abc")["message"] == "test legacy"
+    assert (journal / "journal.yml.old").exists()
+    assert not (journal / "journal.yml").exists()
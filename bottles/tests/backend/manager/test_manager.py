@@ -1,5 +1,8 @@
 """Core Manager tests"""
 
+import os
+import time
+
 from bottles.backend.managers.manager import Manager
 from bottles.backend.utils.gsettings_stub import GSettingsStub
 
@@ -15,3 +18,111 @@ def test_manager_is_singleton():
 
 def test_manager_default_gsettings_stub():
     assert Manager().settings.get_boolean("anything") is False
+
+
+def test_check_bottles_parallel_fixes_illegal_names(tmp_path, monkeypatch):
+    from bottles.backend.globals import Paths
+    from bottles.backend.managers.bottle_index import BottleIndexManager
+    from bottles.backend.models.config import BottleConfig
+
+    monkeypatch.setattr(Paths, "bottles", str(tmp_path / "bottles"))
+    monkeypatch.setattr(
+        BottleIndexManager, "index_path", str(tmp_path / "bottle_index.yml")
+    )
+    # taken:name can't be renamed, another bottle uses the sanitized name,
+    # and locked:name fails to move: both stay under their current name
+    names = [f"bottle-{i:02d}" for i in range(20)]
+    names += ["illegal:name", "taken:name", "takenname", "locked:name"]
+    for name in names:
+        path = tmp_path / "bottles" / name
+        path.mkdir(parents=True)
+        sane = name.replace(":", "")
+        config = BottleConfig(Name=name, Path=sane, Custom_Path=False)
+        config.dump(str(path / "bottle.yml"))
+
+    replace = os.replace
+
+    def locked_replace(src, dst):
+        if os.path.basename(src) == "locked:name":
+            raise PermissionError(13, "Permission denied")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", locked_replace)
+    manager = Manager(is_cli=True)
+    manager.bottle_index.load_index()
+    diff = manager.check_bottles(silent=True, workers=8)
+
+    listing = os.listdir(tmp_path / "bottles")
+    assert "illegal:name" not in listing and "illegalname" in listing
+    assert "taken:name" in listing
+    assert "taken:name" not in os.listdir(tmp_path / "bottles" / "takenname")
+    assert "locked:name" in listing and "lockedname" not in listing
+    assert sorted(diff.added) == sorted(names)
+    assert manager.local_bottles["illegal:name"].Path == "illegalname"
+    assert manager.local_bottles["taken:name"].Path == "taken:name"
+    assert manager.local_bottles["locked:name"].Path == "locked:name"
+
+
+def test_update_config_many_writes_once(tmp_path, monkeypatch):
+    from bottles.backend.globals import Paths
+    from bottles.backend.managers.manager import ConfigChange
+    from bottles.backend.models.config import BottleConfig
+
+    monkeypatch.setattr(Paths, "bottles", str(tmp_path))
+    (tmp_path / "test").mkdir()
+    config = BottleConfig(Name="test", Path="test")
+    manager = Manager(is_cli=True)
+
+    dumps = []
+    dump = BottleConfig.dump
+    monkeypatch.setattr(
+        BottleConfig, "dump", lambda self, f, **kw: dumps.append(1) or dump(self, f)
+    )
+    with manager.config_transaction(config) as transaction:
+        transaction.set("Windows", "win7")
+        transaction.set("dxvk", True, scope="Parameters")
+        transaction.set("FOO", "1", scope="Environment_Variables")
+
+    assert len(dumps) == 1
+    assert transaction.result.data["coalesced"] == 2
+    res = BottleConfig.load(str(tmp_path / "test" / "bottle.yml"))
+    assert res.data.Windows == "win7" and res.data.Parameters.dxvk
+    assert res.data.Environment_Variables == {"FOO": "1"}
+    assert [p.name for p in tmp_path.joinpath("test").iterdir()] == ["bottle.yml"]
+
+    manager.update_config(config, "Windows", "win8", debounce=True)
+    res = manager.update_config(config, "Windows", "win10", debounce=True)
+    assert res.data["coalesced"] == 1 and len(dumps) == 1
+    manager.flush_config_writes()
+    assert len(dumps) == 2
+    assert BottleConfig.load(str(tmp_path / "test" / "bottle.yml")).data.Windows == (
+        "win10"
+    )
+
+
+def test_checks_report_the_duration_of_each_step(monkeypatch):
+    manager = Manager(is_cli=True)
+
+    def step(*args):
+        time.sleep(0.2)
+        return True
+
+    for name in (
+        "check_app_dirs",
+        "check_dxvk",
+        "check_vkd3d",
+        "check_nvapi",
+        "check_latencyflex",
+        "check_runtimes",
+        "check_winebridge",
+        "check_runners",
+        "organize_dependencies",
+        "organize_installers",
+        "check_bottles",
+    ):
+        monkeypatch.setattr(manager, name, step)
+    res = manager.checks()
+
+    # concurrent or not, no step is charged for the ones before it
+    assert res.ok and len(res.data) == 9
+    assert all(0.2 <= duration < 0.35 for duration in res.data.values())
@@ -0,0 +1,106 @@
+"""ProgramIndexManager tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.managers import program_index
+from bottles.backend.managers.program_index import ProgramIndexManager
+from bottles.backend.utils.lnk import LnkData
+
+START_MENU = "drive_c/ProgramData/Microsoft/Windows/Start Menu/Programs"
+
+
+@pytest.fixture
+def bottle(tmp_path, monkeypatch):
+    parsed = []
+
+    def parse(path):
+        parsed.append(path)
+        with open(path) as f:
+            return LnkData(f.read())
+
+    monkeypatch.setattr(program_index.LnkUtils, "parse", parse)
+    bottle = tmp_path / "bottle"
+    (bottle / "drive_c/Games").mkdir(parents=True)
+    (bottle / "drive_c/Games/game.exe").write_text("")
+    home_desktop = tmp_path / "Desktop"
+    home_desktop.mkdir()
+    (bottle / "drive_c/users/user").mkdir(parents=True)
+    os.symlink(home_desktop, bottle / "drive_c/users/user/Desktop")
+    (home_desktop / "Game.lnk").write_text("C:\\Games\\game.exe")
+    (home_desktop / "sub").mkdir()
+    (home_desktop / "sub/Ignored.lnk").write_text("C:\\Games\\game.exe")
+    (bottle / START_MENU / "Vendor").mkdir(parents=True)
+    (bottle / START_MENU / "Vendor/Tool.lnk").write_text("C:\\Games\\tool.exe")
+    yield bottle, parsed
+    ProgramIndexManager(str(bottle)).forget()
+
+
+def test_scan_lists_the_shortcuts(bottle):
+    bottle, parsed = bottle
+    links = {
+        os.path.basename(link.path): link
+        for link in ProgramIndexManager(str(bottle)).scan()
+    }
+
+    assert sorted(links) == ["Game.lnk", "Tool.lnk"]
+    assert links["Game.lnk"].target == "C:\\Games\\game.exe"
+    assert links["Game.lnk"].exists and not links["Tool.lnk"].exists
+    assert len(parsed) == 2
+    assert os.path.exists(bottle / ProgramIndexManager.file_name)
+
+
+def test_rescan_parses_only_the_changes(bottle):
+    bottle, parsed = bottle
+    menu = bottle / START_MENU
+    for i in range(200):
+        (menu / f"App {i}.lnk").write_text(f"C:\\Games\\app{i}.exe")
+    index = ProgramIndexManager(str(bottle))
+    assert len(index.scan()) == 202
+    parsed.clear()
+
+    # a new process reads the index back from the bottle
+    index.forget()
+    index = ProgramIndexManager(str(bottle))
+    assert len(index.scan()) == 202 and index.parsed == 0
+
+    (menu / "Vendor/Tool.lnk").write_text("C:\\Games\\tool2.exe")
+    (menu / "App 0.lnk").unlink()
+    (menu / "Vendor/New.lnk").write_text("C:\\Games\\new.exe")
+    (bottle / "drive_c/Games/tool2.exe").write_text("")
+    links = {os.path.basename(link.path): link for link in index.scan()}
+
+    assert sorted(os.path.basename(p) for p in parsed) == ["New.lnk", "Tool.lnk"]
+    assert "App 0.lnk" not in links and links["Tool.lnk"].exists
+    assert links["New.lnk"].target == "C:\\Games\\new.exe"
+
+
+def test_deleted_bottle_is_forgotten(bottle, tmp_path, monkeypatch):
+    from bottles.backend.globals import Paths
+    from bottles.backend.managers.bottle_index import BottleIndexManager
+    from bottles.backend.managers.library import LibraryManager
+    from bottles.backend.managers.manager import Manager
+    from bottles.backend.models.config import BottleConfig
+    from bottles.backend.wine.wineboot import WineBoot
+    from bottles.backend.wine.wineserver import WineServer
+
+    bottle, _ = bottle
+    indexes = ProgramIndexManager._ProgramIndexManager__indexes
+    ProgramIndexManager(str(bottle)).scan()
+    assert str(bottle) in indexes
+
+    (tmp_path / "bottles").mkdir()
+    monkeypatch.setattr(Paths, "bottles", str(tmp_path / "bottles"))
+    monkeypatch.setattr(Paths, "applications", str(tmp_path / "applications"))
+    monkeypatch.setattr(
+        BottleIndexManager, "index_path", str(tmp_path / "bottle_index.yml")
+    )
+    monkeypatch.setattr(WineBoot, "kill", lambda self, force=False: None)
+    monkeypatch.setattr(WineServer, "wait", lambda self, timeout=None: True)
+    monkeypatch.setattr(LibraryManager, "load_library", lambda self, silent=False: None)
+    monkeypatch.setattr(LibraryManager, "get_library", lambda self: {})
+    config = BottleConfig(Name="bottle", Path=str(bottle), Custom_Path=True)
+
+    assert Manager(is_cli=True).delete_bottle(config)
+    assert not bottle.exists() and str(bottle) not in indexes
@@ -0,0 +1,137 @@
+"""
+A local HTTP server for the download tests and benchmarks, serving a
+single payload with optional Range support, throttling and dropped
+connections.
+"""
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class RangeServer:
+    """
+    Serve data on every path. With ranges=False the Range headers are
+    ignored, with length=False there is no Content-Length and the end of
+    the body is the end of the connection. drop_after closes the first
+    drops responses after that many bytes. rate limits each response to
+    that many bytes per second.
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        ranges: bool = True,
+        length: bool = True,
+        drop_after: Optional[int] = None,
+        drops: int = 1,
+        rate: Optional[int] = None,
+        etag: str = '"bottles-test"',
+    ):
+        self.data = data
+        self.ranges = ranges
+        self.length = length
+        self.drop_after = drop_after
+        self.drops = drops
+        self.rate = rate
+        self.etag = etag
+        # the Range header of each request, None if missing
+        self.requests: List[Optional[str]] = []
+        self.lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}/payload.tar.xz"
+
+    def __enter__(self) -> "RangeServer":
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def take_drop(self) -> bool:
+        with self.lock:
+            if self.drop_after is None or self.drops <= 0:
+                return False
+            self.drops -= 1
+            return True
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.do_GET(body=False)
+
+            def do_GET(self, body: bool = True):
+                header = self.headers.get("Range")
+                with server.lock:
+                    server.requests.append(header)
+
+                data = server.data
+                start, end = 0, len(data)
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", header or "")
+                if_range = self.headers.get("If-Range")
+                if (
+                    server.ranges
+                    and match
+                    and (if_range is None or if_range == server.etag)
+                ):
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = int(match.group(2)) + 1
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range", f"bytes {start}-{end - 1}/{len(data)}"
+                    )
+                else:
+                    self.send_response(200)
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", server.etag)
+                if server.length:
+                    self.send_header("Content-Length", str(end - start))
+                else:
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                self.end_headers()
+                if not body:
+                    return
+
+                limit = end - start
+                if server.take_drop():
+                    limit = min(limit, server.drop_after)
+                    self.close_connection = True
+                position = start
+                block = 64 * 1024
+                began = time.monotonic()
+                try:
+                    while position < start + limit:
+                        chunk = data[position : min(position + block, start + limit)]
+                        self.wfile.write(chunk)
+                        position += len(chunk)
+                        if server.rate:
+                            ahead = (position - start) / server.rate - (
+                                time.monotonic() - began
+                            )
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        return Handler
@@ -0,0 +1,109 @@
+"""Downloader tests, against a local HTTP server"""
+
+import hashlib
+import os
+from threading import Event
+
+import pytest
+
+from bottles.backend import downloader
+from bottles.backend.downloader import Downloader
+from bottles.backend.globals import Paths
+from bottles.backend.utils import hashing
+from bottles.backend.utils.file import FileUtils
+from bottles.tests.backend.range_server import RangeServer
+
+DATA = os.urandom(512 * 1024 + 123)
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "hash_cache", str(tmp_path / "hash_cache.sqlite"))
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(downloader, "SEGMENT_MIN_SIZE", 64 * 1024)
+    monkeypatch.setattr(Downloader, "backoff", 0)
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_segments_and_retries(tmp_path):
+    file = str(tmp_path / "runner.tar.xz")
+    with RangeServer(DATA, drop_after=100 * 1024, drops=2) as server:
+        assert Downloader(server.url, file, segments=4).download().ok
+
+    assert read(file) == DATA
+    assert not os.path.exists(f"{file}.part")
+    assert not os.path.exists(f"{file}.part.json")
+    # the first request serves the first segment, then 3 ranges and the
+    # 2 dropped responses resumed
+    size = -(-len(DATA) // 4)
+    assert server.requests[0] is None and len(server.requests) == 6
+    starts = {int(r[6:].split("-")[0]) for r in server.requests[1:]}
+    assert {size, 2 * size, 3 * size} < starts
+
+    file = str(tmp_path / "unknown-length")
+    updates = []
+    with RangeServer(DATA, length=False, ranges=False) as server:
+        res = Downloader(server.url, file, lambda *a, **k: updates.append(a)).download()
+    assert res.ok and read(file) == DATA and updates[-1] == (len(DATA), len(DATA))
+
+
+def test_cancelled_download_resumes(tmp_path):
+    file = str(tmp_path / "dxvk.tar.gz")
+    cancel_event = Event()
+
+    def update(received=0, total=0, status=None):
+        if received > 200 * 1024:
+            cancel_event.set()
+
+    with RangeServer(DATA) as server:
+        res = Downloader(server.url, file, update, cancel_event).download()
+        assert not res.ok and res.message == "cancelled"
+        assert os.path.exists(f"{file}.part.json") and not os.path.exists(file)
+
+        assert Downloader(server.url, file).download().ok
+    assert read(file) == DATA
+    resumed = server.requests[-1]
+    assert resumed.startswith("bytes=") and int(resumed[6:].split("-")[0]) > 200 * 1024
+
+    # a server without ranges sends it again from the start
+    os.remove(file)
+    with RangeServer(DATA, ranges=False, drop_after=300 * 1024) as server:
+        assert Downloader(server.url, file).download().ok
+    assert read(file) == DATA and len(server.requests) == 2
+
+
+def test_digest_while_downloading(tmp_path, monkeypatch):
+    md5 = hashlib.md5(DATA).hexdigest()
+    file = str(tmp_path / "vkd3d.tar.zst")
+    cancel_event = Event()
+
+    def update(received=0, total=0, status=None):
+        if received > 300 * 1024:
+            cancel_event.set()
+
+    with RangeServer(DATA, drop_after=150 * 1024) as server:
+        kwargs = {"segments": 4, "algorithm": "md5"}
+        assert (
+            not Downloader(server.url, file, update, cancel_event, **kwargs)
+            .download()
+            .ok
+        )
+        res = Downloader(server.url, file, **kwargs).download()
+    assert res.ok and res.data["checksum"] == md5 and read(file) == DATA
+
+    # the digest is stored, the file is not read to verify it
+    def fail(*args):
+        raise AssertionError("hashed again")
+
+    monkeypatch.setattr(hashing, "hash_file", fail)
+    assert FileUtils.get_checksum(file) == md5
+
+    # a restart from zero starts the digest again
+    file = str(tmp_path / "dxvk.tar.gz")
+    with RangeServer(DATA, ranges=False, drop_after=200 * 1024) as server:
+        res = Downloader(server.url, file, algorithm="md5").download()
+    assert res.ok and res.data["checksum"] == md5
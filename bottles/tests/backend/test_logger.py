@@ -0,0 +1,61 @@
+"""Logger tests"""
+
+import logging as std_logging
+
+import pytest
+
+from bottles.backend.logger import Logger
+
+
+class Counted:
+    calls = 0
+
+    def __str__(self):
+        Counted.calls += 1
+        return "counted"
+
+
+@pytest.fixture()
+def logger():
+    level = std_logging.root.level
+    yield Logger(name="bottles.tests.logger")
+    Logger.set_async(False)
+    Logger.set_level(std_logging.NOTSET, "bottles.tests.logger")
+    std_logging.root.setLevel(level)
+
+
+def test_filtered_messages_are_not_formatted(logger):
+    Logger.set_level("info")
+    Counted.calls = 0
+
+    logger.debug("value %s", Counted())
+    assert Counted.calls == 0
+
+    logger.info("value %s", Counted(), jn=False)
+    assert Logger.recent.lines(1)[0].endswith("(INFO) value counted")
+
+
+def test_subsystem_level(logger):
+    Logger.set_level("info")
+    Logger.set_level("debug", "bottles.tests")
+
+    logger.debug("subsystem debug")
+    assert Logger.recent.lines(1)[0].endswith("(DEBUG) subsystem debug")
+    assert logger.debug_mode
+
+
+def test_async_records_are_written_by_the_listener(logger, monkeypatch):
+    records = []
+
+    class Collect(std_logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handlers = Logger._Logger__handlers
+    monkeypatch.setattr(Logger, "_Logger__handlers", [*handlers, Collect()])
+    Logger.set_async()
+    for i in range(10):
+        logger.warning("async %s", i, jn=False)
+    Logger.flush()
+
+    assert records == [f"async {i}" for i in range(10)]
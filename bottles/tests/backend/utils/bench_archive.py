@@ -0,0 +1,87 @@
+"""
+Benchmark the TarExtractor against the former ComponentManager.extract
+(tarfile.open, getnames to find the root, then extractall).
+
+Run with: python -m bottles.tests.backend.utils.bench_archive [--small]
+It builds a runner-like tar.xz of 500 MB (2000 files, half compressible)
+with xz -T0 so it has several blocks, --small divides the size by 10.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from bottles.backend.utils import archive
+from bottles.backend.utils.archive import TarExtractor
+
+
+def legacy_extract(path: str, dest: str) -> str:
+    tar = tarfile.open(path)
+    root_dir = tar.getnames()[0]
+    tar.extractall(dest)
+    tar.close()
+    return root_dir
+
+
+def make_archive(directory: str, size: int) -> str:
+    root = os.path.join(directory, "proton-x86_64")
+    count = 2000
+    for i in range(count):
+        folder = os.path.join(root, "lib", f"{i % 40:02d}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{i:04d}.dll"), "wb") as f:
+            half = size // count // 2
+            f.write(os.urandom(half) + bytes(half))
+    path = os.path.join(directory, "proton.tar.xz")
+    subprocess.run(
+        f"tar -C {directory} -cf - proton-x86_64 | xz -T0 -1 > {path}",
+        shell=True,
+        check=True,
+    )
+    shutil.rmtree(root)
+    return path
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    size = 500 * 1024 * 1024
+    if "--small" in sys.argv:
+        size //= 10
+
+    with tempfile.TemporaryDirectory(prefix="bottles-bench-") as tmp:
+        path = make_archive(tmp, size)
+        results = [
+            ("former", timed(legacy_extract, path, os.path.join(tmp, "a"))),
+            (
+                "one pass",
+                timed(lambda: TarExtractor(os.path.join(tmp, "b")).extract(path)),
+            ),
+        ]
+        which = archive.shutil.which
+        archive.shutil.which = lambda name: None
+        try:
+            results.append(
+                (
+                    "one pass, lzma",
+                    timed(lambda: TarExtractor(os.path.join(tmp, "c")).extract(path)),
+                )
+            )
+        finally:
+            archive.shutil.which = which
+
+    sys.stdout.write(f"{size / 1024 / 1024:.0f} MiB tar.xz, {os.cpu_count()} CPUs\n")
+    for name, seconds in results:
+        sys.stdout.write(f"{name:<16}{seconds:>8.2f}s\n")
+
+
+if __name__ == "__main__":
+    main()
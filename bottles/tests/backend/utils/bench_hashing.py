@@ -0,0 +1,80 @@
+"""
+Benchmark the hashing engine against the former FileUtils.get_checksum
+(MD5, 4 KiB reads, one file at a time).
+
+Run with: python -m bottles.tests.backend.utils.bench_hashing [--small]
+It hashes 1 file of 2 GB and 50k files of 20 KB in a temporary folder,
+--small divides the sizes by 20. The hash cache is also temporary.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from bottles.backend.globals import Paths
+from bottles.backend.utils.file import FileUtils
+from bottles.backend.utils.hashing import hash_files
+
+
+def legacy_checksum(file):
+    checksum = hashlib.md5()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest().lower()
+
+
+def make_files(directory: str, count: int, size: int):
+    block = os.urandom(min(size, 1024 * 1024))
+    files = []
+    for i in range(count):
+        path = os.path.join(directory, f"{i:05d}.bin")
+        with open(path, "wb") as f:
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write(block[: size % len(block)])
+        files.append(path)
+    return files
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    scale = 20 if "--small" in sys.argv else 1
+    cases = [(1, 2 * 1024**3 // scale), (50_000 // scale, 20 * 1024)]
+    with tempfile.TemporaryDirectory(prefix="bottles-bench-") as tmp:
+        Paths.hash_cache = os.path.join(tmp, "hash_cache.sqlite")
+        sys.stdout.write(
+            f"{'case':<18}{'legacy md5':>12}{'md5 x1':>12}{'md5 pool':>12}"
+            f"{'sha256 pool':>13}{'blake2b pool':>14}{'cached':>10}\n"
+        )
+        for count, size in cases:
+            name = f"{count} x {FileUtils.get_human_size(size)}"
+            directory = os.path.join(tmp, f"{count}-{size}")
+            os.makedirs(directory)
+            files = make_files(directory, count, size)
+            timings = [
+                timed(lambda: [legacy_checksum(f) for f in files]),
+                timed(lambda: hash_files(files, workers=1, cache=False)),
+                timed(lambda: hash_files(files, cache=False)),
+                timed(lambda: hash_files(files, "sha256", cache=False)),
+                timed(lambda: hash_files(files, "blake2b", cache=False)),
+            ]
+            hash_files(files)
+            timings.append(timed(lambda: hash_files(files)))
+            widths = [12, 12, 12, 13, 14, 10]
+            sys.stdout.write(
+                f"{name:<18}"
+                + "".join(f"{t:>{w - 1}.2f}s" for t, w in zip(timings, widths))
+                + "\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Single pass tar extraction tests"""
+
+import io
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from bottles.backend.utils import archive
+from bottles.backend.utils.archive import TarExtractor, UnsafeMemberError
+
+
+def build_tar(path, members, mode="w:xz", **kwargs):
+    """members: (name, data) for files, (name, None) for folders,
+    (name, "->target") for symlinks."""
+    with tarfile.open(path, mode, **kwargs) as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type, info.mode = tarfile.DIRTYPE, 0o555
+                tar.addfile(info)
+            elif isinstance(data, str):
+                info.type, info.linkname = tarfile.SYMTYPE, data[2:]
+                tar.addfile(info)
+            else:
+                info.size, info.mode = len(data), 0o755
+                tar.addfile(info, io.BytesIO(data))
+
+
+RUNNER = [
+    ("./proton-x86_64", None),
+    ("./proton-x86_64/bin", None),
+    ("./proton-x86_64/bin/wine", b"\x7fELF" * 1000),
+    ("./proton-x86_64/bin/wine64", "->wine"),
+    ("./proton-x86_64/share/fonts.dat", os.urandom(64 * 1024)),
+    ("./proton-x86_64/dosdevices/z:", "->/"),
+]
+
+
+@pytest.mark.parametrize("tools", [True, False], ids=["cli", "tarfile"])
+def test_extracts_in_one_pass(tmp_path, monkeypatch, tools):
+    if not tools:
+        monkeypatch.setattr(archive.shutil, "which", lambda name: None)
+    elif not shutil.which("xz"):
+        pytest.skip("xz is not installed")
+    path = str(tmp_path / "proton.tar.xz")
+    build_tar(path, RUNNER)
+
+    dest = tmp_path / "runners"
+    assert TarExtractor(str(dest)).extract(path) == "proton-x86_64"
+    wine = dest / "proton-x86_64" / "bin" / "wine"
+    assert wine.read_bytes() == RUNNER[2][1] and os.access(wine, os.X_OK)
+    assert os.readlink(dest / "proton-x86_64" / "bin" / "wine64") == "wine"
+    assert os.readlink(dest / "proton-x86_64" / "dosdevices" / "z:") == "/"
+    # the folder attributes are set once their files are written
+    assert (dest / "proton-x86_64" / "bin").stat().st_mode & 0o777 == 0o555
+
+    # any readable stream, e.g. an HTTP response, is extracted as well
+    (dest / "proton-x86_64" / "bin").chmod(0o755)
+    shutil.rmtree(dest)
+    with open(path, "rb") as f:
+        assert TarExtractor(str(dest)).extract(f) == "proton-x86_64"
+    assert wine.read_bytes() == RUNNER[2][1]
+
+
+@pytest.mark.parametrize(
+    "members",
+    [
+        [("dxvk/../../evil", b"x")],
+        [("/tmp/evil", b"x")],
+        # a symlink is extracted, nothing is written through it
+        [("dxvk/z:", "->/"), ("dxvk/z:/bottles-evil/evil", b"x")],
+        [("dxvk/link", "->../.."), ("dxvk/link/evil", b"x")],
+        # each link stays in dest, the chain doesn't
+        [("dxvk/b", "->.."), ("dxvk/c", "->b/.."), ("dxvk/c/ESCAPED", b"x")],
+    ],
+)
+def test_rejects_unsafe_members(tmp_path, members):
+    path = str(tmp_path / "dxvk.tar.gz")
+    build_tar(path, [("dxvk", None)] + members, mode="w:gz")
+    extractor = TarExtractor(str(tmp_path / "dest"))
+    with pytest.raises(UnsafeMemberError):
+        extractor.extract(path)
+    assert extractor.root == "dxvk"
+    assert sorted(os.listdir(tmp_path)) == ["dest", "dxvk.tar.gz"]
+
+
+def test_corrupted_archive_fails(tmp_path):
+    path = tmp_path / "vkd3d.tar.xz"
+    build_tar(str(path), RUNNER)
+    path.write_bytes(path.read_bytes()[:-200])
+    with pytest.raises(tarfile.TarError):
+        TarExtractor(str(tmp_path / "dest")).extract(str(path))
@@ -0,0 +1,33 @@
+"""Debouncer tests"""
+
+import time
+
+from bottles.backend.utils.debounce import Debouncer
+
+
+def test_burst_runs_once():
+    calls = []
+    debouncer = Debouncer(delay=0.05)
+
+    for i in range(5):
+        debouncer.schedule("key", lambda i=i: calls.append(i))
+    deadline = time.monotonic() + 2
+    while debouncer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert calls == [4]
+    assert debouncer.coalesced == 4
+
+
+def test_flush_and_cancel():
+    calls = []
+    debouncer = Debouncer(delay=60)
+
+    debouncer.schedule("a", lambda: calls.append("a"))
+    debouncer.schedule("b", lambda: calls.append("b"))
+    assert debouncer.cancel("b")
+    debouncer.flush()
+
+    assert calls == ["a"]
+    assert not debouncer.pending()
+    assert not debouncer.cancel("a")
@@ -0,0 +1,27 @@
+"""FileUtils tests"""
+
+import os
+
+from bottles.backend.utils.file import FileUtils
+
+
+def test_path_usage_lists_only_the_changed_folders(tmp_path, monkeypatch):
+    (tmp_path / "a/b").mkdir(parents=True)
+    (tmp_path / "a/one").write_bytes(b"1")
+    (tmp_path / "a/b/two").write_bytes(b"22")
+    (tmp_path / ".fvs2").mkdir()
+    (tmp_path / ".fvs2/index").write_bytes(b"333")
+    os.symlink("/", tmp_path / "a/root")
+
+    cache: dict = {}
+    assert FileUtils.get_path_usage(str(tmp_path), cache, (".fvs2",)) == (2, 3)
+
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda p: listed.append(p) or scandir(p))
+    assert FileUtils.get_path_usage(str(tmp_path), cache, (".fvs2",)) == (2, 3)
+    assert listed == []
+
+    (tmp_path / "a/b/three").write_bytes(b"4444")
+    assert FileUtils.get_path_usage(str(tmp_path), cache, (".fvs2",)) == (3, 7)
+    assert listed == [str(tmp_path / "a/b")]
@@ -0,0 +1,101 @@
+"""Hardware profile tests"""
+
+import pytest
+
+from bottles.backend.globals import Paths
+from bottles.backend.models.result import Result
+from bottles.backend.utils import hardware
+from bottles.backend.utils.gpu import GPUUtils, GPUVendors
+from bottles.backend.utils.hardware import HardwareProfile
+
+
+def add_device(sysfs, slot, vendor, pci_class):
+    path = sysfs / "bus/pci/devices" / slot
+    path.mkdir(parents=True)
+    (path / "vendor").write_text(f"0x{vendor:04x}\n")
+    (path / "class").write_text(f"0x{pci_class:06x}\n")
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = tmp_path / "sys"
+    add_device(root, "0000:00:00.0", 0x8086, 0x060000)  # host bridge
+    add_device(root, "0000:00:02.0", 0x8086, 0x038000)
+    add_device(root, "0000:01:00.0", 0x10DE, 0x030000)
+    (root / "module/nouveau").mkdir(parents=True)
+    return root
+
+
+@pytest.fixture
+def profile_path(tmp_path, monkeypatch):
+    boot_id = tmp_path / "boot_id"
+    boot_id.write_text("boot-1\n")
+    monkeypatch.setattr(hardware, "BOOT_ID", str(boot_id))
+    monkeypatch.setattr(Paths, "hardware_profile", str(tmp_path / "hardware.json"))
+    HardwareProfile.invalidate()
+    yield boot_id
+    HardwareProfile.invalidate()
+
+
+def test_probe_reads_sysfs(sysfs, profile_path, monkeypatch):
+    profile = HardwareProfile.probe(str(sysfs))
+
+    assert profile.gpu_vendors == ["nvidia", "intel"]
+    assert profile.has_nvidia_vga and profile.nouveau
+    assert profile.nvngx_path is None
+
+    monkeypatch.setattr(HardwareProfile, "probe", classmethod(lambda cls: profile))
+    gpu = GPUUtils().get_gpu()
+    assert gpu["prime"]["discrete"]["envs"] == {"DRI_PRIME": "1"}
+    assert gpu["prime"]["integrated"]["vendor"] == "intel"
+    assert GPUUtils.is_gpu(GPUVendors.NVIDIA)
+    assert not GPUUtils.is_gpu(GPUVendors.AMD)
+
+
+def test_profile_is_stored_per_boot(sysfs, profile_path, monkeypatch):
+    probes = []
+
+    def probe(cls):
+        probes.append(1)
+        return HardwareProfile(devices=[(0x1002, 0x0300)])
+
+    monkeypatch.setattr(HardwareProfile, "probe", classmethod(probe))
+    assert HardwareProfile.get().gpu_vendors == ["amd"]
+    assert HardwareProfile.get() is HardwareProfile.get()
+    assert len(probes) == 1
+
+    # a new process reads it back from the disk
+    monkeypatch.setattr(HardwareProfile, "_HardwareProfile__profile", None)
+    assert HardwareProfile.get().devices == [(0x1002, 0x0300)]
+    assert len(probes) == 1
+
+    profile_path.write_text("boot-2\n")
+    assert HardwareProfile.get().boot_id == "boot-2"
+    assert len(probes) == 2
+
+
+def test_component_install_probes_again(profile_path, monkeypatch):
+    from bottles.backend.managers.manager import Manager
+
+    probes = []
+
+    def probe(cls):
+        probes.append(1)
+        return HardwareProfile()
+
+    monkeypatch.setattr(HardwareProfile, "probe", classmethod(probe))
+    HardwareProfile.get()
+
+    component_manager = Manager(is_cli=True).component_manager
+    file = {"url": "", "file_name": "nvapi.tar.gz", "rename": "", "file_checksum": ""}
+    monkeypatch.setattr(
+        component_manager, "get_component", lambda name: {"File": [file]}
+    )
+    monkeypatch.setattr(component_manager, "download", lambda **kwargs: Result(True))
+    monkeypatch.setattr(component_manager, "extract", lambda *args: True)
+    monkeypatch.setattr(Manager, "check_nvapi", lambda self: True)
+    monkeypatch.setattr(Manager, "organize_components", lambda self: None)
+    assert component_manager.install("nvapi", "dxvk-nvapi-v0.7").ok
+
+    HardwareProfile.get()
+    assert len(probes) == 2
@@ -0,0 +1,55 @@
+"""Hashing engine tests"""
+
+import hashlib
+
+import pytest
+
+from bottles.backend.globals import Paths
+from bottles.backend.utils import hashing
+from bottles.backend.utils.file import FileUtils
+
+
+@pytest.fixture(autouse=True)
+def hash_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "hash_cache", str(tmp_path / "hash_cache.sqlite"))
+
+
+def test_digests_match_hashlib(tmp_path):
+    data = bytes(range(256)) * (hashing.BUFFER_SIZE // 256 * 3 + 7)
+    path = tmp_path / "runner.tar.xz"
+    path.write_bytes(data)
+
+    for algorithm in hashing.ALGORITHMS:
+        expected = hashlib.new(algorithm, data).hexdigest()
+        assert FileUtils.get_checksum(str(path), algorithm) == expected
+    assert FileUtils.get_checksum(str(tmp_path / "missing")) is None
+    with pytest.raises(ValueError):
+        FileUtils.get_checksum(str(path), "crc32")
+
+
+def test_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    files = []
+    for i in range(50):
+        path = tmp_path / f"{i}.dll"
+        path.write_bytes(str(i).encode() * 100)
+        files.append(str(path))
+    expected = FileUtils.get_checksums(files, "sha256", workers=4, cache=False)
+
+    hashed = []
+    hash_file = hashing.hash_file
+    monkeypatch.setattr(
+        hashing, "hash_file", lambda p, a: hashed.append(p) or hash_file(p, a)
+    )
+    assert FileUtils.get_checksums(files, "sha256", workers=4) == expected
+    assert len(hashed) == 50
+    hashed.clear()
+
+    assert FileUtils.get_checksums(files, "sha256", workers=4) == expected
+    assert hashed == []
+
+    (tmp_path / "7.dll").write_bytes(b"changed")
+    digests = FileUtils.get_checksums(files, "sha256", workers=4)
+    assert hashed == [str(tmp_path / "7.dll")]
+    assert digests[hashed[0]] == hashlib.sha256(b"changed").hexdigest()
+    # each algorithm has its own entries
+    assert FileUtils.get_checksum(files[0]) == hashlib.md5(b"0" * 100).hexdigest()
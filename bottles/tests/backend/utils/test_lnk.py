@@ -0,0 +1,97 @@
+"""LnkUtils tests"""
+
+import os
+import struct
+
+import pytest
+
+from bottles.backend.utils import lnk
+from bottles.backend.utils.lnk import LnkUtils
+
+
+def build_lnk(target: str, arguments="", working_dir="", icon="", icon_index=0):
+    flags = lnk.HAS_LINK_TARGET_ID_LIST | lnk.HAS_LINK_INFO | lnk.IS_UNICODE
+    strings = b""
+    for flag, value in (
+        (lnk.HAS_WORKING_DIR, working_dir),
+        (lnk.HAS_ARGUMENTS, arguments),
+        (lnk.HAS_ICON_LOCATION, icon),
+    ):
+        if value:
+            flags |= flag
+            strings += struct.pack("<H", len(value)) + value.encode("utf-16-le")
+
+    header = bytearray(lnk.HEADER_SIZE)
+    struct.pack_into("<I", header, 0, lnk.HEADER_SIZE)
+    struct.pack_into("<I", header, 0x14, flags)
+    struct.pack_into("<i", header, 0x38, icon_index)
+    id_list = struct.pack("<H", 4) + b"\0" * 4
+
+    # an ANSI LinkInfo, the base path holds the whole target
+    base = target.encode("cp1252") + b"\0"
+    info = struct.pack(
+        "<IIIIIII", 0x1C + len(base) + 1, 0x1C, 1, 0x1C, 0x1C, 0, 0x1C + len(base)
+    )
+    info += base + b"\0"
+    return bytes(header) + id_list + info + strings
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    LnkUtils.cache_clear()
+    yield
+    LnkUtils.cache_clear()
+
+
+def test_parse_reads_target_arguments_and_icon(tmp_path):
+    path = tmp_path / "Game.lnk"
+    path.write_bytes(
+        build_lnk(
+            "C:\\Games\\Game\\game.exe",
+            arguments="-windowed --skip-intro",
+            working_dir="C:\\Games\\Game",
+            icon="C:\\Games\\Game\\icon.dll",
+            icon_index=2,
+        )
+    )
+
+    data = LnkUtils.parse(path)
+    assert data.target == "C:\\Games\\Game\\game.exe"
+    assert data.arguments == "-windowed --skip-intro"
+    assert data.working_dir == "C:\\Games\\Game"
+    assert data.icon_location == "C:\\Games\\Game\\icon.dll"
+    assert data.icon_index == 2
+    assert LnkUtils.get_data(path) == "C:\\Games\\Game\\game.exe"
+
+    (tmp_path / "broken.lnk").write_bytes(b"not a shortcut")
+    (tmp_path / "truncated.lnk").write_bytes(build_lnk("C:\\a.exe")[:0x50])
+    assert LnkUtils.parse(tmp_path / "broken.lnk") is None
+    assert LnkUtils.parse(tmp_path / "truncated.lnk") is None
+
+
+def test_cache_follows_changes_and_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(LnkUtils, "cache_size", 4)
+    reads = []
+    pread = os.pread
+    monkeypatch.setattr(
+        lnk.os, "pread", lambda *args: reads.append(args) or pread(*args)
+    )
+    path = tmp_path / "App.lnk"
+    path.write_bytes(build_lnk("C:\\app.exe"))
+
+    assert LnkUtils.get_data(path) == "C:\\app.exe"
+    count = len(reads)
+    assert LnkUtils.get_data(path) == "C:\\app.exe"
+    assert len(reads) == count
+
+    path.write_bytes(build_lnk("C:\\Program Files\\app2.exe"))
+    os.utime(path, ns=(1, 1))
+    assert LnkUtils.get_data(path) == "C:\\Program Files\\app2.exe"
+
+    for i in range(8):
+        other = tmp_path / f"{i}.lnk"
+        other.write_bytes(build_lnk(f"C:\\{i}.exe"))
+        assert LnkUtils.get_data(other) == f"C:\\{i}.exe"
+    count = len(reads)
+    assert LnkUtils.get_data(path) == "C:\\Program Files\\app2.exe"
+    assert len(reads) > count
@@ -0,0 +1,60 @@
+"""ManagerUtils tests"""
+
+import pytest
+
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.utils import manager
+from bottles.backend.utils.manager import ManagerUtils
+
+DEFAULT_ICON = "com.usebottles.bottles-program"
+
+
+@pytest.fixture
+def config(tmp_path):
+    return BottleConfig(Name="Test", Path=str(tmp_path), Custom_Path=True)
+
+
+@pytest.mark.parametrize("index, exported", [(12, (12, None)), (-101, (0, 101))])
+def test_extract_icon_exports_the_indexed_icon(config, monkeypatch, index, exported):
+    calls = []
+
+    class IconExtractor:
+        def __init__(self, path):
+            pass
+
+        def export_icon(self, filename, num=0, resource_id=None):
+            calls.append((num, resource_id))
+            with open(filename, "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n")
+
+    monkeypatch.setattr(manager.icoextract, "IconExtractor", IconExtractor)
+    icon = ManagerUtils.extract_icon(config, "Tool", "/lib/shell32.dll", index)
+
+    assert calls == [exported]
+    assert icon.endswith("/icons/Tool.png")
+
+
+def test_program_icon_falls_back_to_the_executable(config, monkeypatch):
+    extracted = []
+
+    def extract_icon(config, name, path, index=0):
+        extracted.append((path, index))
+        return DEFAULT_ICON if path.endswith("broken.dll") else f"{path}.png"
+
+    monkeypatch.setattr(ManagerUtils, "extract_icon", extract_icon)
+    program = {"name": "Game", "path": "C:\\Games\\game.exe"}
+
+    icon = ManagerUtils.get_program_icon(
+        config, {**program, "icon_location": "C:\\shell32.dll", "icon_index": 12}
+    )
+    assert icon == "C:\\shell32.dll.png"
+    assert extracted == [("C:\\shell32.dll", 12)]
+
+    # not resolvable, or failing: the icon of the executable
+    for location in ("%SystemRoot%\\system32\\shell32.dll", "C:\\broken.dll"):
+        extracted.clear()
+        icon = ManagerUtils.get_program_icon(
+            config, {**program, "icon_location": location}
+        )
+        assert icon == "C:\\Games\\game.exe.png"
+        assert extracted[-1] == ("C:\\Games\\game.exe", 0)
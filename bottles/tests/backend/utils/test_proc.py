@@ -0,0 +1,71 @@
+"""ProcSnapshot tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.utils.proc import Proc, ProcSnapshot
+
+
+def add_process(root, pid, name, state="S", prefix=None, start=1):
+    path = root / str(pid)
+    path.mkdir()
+    fields = [state, "1"] + ["0"] * 40
+    fields[19] = str(start)
+    (path / "stat").write_text(f"{pid} ({name}) {' '.join(fields)}")
+    (path / "cmdline").write_bytes(f"/usr/bin/{name}\0".encode())
+    env = f"HOME=/home/user\0WINEPREFIX={prefix}/\0" if prefix else "HOME=/\0"
+    (path / "environ").write_bytes(env.encode())
+
+
+@pytest.fixture
+def root(tmp_path):
+    add_process(tmp_path, 10, "wineserver", prefix="/bottles/A")
+    add_process(tmp_path, 11, "game.exe", state="R", prefix="/bottles/A")
+    add_process(tmp_path, 12, "zombie.exe", state="Z", prefix="/bottles/A")
+    add_process(tmp_path, 13, "game.exe", prefix="/bottles/AB")
+    add_process(tmp_path, 14, "bash")
+    return tmp_path
+
+
+def test_snapshot_filters(root):
+    snapshot = ProcSnapshot(str(root))
+
+    assert len(snapshot) == 5
+    assert [p.pid for p in snapshot.filter(prefix="/bottles/A", name="game.exe")] == [
+        "11"
+    ]
+    running = snapshot.filter(prefix="/bottles/A/", exclude_states="Z")
+    assert sorted(p.pid for p in running) == ["10", "11"]
+    assert sorted(snapshot.by_prefix()) == ["/bottles/A", "/bottles/AB"]
+    assert snapshot.get(11).get_stat_field(1) == 1
+
+    # the files are read once per snapshot
+    (root / "11" / "stat").unlink()
+    assert snapshot.get(11).get_state() == "R"
+
+
+def test_snapshot_delta(root):
+    snapshot = ProcSnapshot(str(root))
+    snapshot.get(13).get_stat()
+
+    for name in ("stat", "cmdline", "environ"):
+        (root / "12" / name).unlink()
+    (root / "12").rmdir()
+    add_process(root, 15, "new.exe")
+    (root / "13" / "stat").write_text("13 (other.exe) S 1" + " 0" * 17 + " 99")
+
+    delta = snapshot.refresh()
+    assert sorted(p.pid for p in delta.started) == ["13", "15"]
+    assert sorted(p.pid for p in delta.exited) == ["12", "13"]
+    assert 12 not in snapshot and 15 in snapshot
+
+
+def test_proc_reads_the_cwd_link():
+    assert Proc(os.getpid()).get_cwd() == os.getcwd()
+    assert Proc(2**22 + 1).get_cwd() == ""
+
+
+def test_proc_kill_ignores_a_name():
+    # not a pid, nothing to signal
+    Proc("game.exe").kill()
@@ -0,0 +1,66 @@
+"""storage tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.utils import storage, yaml
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    storage.clear_cache()
+
+
+def test_write_yaml_is_atomic_and_checksummed(tmp_path):
+    path = str(tmp_path / "data.yml")
+    with open(path, "w") as f:
+        f.write("old: true\n")
+    os.chmod(path, 0o600)
+
+    storage.write_yaml(path, {"key": "value"})
+
+    assert os.listdir(tmp_path) == ["data.yml"]
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    stored = storage.read(path)
+    assert stored.verified
+    assert storage.load_yaml(path) == {"key": "value"}
+
+
+def test_unchanged_file_is_not_parsed_again(tmp_path):
+    path = str(tmp_path / "data.yml")
+    storage.write_yaml(path, {"items": [1, 2]})
+    calls = []
+
+    def parse(text):
+        calls.append(1)
+        return yaml.load(text)
+
+    first = storage.load_cached(path, parse)
+    first["items"].append(3)
+    second = storage.load_cached(path, parse)
+
+    assert len(calls) == 1
+    assert second == {"items": [1, 2]}
+
+    # hand edited files keep working, but are always parsed
+    with open(path, "a") as f:
+        f.write("other: 1\n")
+    assert not storage.read(path).verified
+    assert storage.load_cached(path, parse) == {"items": [1, 2], "other": 1}
+    assert len(calls) == 2
+
+
+def test_bottle_config_load_skips_validation(tmp_path, monkeypatch):
+    path = str(tmp_path / "bottle.yml")
+    BottleConfig(Name="test", Windows="win7").dump(path)
+    assert BottleConfig.load(path).data.Windows == "win7"
+
+    def fail(data):
+        raise AssertionError("config validated again")
+
+    monkeypatch.setattr(BottleConfig, "_fill_with", fail)
+    first = BottleConfig.load(path).data
+    second = BottleConfig.load(path).data
+    assert first == second and first is not second
@@ -0,0 +1,83 @@
+"""TaskGraph tests"""
+
+import threading
+import time
+
+import pytest
+
+from bottles.backend.utils.taskgraph import TaskGraph
+
+
+def test_dependencies_run_before_dependents():
+    order = []
+    lock = threading.Lock()
+
+    def step(name):
+        def inner():
+            with lock:
+                order.append(name)
+            return name
+
+        return inner
+
+    graph = TaskGraph()
+    graph.add("dirs", step("dirs"))
+    graph.add("runners", step("runners"), ["dirs"])
+    graph.add("dxvk", step("dxvk"), ["dirs"])
+    graph.add("bottles", step("bottles"), ["runners"])
+
+    results = graph.run()
+
+    assert results == {n: n for n in ("dirs", "runners", "dxvk", "bottles")}
+    assert order[0] == "dirs"
+    assert order.index("runners") < order.index("bottles")
+
+
+def test_independent_tasks_run_concurrently():
+    graph = TaskGraph(max_workers=4)
+    for i in range(4):
+        graph.add(f"sleep{i}", lambda: time.sleep(0.2))
+
+    start = time.time()
+    graph.run()
+
+    assert time.time() - start < 0.6
+
+
+def test_callbacks_run_in_caller_thread():
+    caller = threading.current_thread()
+    seen = []
+
+    graph = TaskGraph()
+    graph.add("a", lambda: True)
+    graph.add("b", lambda: False, ["a"])
+    graph.run(
+        on_start=lambda name: seen.append(threading.current_thread() is caller),
+        on_done=lambda name, result: seen.append(threading.current_thread() is caller),
+    )
+
+    assert seen == [True] * 4
+
+
+def test_cycle_is_rejected():
+    graph = TaskGraph()
+    graph.add("a", lambda: None, ["b"])
+    graph.add("b", lambda: None, ["a"])
+
+    with pytest.raises(ValueError):
+        graph.run()
+
+
+def test_failure_stops_dependents():
+    ran = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    graph = TaskGraph()
+    graph.add("a", boom)
+    graph.add("b", lambda: ran.append("b"), ["a"])
+
+    with pytest.raises(RuntimeError):
+        graph.run()
+    assert ran == []
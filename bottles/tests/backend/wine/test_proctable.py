@@ -0,0 +1,62 @@
+"""Wine process table tests"""
+
+import pytest
+
+from bottles.backend.wine.proctable import ProcessTable, image_from_cmdline
+
+PREFIX = "/home/user/.local/share/bottles/bottles/Test"
+
+
+def add_process(proc, pid, ppid, argv, prefix=PREFIX, threads=1, ticks=0):
+    path = proc / str(pid)
+    path.mkdir()
+    fields = ["S", str(ppid)] + ["0"] * 40
+    fields[11] = str(ticks)
+    fields[17] = str(threads)
+    fields[19] = str(pid * 10)
+    fields[21] = "256"
+    (path / "stat").write_text(f"{pid} (name with ) paren) {' '.join(fields)}")
+    (path / "cmdline").write_bytes("\0".join(argv).encode() + b"\0")
+    (path / "environ").write_bytes(f"HOME=/home/user\0WINEPREFIX={prefix}/\0".encode())
+
+
+@pytest.fixture
+def proc(tmp_path):
+    add_process(tmp_path, 10, 1, ["/usr/bin/wineserver"])
+    add_process(tmp_path, 11, 1, ["C:\\windows\\system32\\services.exe"])
+    add_process(tmp_path, 12, 11, ["C:\\windows\\system32\\winedevice.exe"], threads=4)
+    add_process(
+        tmp_path, 13, 1, ["/usr/bin/wine64-preloader", "/usr/bin/wine64", "game.exe"]
+    )
+    add_process(tmp_path, 14, 1, ["C:\\other.exe"], prefix="/tmp/Other")
+    add_process(tmp_path, 15, 1, ["/bin/bash", "run.sh"])
+    (tmp_path / "self").mkdir()
+    return tmp_path
+
+
+def test_scan_filters_the_prefix(proc):
+    table = ProcessTable(PREFIX, proc=str(proc))
+    processes = table.scan()
+
+    assert sorted(processes) == [11, 12, 13]
+    assert processes[12].name == "winedevice.exe"
+    assert processes[12].parent == 11 and processes[12].threads == 4
+    assert processes[11].parent is None
+    assert processes[13].image == "game.exe"
+    assert processes[12].to_dict()["pid"] == "12"
+    assert [p.pid for p in table.find("C:\\windows\\system32\\SERVICES")] == [11]
+    assert image_from_cmdline(["/usr/bin/wineserver", "-p"]) is None
+
+
+def test_subscription_yields_diffs(proc, monkeypatch):
+    table = ProcessTable(PREFIX, proc=str(proc))
+    monkeypatch.setattr(table, "interval", 0.05)
+
+    with table.subscribe() as subscription:
+        first = subscription.get(timeout=5)
+        assert sorted(p.pid for p in first.added) == [11, 12, 13]
+
+        (proc / "13" / "stat").unlink()
+        diff = subscription.get(timeout=5)
+        assert [p.pid for p in diff.removed] == [13]
+        assert not diff.added
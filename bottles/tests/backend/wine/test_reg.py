@@ -0,0 +1,89 @@
+"""Registry transaction tests"""
+
+import pytest
+
+from bottles.backend.globals import Paths
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.models.result import Result
+from bottles.backend.wine.reg import Reg
+from bottles.backend.wine.regfile import REG_DWORD, REG_SZ, OfflineRegistry, parse_reg
+from bottles.backend.wine.regkeys import RegKeys
+from bottles.backend.wine.winedbg import WineDbg
+from bottles.backend.wine.wineserver import WineServer
+
+HEADER = (
+    "WINE REGISTRY Version 2\n;; All keys relative to \\\\User\\\\S-1-5-21-0-0-0-1000\n"
+)
+
+
+@pytest.fixture
+def config(tmp_path):
+    for name in ("system.reg", "user.reg", "userdef.reg"):
+        (tmp_path / name).write_text(HEADER)
+    return BottleConfig(Name="Test", Path=str(tmp_path), Custom_Path=True)
+
+
+def test_transaction_rewrites_the_files_once(config, monkeypatch):
+    launches = []
+    monkeypatch.setattr(Reg, "launch", lambda *args, **kwargs: launches.append(args))
+
+    rk = RegKeys(config)
+    with rk.transaction() as transaction:
+        rk.set_dpi(120)
+        rk.set_renderer("vulkan")
+        rk.toggle_virtual_desktop(True, "1024x768")
+        transaction.remove("HKEY_CURRENT_USER\\Software\\Wine\\Drivers", "Audio")
+
+    assert launches == []
+    assert isinstance(rk.reg, Reg)
+    registry = OfflineRegistry(config.Path)
+    assert registry.get("HKCU\\Control Panel\\Desktop", "LogPixels") == (
+        REG_DWORD,
+        120,
+    )
+    assert registry.get("HKCU\\Software\\Wine\\Direct3D", "renderer") == (
+        REG_SZ,
+        "vulkan",
+    )
+    assert registry.get("HKCU\\Software\\Wine\\Explorer\\Desktops", "Default") == (
+        REG_SZ,
+        "1024x768",
+    )
+
+
+def test_transaction_uses_a_single_import_when_running(config, monkeypatch, tmp_path):
+    imported = []
+
+    def launch(self, args=None, **kwargs):
+        with open(args[1], "rb") as f:
+            imported.append(f.read().decode("utf-16"))
+        return Result(True)
+
+    monkeypatch.setattr(Paths, "temp", str(tmp_path))
+    monkeypatch.setattr(Reg, "launch", launch)
+    monkeypatch.setattr(WineServer, "is_alive", lambda self: True)
+    monkeypatch.setattr(WineDbg, "wait_for_process", lambda self, name: True)
+    updates = []
+
+    rk = RegKeys(config)
+    monkeypatch.setattr(rk.wineboot, "update", lambda: updates.append(1))
+    with rk.transaction() as transaction:
+        rk.set_dpi(96)
+        rk.toggle_virtual_desktop(False)
+        rk.apply_font_smoothing("gray")
+        transaction.import_reg(
+            '[HKEY_CURRENT_USER\\Software\\Test]\n"Path"="C:\\\\x"\n'
+        )
+
+    assert len(imported) == 1
+    assert updates == [1]
+    changes = {(c.key, c.value): c for c in parse_reg(imported[0])}
+    assert (
+        changes[("HKEY_CURRENT_USER\\Control Panel\\Desktop", "LogPixels")].data == 96
+    )
+    assert changes[("HKEY_CURRENT_USER\\Software\\Wine\\Explorer", "Desktop")].remove
+    assert changes[("HKEY_CURRENT_USER\\Software\\Test", "Path")].data == "C:\\x"
+    smoothing = changes[
+        ("HKEY_CURRENT_USER\\Control Panel\\Desktop", "FontSmoothingGamma")
+    ]
+    assert smoothing.value_type == REG_DWORD and smoothing.data == 0x578
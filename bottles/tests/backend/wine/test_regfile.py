@@ -0,0 +1,179 @@
+"""Offline registry tests"""
+
+import pytest
+
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.models.result import Result
+from bottles.backend.wine.reg import Reg
+from bottles.backend.wine.regfile import (
+    REG_BINARY,
+    REG_DWORD,
+    REG_EXPAND_SZ,
+    REG_MULTI_SZ,
+    REG_SZ,
+    OfflineRegistry,
+    RegistryFile,
+)
+from bottles.backend.wine.winedbg import WineDbg
+from bottles.backend.wine.wineserver import WineServer
+
+SYSTEM_REG = (
+    "WINE REGISTRY Version 2\n"
+    ";; All keys relative to \\\\Machine\n"
+    "\n"
+    "#arch=win64\n"
+    "\n"
+    "[Software\\\\Microsoft\\\\Windows NT\\\\CurrentVersion] 1700000000\n"
+    "#time=1da0b1c2d3e4f50\n"
+    '"CurrentBuild"="19045"\n'
+    '"ProductName"="Microsoft Windows 10"\n'
+    '"SystemRoot"="C:\\\\windows"\n'
+    "\n"
+    "[System\\\\ControlSet001\\\\Control\\\\Windows] 1700000001\n"
+    "#time=1da0b1c2d3e4f51\n"
+    '"CSDVersion"=dword:00000000\n'
+    "\n"
+    "[System\\\\CurrentControlSet] 1700000002\n"
+    "#time=1da0b1c2d3e4f52\n"
+    "#link\n"
+    '"SymbolicLinkValue"=hex(6):5c,00,52,00,65,00,67,00,69,00,73,00,74,00,72,00,79,\\\n'
+    "  00,5c,00,4d,00,61,00,63,00,68,00,69,00,6e,00,65,00,5c,00,53,00,79,00,73,00,\\\n"
+    "  74,00,65,00,6d,00,5c,00,43,00,6f,00,6e,00,74,00,72,00,6f,00,6c,00,53,00,65,\\\n"
+    "  00,74,00,30,00,30,00,31,00\n"
+)
+USER_REG = (
+    "WINE REGISTRY Version 2\n"
+    ";; All keys relative to \\\\User\\\\S-1-5-21-0-0-0-1000\n"
+    "\n"
+    "[Software\\\\Wine\\\\DllOverrides] 1700000003\n"
+    "#time=1da0b1c2d3e4f53\n"
+    '"*d3d11"="native,builtin"\n'
+    '"winemenubuilder.exe"=""\n'
+    "\n"
+    "[Software\\\\Wine\\\\Fonts] 1700000004\n"
+    "#time=1da0b1c2d3e4f54\n"
+    '"Caf\\x00e9"="caf\\x00e9 \\"x\\""\n'
+)
+USERDEF_REG = "WINE REGISTRY Version 2\n;; All keys relative to \\\\User\\\\.Default\n"
+
+
+def _prefix(tmp_path):
+    for name, text in (
+        ("system.reg", SYSTEM_REG),
+        ("user.reg", USER_REG),
+        ("userdef.reg", USERDEF_REG),
+    ):
+        (tmp_path / name).write_text(text, encoding="latin-1")
+    return str(tmp_path)
+
+
+def test_untouched_keys_are_kept_verbatim(tmp_path):
+    prefix = _prefix(tmp_path)
+    registry = OfflineRegistry(prefix)
+
+    assert registry.get("HKEY_CURRENT_USER\\Software\\Wine\\Fonts", "Café") == (
+        REG_SZ,
+        'café "x"',
+    )
+    assert registry.save() == []
+
+    registry.set("HKCU\\Software\\Wine\\DllOverrides", "dxgi", "native")
+    assert registry.save() == [str(tmp_path / "user.reg")]
+
+    text = (tmp_path / "user.reg").read_text(encoding="latin-1")
+    _before, _sep, after = USER_REG.partition("\n\n[Software\\\\Wine\\\\Fonts]")
+    assert text.endswith("\n\n[Software\\\\Wine\\\\Fonts]" + after)
+    assert '"winemenubuilder.exe"=""\n"dxgi"="native"\n' in text
+    assert "] 1700000003\n" not in text
+    assert (tmp_path / "system.reg").read_text(encoding="latin-1") == SYSTEM_REG
+
+
+def test_values_round_trip_and_links_are_followed(tmp_path):
+    prefix = _prefix(tmp_path)
+    registry = OfflineRegistry(prefix)
+    key = "HKEY_LOCAL_MACHINE\\Software\\Test"
+    registry.set(key, "Path", "C:\\windows\\system32")
+    registry.set(key, "Expand", "%SystemRoot%", REG_EXPAND_SZ)
+    registry.set(key, "Multi", ["a", "b"], REG_MULTI_SZ)
+    registry.set(key, "Binary", bytes(range(40)), REG_BINARY)
+    registry.set(key, "", "default")
+    registry.set(
+        "HKEY_LOCAL_MACHINE\\System\\CurrentControlSet\\Control\\Windows",
+        "CSDVersion",
+        0x300,
+        REG_DWORD,
+    )
+    registry.save()
+
+    registry = OfflineRegistry(prefix)
+    assert registry.get(key, "path") == (REG_SZ, "C:\\windows\\system32")
+    assert registry.get(key, "Expand") == (REG_EXPAND_SZ, "%SystemRoot%")
+    assert registry.get(key, "Multi") == (REG_MULTI_SZ, ["a", "b"])
+    assert registry.get(key, "Binary") == (REG_BINARY, bytes(range(40)))
+    assert registry.get(key, "") == (REG_SZ, "default")
+
+    system = RegistryFile(str(tmp_path / "system.reg"))
+    assert system.get("System\\ControlSet001\\Control\\Windows", "CSDVersion") == (
+        REG_DWORD,
+        0x300,
+    )
+    text = (tmp_path / "system.reg").read_text(encoding="latin-1")
+    assert '"CSDVersion"=dword:00000300' in text
+    assert '"Path"="C:\\\\windows\\\\system32"' in text
+    assert all(len(line) <= 80 for line in text.splitlines())
+
+
+def test_reg_exe_and_bundle_semantics(tmp_path):
+    prefix = _prefix(tmp_path)
+    registry = OfflineRegistry(prefix)
+    registry.add(
+        "HKEY_CURRENT_USER\\Control Panel\\Desktop", "LogPixels", "96", "REG_DWORD"
+    )
+    registry.add(
+        "HKEY_CURRENT_USER\\Control Panel\\Desktop", "Hex", "0x10", "REG_DWORD"
+    )
+    registry.import_reg(
+        "REGEDIT4\n\n"
+        "[HKEY_CURRENT_USER\\Software\\Wine\\DllOverrides]\n"
+        '"*d3d11"=-\n'
+        '"d3d9"="native,builtin"\n\n'
+        "[HKEY_CURRENT_USER\\Console]\n"
+        '"FontSize"=dword:000e0000\n'
+        '"FaceName"=dword:Monospace\n'
+    )
+    registry.save()
+
+    registry = OfflineRegistry(prefix)
+    desktop = "HKEY_CURRENT_USER\\Control Panel\\Desktop"
+    assert registry.get(desktop, "LogPixels") == (REG_DWORD, 96)
+    assert registry.get(desktop, "Hex") == (REG_DWORD, 16)
+    overrides = "HKEY_CURRENT_USER\\Software\\Wine\\DllOverrides"
+    assert registry.get(overrides, "*d3d11") is None
+    assert registry.get(overrides, "d3d9") == (REG_SZ, "native,builtin")
+    assert registry.get("HKCU\\Console", "FontSize") == (REG_DWORD, 0xE0000)
+    # skipped, as regedit does with invalid lines
+    assert registry.get("HKCU\\Console", "FaceName") is None
+
+
+@pytest.mark.parametrize("started_at", [1, 2])
+def test_edit_falls_back_to_wine_if_the_server_starts(
+    tmp_path, monkeypatch, started_at
+):
+    """The server comes up before the save (1) or during it (2)."""
+    config = BottleConfig(Name="Test", Path=_prefix(tmp_path), Custom_Path=True)
+    launches = []
+
+    def launch(self, args=None, **kwargs):
+        launches.append(args)
+        return Result(True)
+
+    probes = iter(range(3))
+    monkeypatch.setattr(WineServer, "is_alive", lambda self: next(probes) >= started_at)
+    monkeypatch.setattr(WineDbg, "wait_for_process", lambda self, name: True)
+    monkeypatch.setattr(Reg, "launch", launch)
+
+    Reg(config).add("HKEY_CURRENT_USER\\Software\\Test", "Name", "value")
+
+    assert len(launches) == 1 and launches[0].startswith("add ")
+    saved = OfflineRegistry(config.Path).get("HKCU\\Software\\Test", "Name")
+    assert saved == (None if started_at == 1 else (REG_SZ, "value"))
@@ -0,0 +1,93 @@
+"""WineCommand environment cache tests"""
+
+import os
+
+import pytest
+
+from bottles.backend.managers.runtime import RuntimeManager
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.wine.winecommand import EnvCache, WineCommand
+
+
+@pytest.fixture
+def winecmd(tmp_path, monkeypatch):
+    bottle_path = tmp_path / "TestBottle"
+    bottle_path.mkdir()
+    runner_path = tmp_path / "runner"
+    (runner_path / "lib").mkdir(parents=True)
+
+    monkeypatch.setattr(
+        "bottles.backend.wine.winecommand.ManagerUtils.get_bottle_path",
+        lambda _config: str(bottle_path),
+    )
+    monkeypatch.setattr(
+        "bottles.backend.wine.winecommand.ManagerUtils.get_runner_path",
+        lambda _runner: str(runner_path),
+    )
+    monkeypatch.setattr(
+        "bottles.backend.wine.winecommand.GPUUtils.get_gpu",
+        lambda self: {"prime": {"discrete": None, "integrated": None}, "vendors": {}},
+    )
+    monkeypatch.setattr(WineCommand, "env_cache", EnvCache())
+
+    winecmd = WineCommand.__new__(WineCommand)
+    winecmd.config = BottleConfig(Name="Test", Path=str(bottle_path), Runner="test")
+    winecmd.minimal = True
+    winecmd.arguments = ""
+    winecmd.runner = "/usr/bin/wine"
+    winecmd.runner_runtime = ""
+    winecmd.gamescope_activated = False
+    winecmd.terminal = False
+    return winecmd
+
+
+def test_get_env_is_reused_until_an_input_changes(winecmd, monkeypatch):
+    env = winecmd.get_env({"DXVK_HUD": "1"})
+    env["CHANGED"] = "1"
+    assert "CHANGED" not in winecmd.get_env({"DXVK_HUD": "1"})
+    assert WineCommand.env_cache.stats()["hits"] == 1
+
+    winecmd.config.Parameters.fixme_logs = True
+    assert winecmd.get_env({"DXVK_HUD": "1"})["WINEDEBUG"] == "+fixme-all"
+    monkeypatch.setenv("BOTTLES_TEST_VAR", "1")
+    assert winecmd.get_env({"DXVK_HUD": "1"})["BOTTLES_TEST_VAR"] == "1"
+    winecmd.get_env({"DXVK_HUD": "2"})
+
+    stats = WineCommand.env_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+
+
+def test_env_cache_invalidation():
+    cache = EnvCache(maxsize=2)
+    cache.put(("a",), "/bottles/A", {"A": "1"})
+    cache.put(("b",), "/bottles/B", {"B": "1"})
+    cache.invalidate("/bottles/A")
+    assert cache.get(("a",)) is None
+    assert cache.get(("b",)) == {"B": "1"}
+
+    cache.put(("c",), "/bottles/C", {})
+    cache.put(("d",), "/bottles/D", {})
+    assert cache.get(("b",)) is None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_get_env_follows_the_vkbasalt_conf_and_the_runtimes(winecmd, monkeypatch):
+    winecmd.minimal = False
+    winecmd.config.Parameters.vkbasalt = True
+    conf = os.path.join(winecmd.config.Path, "vkBasalt.conf")
+    assert "VKBASALT_CONFIG_FILE" not in winecmd.get_env()
+
+    # the vkBasalt dialog writes and removes the file, not the config
+    with open(conf, "w") as f:
+        f.write("effects = cas\n")
+    assert winecmd.get_env()["VKBASALT_CONFIG_FILE"] == conf
+    os.remove(conf)
+    assert "VKBASALT_CONFIG_FILE" not in winecmd.get_env()
+
+    winecmd.config.Parameters.use_runtime = True
+    runtimes = []
+    monkeypatch.setattr(RuntimeManager, "get_runtimes", lambda _filter: runtimes)
+    without = winecmd.get_env()
+    runtimes.append("/runtime/lib")
+    assert winecmd.get_env()["LD_LIBRARY_PATH"] != without["LD_LIBRARY_PATH"]
@@ -0,0 +1,22 @@
+"""WineDbg process control tests"""
+
+from types import SimpleNamespace
+
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.utils.proc import Proc
+from bottles.backend.wine.winedbg import WineDbg
+from bottles.backend.wine.wineserver import WineServer
+
+
+def test_kill_process_takes_a_name_as_pid(monkeypatch):
+    killed = []
+    table = SimpleNamespace(
+        find=lambda name: [SimpleNamespace(pid="42")] if name == "game.exe" else []
+    )
+    monkeypatch.setattr(WineServer, "is_alive", lambda self: True)
+    monkeypatch.setattr(WineDbg, "get_table", lambda self: table)
+    monkeypatch.setattr(Proc, "kill", lambda self, signal=15: killed.append(self.pid))
+
+    WineDbg(BottleConfig()).kill_process("game.exe")
+    WineDbg(BottleConfig()).kill_process(pid="7")
+    assert killed == ["42", "7"]
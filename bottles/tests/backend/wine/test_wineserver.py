@@ -0,0 +1,58 @@
+"""Wineserver liveness probe tests"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from bottles.backend.wine.wineserver import WineServer
+
+HOLD_LOCK = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_RDWR)
+fcntl.lockf(fd, fcntl.LOCK_EX, 1)
+print("locked", flush=True)
+sys.stdin.read()
+"""
+
+
+@pytest.fixture
+def server_dir(tmp_path):
+    path = WineServer.get_server_dir(str(tmp_path))
+    os.makedirs(path)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def test_probe_and_wait_follow_the_server_lock(tmp_path, server_dir, monkeypatch):
+    monkeypatch.setattr(WineServer, "probe_ttl", 0)
+    prefix = str(tmp_path)
+    lock = os.path.join(server_dir, "lock")
+    open(lock, "w").close()
+    assert not WineServer.probe(prefix)
+    assert WineServer.wait_until_stopped(prefix, timeout=1)
+
+    server = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK, lock],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert server.stdout.readline().strip() == "locked"
+        assert WineServer.probe(prefix)
+        assert not WineServer.wait_until_stopped(prefix, timeout=0.2)
+    finally:
+        server.stdin.close()
+        server.wait()
+
+    assert WineServer.wait_until_stopped(prefix, timeout=5)
+    assert not WineServer.probe(prefix)
+
+
+def test_probe_without_server_dir(tmp_path):
+    assert not WineServer.probe(str(tmp_path))
+    assert not WineServer.probe(str(tmp_path / "missing"))
+    assert WineServer.wait_until_stopped(str(tmp_path), timeout=0)
@@ -0,0 +1,48 @@
+"""
+Benchmark the fvs2 queries of a versioning page render: a new FVSRepo per
+query, as before the sessions, against the shared FVSRepo.get() session.
+
+Run with: python -m bottles.tests.fvs.bench_repo
+It uses the fvs2 test double in a temporary folder, with an emulated
+start up latency per invocation (FAKE_FVS2_LATENCY, 20ms by default).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from bottles.fvs import repo as fvs_repo
+from bottles.fvs.repo import FVSRepo
+from bottles.tests.fvs import fake_fvs2
+
+# the queries of the versioning page: states, branches and active branch
+QUERIES = 3
+RENDERS = 5
+
+
+def render(new_repo) -> float:
+    start = time.perf_counter()
+    for _ in range(RENDERS):
+        for _ in range(QUERIES):
+            repo = new_repo()
+            repo.states, repo.branches, repo.active_branch
+    return (time.perf_counter() - start) / RENDERS
+
+
+def main():
+    os.environ.setdefault("FAKE_FVS2_LATENCY", "0.02")
+    with tempfile.TemporaryDirectory(prefix="bottles-bench-") as tmp:
+        fvs_repo.FVS2_CMD = fake_fvs2.install(tmp)
+        bottle = os.path.join(tmp, "bottle")
+        os.makedirs(os.path.join(bottle, "drive_c"))
+        FVSRepo(bottle).commit("Fresh install")
+
+        per_query = render(lambda: FVSRepo(bottle, no_init=True))
+        session = render(lambda: FVSRepo.get(bottle))
+        sys.stdout.write(f"new repo per query {per_query * 1000:>8.1f}ms/render\n")
+        sys.stdout.write(f"shared session     {session * 1000:>8.1f}ms/render\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+A test double of the fvs2 command line, enough for FVSRepo: init, status,
+states, branch, commit, restore and checkout. The repository is kept in
+.fvs2/fake.json and the files are compared by size and mtime, they are
+not stored. Use install() to get an executable to set as FVS2_CMD.
+
+FAKE_FVS2_LOG: a file to append each invocation to.
+FAKE_FVS2_LATENCY: seconds to sleep on each invocation, to emulate the
+start up and the index reads of the real binary in benchmarks.
+FAKE_FVS2_HASH_DELAY: seconds to sleep for each file a commit hashes.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+import uuid
+
+DB = os.path.join(".fvs2", "fake.json")
+
+
+def install(directory: str) -> str:
+    """Write an executable fvs2 running this module, returns its path."""
+    path = os.path.join(directory, "fvs2")
+    with open(__file__) as f:
+        source = f.read()
+    with open(path, "w") as f:
+        f.write(f"#!{sys.executable}\n{source}")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+def load() -> dict:
+    with open(DB) as f:
+        return json.load(f)
+
+
+def save(db: dict):
+    with open(DB + ".tmp", "w") as f:
+        json.dump(db, f)
+    os.replace(DB + ".tmp", DB)
+
+
+def scan() -> dict:
+    files = {}
+    for root, dirs, names in os.walk("."):
+        dirs[:] = [d for d in dirs if d != ".fvs2"]
+        for name in names:
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            files[os.path.relpath(path)] = [st.st_size, st.st_mtime_ns]
+    return files
+
+
+def head_files(db: dict) -> dict:
+    for state in db["states"]:
+        if state["id"] == db["head"]:
+            return state["files"]
+    return {}
+
+
+def fail(message: str) -> int:
+    sys.stderr.write(message + "\n")
+    return 1
+
+
+def main(args) -> int:
+    if os.environ.get("FAKE_FVS2_LOG"):
+        with open(os.environ["FAKE_FVS2_LOG"], "a") as f:
+            f.write(" ".join(args) + "\n")
+    time.sleep(float(os.environ.get("FAKE_FVS2_LATENCY", 0)))
+
+    command = args[0] if args else ""
+    if command == "init":
+        if os.path.exists(DB):
+            return fail("already initialized")
+        os.makedirs(".fvs2", exist_ok=True)
+        save({"states": [], "branches": {"main": None}, "branch": "main", "head": None})
+        return 0
+
+    if not os.path.exists(DB):
+        return fail("not a fvs2 repository")
+    db = load()
+
+    if command == "status":
+        if "--check-dirty" in args:
+            changed = scan().items() ^ head_files(db).items()
+            print(f"dirty={'true' if changed else 'false'}")
+            print(f"changed_files={len({path for path, _ in changed})}")
+        else:
+            print(f"head_commit={db['head'] or ''}")
+            print(f"branch={db['branch']}")
+        return 0
+
+    if command == "states":
+        for state in reversed(db["states"]):
+            print(f"{state['id']}  {state['time']}  {state['message']}")
+        return 0
+
+    if command == "branch":
+        action = args[1] if len(args) > 1 else "list"
+        if action == "list":
+            for name in sorted(db["branches"]):
+                print(f"{'* ' if name == db['branch'] else '  '}{name}")
+            return 0
+        name = args[2]
+        if action == "create":
+            if name in db["branches"]:
+                return fail(f"branch {name} already exists")
+            db["branches"][name] = db["head"]
+        elif action == "delete":
+            if name == db["branch"] or name not in db["branches"]:
+                return fail(f"cannot delete branch {name}")
+            del db["branches"][name]
+        save(db)
+        return 0
+
+    if command == "commit":
+        files = scan()
+        if db["head"] is not None and files == head_files(db):
+            return fail("nothing to commit")
+        os.makedirs(os.path.join(".fvs2", "objects"), exist_ok=True)
+        for path, key in files.items():
+            print(f"hashing: {path}", flush=True)
+            digest = hashlib.sha1(f"{path}{key}".encode()).hexdigest()
+            open(os.path.join(".fvs2", "objects", digest), "w").close()
+            time.sleep(float(os.environ.get("FAKE_FVS2_HASH_DELAY", 0)))
+        state = {
+            "id": uuid.uuid4().hex[:12],
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": args[args.index("-m") + 1],
+            "files": files,
+        }
+        db["states"].append(state)
+        db["head"] = db["branches"][db["branch"]] = state["id"]
+        save(db)
+        return 0
+
+    if command == "restore":
+        state_id = args[args.index("-s") + 1]
+        if state_id == db["head"] and "--reset" not in args:
+            return fail("nothing to restore")
+        for state in db["states"]:
+            if state["id"] == state_id:
+                for path in state["files"]:
+                    print(f"restoring: {path}", flush=True)
+                db["head"] = state_id
+                save(db)
+                return 0
+        return fail(f"state {state_id} not found")
+
+    if command == "checkout":
+        if args[1] not in db["branches"]:
+            return fail(f"branch {args[1]} not found")
+        db["branch"] = args[1]
+        db["head"] = db["branches"][args[1]]
+        save(db)
+        return 0
+
+    return fail(f"unknown command {command}")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,124 @@
+"""FVSRepo session tests, against the fvs2 test double"""
+
+import os
+import subprocess
+from datetime import datetime
+from threading import Event
+
+import pytest
+
+from bottles.backend.managers.versioning import VersioningManager
+from bottles.backend.models.config import BottleConfig
+from bottles.backend.utils.file import FileUtils
+from bottles.fvs import repo as fvs_repo
+from bottles.fvs.exceptions import FVSCancelled
+from bottles.fvs.repo import FVSRepo, FVSState, parse_branches, parse_states
+from bottles.tests.fvs import fake_fvs2
+
+
+@pytest.fixture
+def fvs2(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "fvs2.log"
+    log.write_text("")
+    monkeypatch.setattr(fvs_repo, "FVS2_CMD", fake_fvs2.install(str(bin_dir)))
+    monkeypatch.setenv("FAKE_FVS2_LOG", str(log))
+
+    def calls():
+        # the queries run in parallel, in any order
+        lines = sorted(log.read_text().splitlines())
+        log.write_text("")
+        return lines
+
+    return calls
+
+
+@pytest.fixture
+def config(tmp_path):
+    bottle = tmp_path / "bottle"
+    (bottle / "drive_c").mkdir(parents=True)
+    (bottle / "drive_c/app.exe").write_text("1")
+    yield BottleConfig(Name="Test", Path=str(bottle), Custom_Path=True)
+    FVSRepo.forget(str(bottle))
+
+
+def test_session_is_reused_until_a_change(fvs2, config):
+    versioning = VersioningManager(None)
+    assert versioning.list_states(config).data["states"] == {}
+    assert fvs2() == ["branch list", "init", "states", "status"]
+
+    versioning.list_states(config)
+    assert versioning.get_branches(config) == ["main"]
+    assert versioning.get_active_branch(config) == "main"
+    assert fvs2() == []
+
+    assert versioning.create_branch(config, "dev").status
+    assert versioning.get_branches(config) == ["dev", "main"]
+    assert fvs2() == ["branch create dev", "branch list", "states", "status"]
+
+    # a commit made by another fvs2 process
+    subprocess.run([fvs_repo.FVS2_CMD, "commit", "-m", "Outside"], cwd=config.Path)
+    fvs2()
+    data = versioning.list_states(config).data
+    assert [s["message"] for s in data["states"].values()] == ["Outside"]
+    assert data["state_id"] in data["states"]
+    assert fvs2() == ["branch list", "states", "status"]
+
+
+def test_structured_states_and_branches(fvs2, config):
+    repo = FVSRepo.get(config.Path)
+    repo.commit("First")
+    with open(f"{config.Path}/drive_c/app.exe", "w") as f:
+        f.write("22")
+    repo.commit("Second")
+    repo.refresh()
+
+    assert [s.message for s in repo.history] == ["Second", "First"]
+    assert repo.status.head == repo.history[0].id
+    assert repo.status.branch == "main"
+
+    timestamp = int(datetime(2025, 1, 2, 3, 4, 5).timestamp())
+    assert parse_states(
+        "abc  2025-01-02T03:04:05.123Z  Fresh install\nbroken line\n"
+    ) == [FVSState("abc", timestamp, "Fresh install")]
+    assert parse_branches("  dev\n* main\n\n") == ["dev", "main"]
+
+
+def test_commit_reports_progress_and_can_be_cancelled(fvs2, config, monkeypatch):
+    drive_c = os.path.join(config.Path, "drive_c")
+    for i in range(20):
+        with open(os.path.join(drive_c, f"{i}.dll"), "wb") as f:
+            f.write(b"\0" * 1024 * i)
+    total = FileUtils.get_path_usage(config.Path, exclude=(".fvs2",))
+    repo = FVSRepo.get(config.Path)
+    updates = []
+    repo.commit("First", total=total, progress=updates.append)
+
+    assert updates[-1].files == updates[-1].total_files == total[0]
+    assert updates[-1].bytes == total[1] and updates[-1].percent == 100
+
+    def objects():
+        return {
+            os.path.join(root, name)
+            for root, _, names in os.walk(os.path.join(config.Path, ".fvs2"))
+            for name in names
+        }
+
+    before = objects()
+    for i in range(20):
+        with open(os.path.join(drive_c, f"{i}.dll"), "ab") as f:
+            f.write(b"1")
+    monkeypatch.setenv("FAKE_FVS2_HASH_DELAY", "0.05")
+    cancel_event = Event()
+    with pytest.raises(FVSCancelled):
+        repo.commit(
+            "Second",
+            total=total,
+            cancel_event=cancel_event,
+            progress=lambda update: cancel_event.set(),
+        )
+
+    assert objects() == before
+    repo.refresh()
+    assert [s.message for s in repo.history] == ["First"]